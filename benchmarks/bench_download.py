@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Microbenchmark for download_file against a local HTTP server.
+
+Compares the legacy 8 KiB per-chunk loop with the tuned download path and
+reports throughput (MB/s) and CPU seconds per GB for known-length and
+unknown-length (chunked) responses.
+
+Usage:
+    python benchmarks/bench_download.py [--size-mb 256] [--runs 3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ctfd_scraper.api_client import CTFdClient  # noqa: E402
+from ctfd_scraper.challenges import download_file  # noqa: E402
+
+PAYLOAD = b""
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        view = memoryview(PAYLOAD)
+        if self.path.startswith("/known"):
+            self.send_header("Content-Length", str(len(PAYLOAD)))
+            self.end_headers()
+            self.wfile.write(view)
+            return
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        step = 1024 * 1024
+        for i in range(0, len(view), step):
+            part = view[i : i + step]
+            self.wfile.write(f"{len(part):x}\r\n".encode())
+            self.wfile.write(part)
+            self.wfile.write(b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def legacy_download(client, f_url, f_name, save_path):
+    """The pre-tuning implementation: 8 KiB chunks, whole body for unknown length."""
+    response = client.session.get(f_url, timeout=client.file_timeout, stream=True)
+    response.raise_for_status()
+    total_size = int(response.headers.get("content-length", 0))
+    with open(f"{save_path}/{f_name}", "wb") as f_out:
+        if total_size > 0:
+            downloaded = 0
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    f_out.write(chunk)
+                    downloaded += len(chunk)
+        else:
+            f_out.write(response.content)
+    return True
+
+
+def measure(fn, client, url, tmpdir, runs):
+    best_wall, best_cpu = float("inf"), float("inf")
+    for _ in range(runs):
+        wall, cpu = time.perf_counter(), time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert fn(client, url, "out.bin", tmpdir)
+        best_wall = min(best_wall, time.perf_counter() - wall)
+        best_cpu = min(best_cpu, time.process_time() - cpu)
+        assert os.path.getsize(os.path.join(tmpdir, "out.bin")) == len(PAYLOAD)
+    return best_wall, best_cpu
+
+
+def main():
+    global PAYLOAD
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    PAYLOAD = os.urandom(args.size_mb * 1024 * 1024)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    client = CTFdClient(url=base)
+    gb = len(PAYLOAD) / 1024**3
+
+    print(f"{'variant':<10} {'length':<8} {'MB/s':>10} {'CPU s/GB':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for length in ("known", "chunked"):
+            for name, fn in (("legacy", legacy_download), ("tuned", download_file)):
+                wall, cpu = measure(fn, client, f"{base}/{length}", tmpdir, args.runs)
+                mbps = args.size_mb / wall
+                print(f"{name:<10} {length:<8} {mbps:>10.1f} {cpu / gb:>10.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
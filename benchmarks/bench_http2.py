@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Compare the requests (HTTP/1.1) session with the HTTP/2 transport.
+
+By default starts a local TLS HTTP/2 server (hypercorn, self-signed certificate
+generated with openssl) that answers CTFd-like JSON with an artificial delay
+and serves binary files. Both transports then run the same workload through
+``CTFdClient.get`` with the same number of worker threads. The script reports
+latency percentiles, requests/s, download throughput and how many TCP
+connections the server saw.
+
+With ``--url`` it benchmarks an existing server instead (for example a CTFd
+behind nginx or Cloudflare); connection counts are not available then.
+
+Usage:
+    python benchmarks/bench_http2.py [--workers 40] [--requests 2000] [--latency-ms 20]
+    python benchmarks/bench_http2.py --url https://ctf.example.com -s COOKIE \\
+        --path /api/v1/challenges --path /api/v1/scoreboard
+
+Requires ``pip install 'ctfd-scraper[http2]' hypercorn``.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ctfd_scraper.api_client import CTFdClient  # noqa: E402
+
+USER_JSON = b'{"success": true, "data": {"id": 1, "name": "user", "score": 100, "fields": []}}'
+
+
+class LocalServer:
+    """在背景執行緒中以 hypercorn 提供 TLS + HTTP/2 的假 CTFd API"""
+
+    def __init__(self, latency, file_size):
+        self.latency = latency
+        self.payload = os.urandom(file_size)
+        self.connections = set()
+        self.port = None
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cert = os.path.join(self._tmp.name, "cert.pem")
+        key = os.path.join(self._tmp.name, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+            + ["-keyout", key, "-out", self.cert, "-subj", "/CN=localhost"]
+            + ["-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+            check=True,
+            capture_output=True,
+        )
+        self.key = key
+
+    async def app(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        self.connections.add(tuple(scope["client"]))
+        if scope["path"].startswith("/files/"):
+            body, ctype = self.payload, b"application/octet-stream"
+        else:
+            await asyncio.sleep(self.latency)
+            body, ctype = USER_JSON, b"application/json"
+        headers = [(b"content-type", ctype), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def start(self):
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+
+        config = Config()
+        config.bind = [f"127.0.0.1:{self.port}"]
+        config.certfile = self.cert
+        config.keyfile = self.key
+        config.accesslog = None
+        config.errorlog = None
+
+        self._loop = asyncio.new_event_loop()
+        # 用戶端重送時伺服器端的 TLS 關閉錯誤只是雜訊
+        self._loop.set_exception_handler(lambda loop, context: None)
+        self._stop = asyncio.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(serve(self.app, config, shutdown_trigger=self._stop.wait))
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("hypercorn did not start")
+                time.sleep(0.05)
+        return f"https://127.0.0.1:{self.port}"
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(5)
+        self._tmp.cleanup()
+
+
+def run_workload(client, urls, workers):
+    """以 workers 個執行緒請求 urls，回傳每個請求的延遲與總時間"""
+
+    def fetch(url):
+        start = time.perf_counter()
+        response = client.get(url)
+        response.content
+        if response.status_code != 200:
+            raise RuntimeError(f"{url}: HTTP {response.status_code}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = list(executor.map(fetch, urls))
+    return latencies, time.perf_counter() - start
+
+
+def report(name, latencies, elapsed, size=None, connections=None):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    line = f"{name:<10}{len(latencies) / elapsed:>10.0f}{p50:>10.1f}{p95:>10.1f}"
+    if size is not None:
+        line += f"{size * len(latencies) / elapsed / (1024 * 1024):>10.1f}"
+    else:
+        line += f"{'':>10}"
+    line += f"{connections if connections is not None else '-':>8}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Benchmark an existing server instead of a local one")
+    parser.add_argument("-s", "--session", help="Session cookie for --url")
+    parser.add_argument(
+        "--path", action="append", help="Paths requested round-robin with --url (repeatable)"
+    )
+    parser.add_argument("--workers", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Local server delay")
+    parser.add_argument("--files", type=int, default=40, help="Local downloads per transport")
+    parser.add_argument("--file-mb", type=float, default=4.0)
+    parser.add_argument("--max-streams", type=int, default=100)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base = args.url.rstrip("/")
+        paths = args.path or ["/api/v1/challenges"]
+    else:
+        server = LocalServer(args.latency_ms / 1000, int(args.file_mb * 1024 * 1024))
+        base = server.start()
+        paths = [f"/api/v1/users/{i}" for i in range(1, 101)]
+        # requests 與 httpx 都信任自簽憑證
+        os.environ["REQUESTS_CA_BUNDLE"] = server.cert
+        os.environ["SSL_CERT_FILE"] = server.cert
+
+    urls = [f"{base}{paths[i % len(paths)]}" for i in range(args.requests)]
+    print(f"{args.requests} requests, {args.workers} workers, {base}")
+    print(f"{'transport':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'MB/s':>10}{'conns':>8}")
+
+    try:
+        for name, http2 in (("http/1.1", False), ("http/2", True)):
+            client = CTFdClient(
+                base, args.session, http2=http2, max_streams=max(args.max_streams, args.workers)
+            )
+            run_workload(client, urls[: args.workers], args.workers)  # warm up connections
+            if server:
+                server.connections.clear()
+            latencies, elapsed = run_workload(client, urls, args.workers)
+            report(
+                name, latencies, elapsed, connections=len(server.connections) if server else None
+            )
+
+            if server and args.files:
+                files = [f"{base}/files/{i}.bin" for i in range(args.files)]
+                server.connections.clear()
+                latencies, elapsed = run_workload(client, files, min(args.workers, args.files))
+                report(
+                    f"{name} dl",
+                    latencies,
+                    elapsed,
+                    size=len(server.payload),
+                    connections=len(server.connections),
+                )
+            client.session.close()
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Benchmark the render layer against the previous string-concatenation generators.
+
+Renders USER_RANKING.md, Users/README.md and per-user JSON for synthetic rows and
+reports the best-of-N wall time for the legacy and current implementations.
+
+Usage:
+    python benchmarks/bench_render.py [--rows 50000] [--runs 5]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ctfd_scraper import render  # noqa: E402
+from ctfd_scraper.scoreboard import USER_TABLE  # noqa: E402
+from ctfd_scraper.users import generate_users_readme  # noqa: E402
+
+
+def legacy_user_ranking(members, path):
+    members_md = "# User Ranking\n\n"
+    members_md += f"總計 {len(members)} 位成員\n\n"
+    members_md += "| 排名 | 成員名稱 | 分數 | 隊伍 |\n"
+    members_md += "|-----:|----------|-----:|------|\n"
+    for idx, member in enumerate(members, 1):
+        members_md += f"| {idx} | {member['name']} | {member['score']} | {member['team']} |\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(members_md)
+
+
+def current_user_ranking(members, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# User Ranking\n\n")
+        f.write(f"總計 {len(members)} 位成員\n\n")
+        USER_TABLE.write(
+            f,
+            (
+                f"| {idx} | {m['name']} | {m['score']} | {m['team']} |\n"
+                for idx, m in enumerate(members, 1)
+            ),
+        )
+
+
+def legacy_users_index(users, users_dir):
+    sorted_users = sorted(users, key=lambda x: x["name"].lower())
+    readme_content = "# Users Index\n\n"
+    readme_content += f"總計 {len(sorted_users)} 位使用者\n\n"
+    readme_content += "| 使用者名稱 | ID | 隊伍 | 分數 |\n"
+    readme_content += "|------------|---:|------|-----:|\n"
+    for user in sorted_users:
+        safe_name = user["name"].replace("/", "_").strip()
+        display_name = user["name"].replace("|", "\\|")
+        folder_name = f"{safe_name}_{user['id']}"
+        from urllib.parse import quote
+
+        link = quote(folder_name)
+        team_display = user.get("team_name", "N/A")
+        if team_display:
+            team_display = team_display.replace("|", "\\|")
+        readme_content += (
+            f"| [{display_name}](./{link}/) | {user['id']} | {team_display} | {user['score']} |\n"
+        )
+    with open(f"{users_dir}/README.md", "w", encoding="utf-8") as f:
+        f.write(readme_content)
+
+
+def current_users_index(users, users_dir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_users_readme(users, users_dir)
+
+
+def legacy_json(objs, path):
+    for obj in objs:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+
+
+def current_json(objs, path):
+    for obj in objs:
+        with open(path, "w", encoding="utf-8") as f:
+            render.dump_json(obj, f)
+
+
+def best(fn, runs, *args):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    members = [
+        {"name": f"user {i} 測試", "id": i, "score": 10000 - i, "team": f"team|{i // 4}"}
+        for i in range(args.rows)
+    ]
+    users = [
+        {"name": f"user/{i} 測試", "id": i, "score": i, "team_name": f"team|{i // 4}"}
+        for i in range(args.rows)
+    ]
+    infos = [
+        {
+            "id": i,
+            "name": f"user {i}",
+            "solves": [{"challenge": f"c{j}", "value": j, "date": "2026-01-01"} for j in range(20)],
+        }
+        for i in range(max(1, args.rows // 50))
+    ]
+
+    json_backend = "orjson" if render.orjson is not None else "json"
+    cases = [
+        ("USER_RANKING.md", legacy_user_ranking, current_user_ranking, members, "ranking.md"),
+        ("Users/README.md", legacy_users_index, current_users_index, users, None),
+        (f"user_info.json ({json_backend})", legacy_json, current_json, infos, "info.json"),
+    ]
+
+    print(f"{'generator':<28} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, legacy, current, data, filename in cases:
+            target = os.path.join(tmpdir, filename) if filename else tmpdir
+            old = best(legacy, args.runs, data, target)
+            new = best(current, args.runs, data, target)
+            print(f"{name:<28} {old * 1000:>10.1f} {new * 1000:>11.1f} {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark CLI startup cost.
+
+Runs fresh interpreters with ``-X importtime`` and reports the total import time
+of ``ctfd_scraper.cli`` (what ``--help``/``--version`` pay) next to the full
+backup stack that ``run_backup`` loads lazily, plus the slowest modules.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--top 10] [--budget-ms 50]
+
+With ``--budget-ms`` the script exits non-zero when the best ``ctfd_scraper.cli``
+import (including its dependencies) exceeds the budget, so it can guard against
+eager imports creeping back.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SCENARIOS = {
+    "cli": "import ctfd_scraper.cli",
+    "backup stack": (
+        "import ctfd_scraper.cli, ctfd_scraper.api_client, ctfd_scraper.challenges, "
+        "ctfd_scraper.teams, ctfd_scraper.users, ctfd_scraper.scoreboard"
+    ),
+}
+
+
+def importtime(code):
+    """在新的直譯器中執行 code，回傳 [(模組, self us, cumulative us)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def wall_time(argv, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    # 直譯器啟動時本來就會載入的模組（site、encodings 等）不計入
+    baseline = {name for name, _, _ in importtime("pass")}
+
+    best = {}
+    slowest = {}
+    for label, code in SCENARIOS.items():
+        for _ in range(args.runs):
+            rows = [row for row in importtime(code) if row[0] not in baseline]
+            total = sum(self_us for _, self_us, _ in rows)
+            if total < best.get(label, float("inf")):
+                best[label] = total
+                slowest[label] = sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]
+
+    python_only = wall_time([sys.executable, "-c", "pass"], args.runs)
+    help_wall = wall_time([sys.executable, "ctfdscraper.py", "--version"], args.runs)
+
+    print(f"{'scenario':<14} {'import (ms)':>12}")
+    for label, total in best.items():
+        print(f"{label:<14} {total / 1000:>12.1f}")
+    print(
+        f"\nctfdscraper --version wall: {help_wall * 1000:.1f} ms "
+        f"(bare interpreter {python_only * 1000:.1f} ms)"
+    )
+
+    for label, rows in slowest.items():
+        print(f"\nslowest modules ({label}, self time):")
+        for name, self_us, cumulative_us in rows:
+            print(f"  {self_us / 1000:>7.1f} ms  {cumulative_us / 1000:>7.1f} ms  {name}")
+
+    if args.budget_ms is not None and best["cli"] / 1000 > args.budget_ms:
+        print(
+            f"\nctfd_scraper.cli import {best['cli'] / 1000:.1f} ms exceeds budget "
+            f"{args.budget_ms} ms"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
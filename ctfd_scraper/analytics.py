@@ -0,0 +1,346 @@
+"""Column-oriented solve analytics: first bloods, score curves and category breakdowns.
+
+Every solve is appended to a handful of ``array`` columns (challenge, user,
+account, timestamp, value) instead of being kept as a dict, so a million solves
+take about 40 MB. The aggregates are computed over whole columns with C-level
+building blocks (``sorted`` with ``__getitem__`` keys, ``map``/``zip``,
+``itertools.accumulate``, ``Counter``); Python-level loops only run once per
+challenge, account or (account, category) group, never once per solve.
+
+The account is the team in team mode and the user otherwise, matching how
+CTFd ranks; in team mode, solves by users without a team are left out.
+Points are the challenge value at backup time, so with dynamic scoring they
+can differ from the historical score; awards are not included.
+"""
+
+import collections
+import datetime
+import itertools
+import operator
+from array import array
+
+from . import storage
+from .logger import log
+from .render import JSON_SUFFIXES, Table, dump_json, escape_cell, load_json, open_json
+
+CURVE_ACCOUNTS = 10  # Accounts with a score-over-time curve (CTFd's graph shows the top 10)
+
+FIRST_BLOOD_TABLE = Table(
+    "| 題目 | 分類 | 分數 | 解題數 | First Blood | 時間 |",
+    "|------|------|-----:|-------:|-------------|------|",
+)
+CATEGORY_TABLE = Table(
+    "| 分類 | 題數 | 解題數 | 總分 |",
+    "|------|-----:|-------:|-----:|",
+)
+ACCOUNT_TABLE = Table(
+    "| 排名 | 名稱 | 分數 | 解題數 | First Blood | 最後解題 |",
+    "|-----:|------|-----:|-------:|------------:|----------|",
+)
+
+
+def _timestamp(date):
+    """將 CTFd 的 ISO 8601 時間轉為 epoch 秒，無法解析時回傳 None"""
+    try:
+        return datetime.datetime.fromisoformat(date.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _isoformat(ts):
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat()
+
+
+class SolveTable:
+    """以 array 欄位儲存的解題紀錄，由 backup_users 逐位使用者加入
+
+    只在 backup_users 的結果迴圈 (單一執行緒) 中呼叫，本類別不加鎖。
+    """
+
+    def __init__(self):
+        self.challenge = array("q")
+        self.user = array("q")
+        self.account = array("q")
+        self.ts = array("d")
+        self.value = array("q")
+        self.in_team = array("b")  # 解題者是否屬於隊伍，隊伍模式下用來排除無隊伍的使用者
+        # 維度表：ID → 名稱等屬性，每個實體只存一次
+        self.challenges = {}
+        self.users = {}
+        self.teams = {}
+        self.skipped = 0
+        self.teamless = 0  # 隊伍模式下排除的無隊伍使用者解題數
+
+    def __len__(self):
+        return len(self.ts)
+
+    def add_user(self, user_info):
+        """加入 user_info.json 格式的一位使用者與其解題紀錄"""
+        user_id = user_info["id"]
+        team_id = user_info.get("team_id")
+        self.users[user_id] = user_info["name"]
+        if team_id is not None:
+            self.teams[team_id] = user_info.get("team_name") or f"Team_{team_id}"
+        # 隊伍模式是否成立要等所有使用者加入後才知道，先記錄是否有隊伍
+        account = user_id if team_id is None else team_id
+        in_team = team_id is not None
+
+        for solve in user_info.get("solves", ()):
+            chal_id = solve.get("challenge_id")
+            ts = _timestamp(solve.get("date"))
+            if chal_id is None or ts is None:
+                self.skipped += 1
+                continue
+            if chal_id not in self.challenges:
+                self.challenges[chal_id] = (
+                    solve.get("challenge", "Unknown"),
+                    solve.get("category", "N/A"),
+                    solve.get("value", 0) or 0,
+                )
+            self.challenge.append(chal_id)
+            self.user.append(user_id)
+            self.account.append(account)
+            self.ts.append(ts)
+            self.value.append(self.challenges[chal_id][2])
+            self.in_team.append(in_team)
+
+    def compute(self, curve_accounts=CURVE_ACCOUNTS):
+        """計算所有彙總結果，回傳可直接寫成 analytics.json 的 dict"""
+        team_mode = bool(self.teams)
+        if team_mode and not all(self.in_team):
+            self._drop_teamless()
+        n = len(self)
+        names = self.teams if team_mode else self.users
+        challenge, account, ts, value = self.challenge, self.account, self.ts, self.value
+
+        # 依時間排序一次，後續各項統計都沿用這個順序；同一時間依使用者 ID，
+        # 結果不受使用者加入順序 (執行緒完成順序、續傳) 影響
+        order = sorted(range(n), key=self.user.__getitem__)
+        order.sort(key=ts.__getitem__)
+
+        # 反向建立 dict 時較早的解題會覆蓋較晚的，剩下的就是每題最早的一筆
+        first = dict(zip(map(challenge.__getitem__, reversed(order)), reversed(order)))
+        solve_counts = collections.Counter(challenge)
+
+        # 帳號與分類都轉為連續的整數代碼，合併成一個 (帳號, 分類) 代碼欄位
+        category_names = sorted({c[1] for c in self.challenges.values()})
+        category_code = {name: i for i, name in enumerate(category_names)}
+        chal_category = {cid: category_code[c[1]] for cid, c in self.challenges.items()}
+        width = len(category_names) or 1
+        account_ids = sorted(set(account))
+        account_code = {acc: i for i, acc in enumerate(account_ids)}
+        codes = array(
+            "q",
+            map(
+                operator.add,
+                map(operator.mul, map(account_code.__getitem__, account), itertools.repeat(width)),
+                map(chal_category.__getitem__, challenge),
+            ),
+        )
+
+        # 依代碼排序後同一組的解題相鄰，以前綴和相減得到每組分數，
+        # Python 層的迴圈只跑 帳號數 × 分類數 次
+        by_code = sorted(range(n), key=codes.__getitem__)
+        prefix = [0]
+        prefix.extend(itertools.accumulate(map(value.__getitem__, by_code)))
+        points = collections.defaultdict(int)
+        account_solves = collections.defaultdict(int)
+        breakdown = collections.defaultdict(dict)
+        start = 0
+        for code, count in sorted(collections.Counter(codes).items()):
+            acc = account_ids[code // width]
+            group_points = prefix[start + count] - prefix[start]
+            start += count
+            points[acc] += group_points
+            account_solves[acc] += count
+            breakdown[acc][category_names[code % width]] = {
+                "solves": count,
+                "points": group_points,
+            }
+
+        # 依時間順序覆蓋，留下每個帳號最後一次解題的索引
+        last = dict(zip(map(account.__getitem__, order), order))
+        bloods = collections.Counter(account[i] for i in first.values())
+
+        # 與 CTFd 相同，同分時較早達到該分數 (最後解題較早) 者排名較前
+        ranking = sorted(points, key=lambda acc: (-points[acc], ts[last[acc]], acc))
+
+        per_category = collections.defaultdict(lambda: [0, 0, 0])
+        for cid, (_, cat, v) in self.challenges.items():
+            entry = per_category[cat]
+            entry[0] += 1
+            entry[1] += solve_counts[cid]
+            entry[2] += solve_counts[cid] * v
+
+        return {
+            "mode": "teams" if team_mode else "users",
+            "solves": n,
+            "skipped_solves": self.skipped,
+            "challenges": [
+                {
+                    "id": cid,
+                    "name": name,
+                    "category": cat,
+                    "value": v,
+                    "solves": solve_counts[cid],
+                    "first_blood": self._solve(first[cid], names),
+                }
+                for cid, (name, cat, v) in sorted(self.challenges.items())
+            ],
+            "categories": [
+                {"category": cat, "challenges": c, "solves": s, "points": p}
+                for cat, (c, s, p) in sorted(per_category.items())
+            ],
+            "accounts": [
+                {
+                    "pos": pos,
+                    "id": acc,
+                    "name": names.get(acc, str(acc)),
+                    "score": points[acc],
+                    "solves": account_solves[acc],
+                    "first_bloods": bloods[acc],
+                    "last_solve": _isoformat(ts[last[acc]]),
+                    "categories": breakdown[acc],
+                }
+                for pos, acc in enumerate(ranking, 1)
+            ],
+            "score_curves": self._curves(order, ranking[:curve_accounts], names),
+        }
+
+    def _drop_teamless(self):
+        """移除沒有隊伍的使用者的解題
+
+        這些解題的帳號是使用者 ID，與隊伍 ID 屬於不同的命名空間，留著會把分數
+        算到 ID 相同的隊伍上；CTFd 的隊伍排行榜同樣不計入。
+        """
+        keep = list(itertools.compress(range(len(self)), self.in_team))
+        self.teamless += len(self) - len(keep)
+        for name in ("challenge", "user", "account", "ts", "value", "in_team"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, map(column.__getitem__, keep)))
+        # 維度表只保留仍有解題的題目，與只由解題建立時相同
+        solved = set(self.challenge)
+        self.challenges = {cid: c for cid, c in self.challenges.items() if cid in solved}
+
+    def _solve(self, i, names):
+        acc = self.account[i]
+        return {
+            "account_id": acc,
+            "account": names.get(acc, str(acc)),
+            "user_id": self.user[i],
+            "user": self.users.get(self.user[i]),
+            "date": _isoformat(self.ts[i]),
+        }
+
+    def _curves(self, order, accounts, names):
+        """前幾名帳號的累計分數曲線，每次解題一個點"""
+        wanted = set(accounts)
+        by_account = collections.defaultdict(list)
+        account = self.account
+        for i in order:
+            if account[i] in wanted:
+                by_account[account[i]].append(i)
+
+        curves = []
+        for acc in accounts:
+            indices = by_account[acc]
+            scores = itertools.accumulate(map(self.value.__getitem__, indices))
+            curves.append(
+                {
+                    "id": acc,
+                    "name": names.get(acc, str(acc)),
+                    "points": [[_isoformat(self.ts[i]), s] for i, s in zip(indices, scores)],
+                }
+            )
+        return curves
+
+
+def load_user_info(users_dir, summary):
+    """讀取先前備份的 user_info.json (任一壓縮格式)，找不到時回傳 None"""
+    folder = f"{users_dir}/{summary['name'].replace('/', '_').strip()}_{summary['id']}"
+    for suffix in JSON_SUFFIXES.values():
+        path = f"{folder}/user_info.json{suffix}"
+        if storage.exists(path):
+            return load_json(path)
+    return None
+
+
+def write_analytics(table, backup_dir):
+    """計算並寫出 Scoreboard/analytics.json 與 ANALYTICS.md
+
+    Args:
+        table: 已加入所有使用者的 SolveTable
+        backup_dir: 備份目錄
+    """
+    if not len(table):
+        log("analytics", "!", "沒有可分析的解題紀錄，跳過")
+        return None
+
+    log("analytics", "*", f"正在分析 {len(table)} 筆解題紀錄...")
+    result = table.compute()
+    if table.skipped:
+        log("analytics", "!", f"{table.skipped} 筆解題缺少題目 ID 或時間，未納入分析")
+    if table.teamless:
+        log("analytics", "!", f"{table.teamless} 筆解題來自沒有隊伍的使用者，未納入隊伍排名")
+
+    scoreboard_dir = f"{backup_dir}/Scoreboard"
+    storage.makedirs(scoreboard_dir)
+    with open_json(f"{scoreboard_dir}/analytics.json") as f:
+        dump_json(result, f)
+    write_analytics_readme(result, f"{scoreboard_dir}/ANALYTICS.md")
+
+    log(
+        "analytics",
+        "+",
+        f"分析完成: {len(result['challenges'])} 題、{len(result['accounts'])} 個帳號",
+    )
+    return result
+
+
+def write_analytics_readme(result, path):
+    """將 compute() 的結果寫成 Markdown"""
+    with storage.open(path, "w") as f:
+        f.write("# Solve Analytics\n\n")
+        f.write(f"共 {result['solves']} 筆解題，{len(result['accounts'])} 個帳號\n\n")
+
+        f.write("## 分類統計\n\n")
+        CATEGORY_TABLE.write(
+            f,
+            (
+                f"| {escape_cell(c['category'])} | {c['challenges']} | {c['solves']}"
+                f" | {c['points']} |\n"
+                for c in result["categories"]
+            ),
+        )
+
+        f.write("\n## First Blood\n\n")
+        FIRST_BLOOD_TABLE.write(
+            f,
+            (
+                f"| {escape_cell(c['name'])} | {escape_cell(c['category'])} | {c['value']}"
+                f" | {c['solves']} | {escape_cell(c['first_blood']['account'])}"
+                f" | {c['first_blood']['date']} |\n"
+                for c in result["challenges"]
+            ),
+        )
+
+        f.write("\n## 帳號排名 (依解題分數)\n\n")
+        ACCOUNT_TABLE.write(
+            f,
+            (
+                f"| {a['pos']} | {escape_cell(a['name'])} | {a['score']} | {a['solves']}"
+                f" | {a['first_bloods']} | {a['last_solve']} |\n"
+                for a in result["accounts"]
+            ),
+        )
+
+        top = result["accounts"][: len(result["score_curves"])]
+        f.write(f"\n## 各分類得分 (前 {len(top)} 名)\n\n")
+        names = [c["category"] for c in result["categories"]]
+        f.write("| 名稱 | " + " | ".join(escape_cell(n) for n in names) + " |\n")
+        f.write("|------|" + "-----:|" * len(names) + "\n")
+        for a in top:
+            cells = [str(a["categories"].get(n, {}).get("points", 0)) for n in names]
+            f.write(f"| {escape_cell(a['name'])} | " + " | ".join(cells) + " |\n")
+
+        f.write("\n分數曲線 (score_curves) 見 analytics.json。\n")
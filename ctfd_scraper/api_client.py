@@ -1,15 +1,46 @@
 """API client for CTFd."""
 
+import html
+import re
+
 import requests
-from bs4 import BeautifulSoup
 
+from . import profiling, stats
 from .logger import log
+from .ratelimit import TokenBucket
+
+TITLE_PROBE_CHUNK = 4096  # Bytes read per step while looking for </title>
+TITLE_PROBE_LIMIT = 256 * 1024  # Give up if no title within this many bytes
+MISSING_STATUS = (403, 404)  # Hidden, banned, locked or deleted entities
+
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title\s*>", re.IGNORECASE | re.DOTALL)
+_CHARSET_RE = re.compile(rb"charset=[\"']?([\w-]+)", re.IGNORECASE)
+
+
+class APIError(Exception):
+    """API 回應不是 200 的 JSON；status 為 HTTP 狀態碼"""
+
+    def __init__(self, endpoint, status, reason=None):
+        super().__init__(f"{endpoint}: {reason or f'HTTP {status}'}")
+        self.endpoint = endpoint
+        self.status = status
 
 
 class CTFdClient:
     """CTFd API client with session management."""
 
-    def __init__(self, url=None, session_cookie=None, api_timeout=15, file_timeout=60):
+    def __init__(
+        self,
+        url=None,
+        session_cookie=None,
+        api_timeout=15,
+        file_timeout=60,
+        max_rps=None,
+        max_bandwidth=None,
+        burst_seconds=1.0,
+        http2=False,
+        max_streams=None,
+    ):
         """初始化 CTFd 客戶端
 
         Args:
@@ -17,11 +48,29 @@ class CTFdClient:
             session_cookie: Session cookie 值
             api_timeout: API 請求超時（秒）
             file_timeout: 檔案下載超時（秒）
+            max_rps: 全域每秒請求數上限（None 表示不限制）
+            max_bandwidth: 全域下載頻寬上限，bytes/s（None 表示不限制）
+            burst_seconds: 允許的突發量，以幾秒的配額計算
+            http2: 改用 httpx 的 HTTP/2 多工連線 (需要 httpx[http2])
+            max_streams: HTTP/2 同時進行的請求上限（None 表示使用預設值）
         """
         self.base_url = url or "https://ctf.bitskrieg.in"
         self.api_timeout = api_timeout
         self.file_timeout = file_timeout
-        self.session = requests.Session()
+        if http2:
+            from .http2 import DEFAULT_MAX_STREAMS, Http2Session
+
+            self.session = Http2Session(max_streams=max_streams or DEFAULT_MAX_STREAMS)
+        else:
+            self.session = requests.Session()
+
+        # 所有 phase 與 worker 共用同一組 bucket
+        self.request_limiter = None
+        self.bandwidth_limiter = None
+        if max_rps:
+            self.request_limiter = TokenBucket(max_rps, max(1.0, max_rps * burst_seconds))
+        if max_bandwidth:
+            self.bandwidth_limiter = TokenBucket(max_bandwidth, max_bandwidth * burst_seconds)
 
         if session_cookie:
             self.session.cookies.update({"session": session_cookie})
@@ -29,6 +78,58 @@ class CTFdClient:
         self.session.headers.update({"User-Agent": "Mozilla/5.0"})
         self.ctf_name = None
 
+    def get(self, url, timeout=None, **kwargs):
+        """受速率限制的 GET 請求，所有 HTTP 存取都應經過此方法"""
+        if self.request_limiter:
+            with profiling.stage("throttle"):
+                self.request_limiter.acquire()
+        stats.request()
+        with profiling.stage("fetch"):
+            response = self.session.get(url, timeout=timeout or self.api_timeout, **kwargs)
+        if not kwargs.get("stream"):
+            self.record_transfer(response, len(response.content))
+        return response
+
+    def head(self, url, timeout=None, **kwargs):
+        """受速率限制的 HEAD 請求，預設跟隨轉址"""
+        if self.request_limiter:
+            with profiling.stage("throttle"):
+                self.request_limiter.acquire()
+        stats.request()
+        kwargs.setdefault("allow_redirects", True)
+        with profiling.stage("fetch"):
+            return self.session.head(url, timeout=timeout or self.api_timeout, **kwargs)
+
+    def record_transfer(self, response, decoded):
+        """記錄 API 回應本體的線上大小 (壓縮後) 與解碼後大小，供結束時的傳輸報告使用"""
+        wire = getattr(response, "wire_bytes", None)
+        if wire is None:
+            # requests：urllib3 的 tell() 是已從連線讀取的原始位元組數
+            try:
+                wire = response.raw.tell()
+            except Exception:
+                return
+        if not isinstance(wire, int):
+            return
+        encoding = response.headers.get("content-encoding", "identity")
+        stats.transfer(encoding, wire, decoded)
+
+    def iter_body(self, response, chunk_size):
+        """串流讀取回應本體，讀完後記錄傳輸量"""
+        decoded = 0
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                decoded += len(chunk)
+                yield chunk
+        finally:
+            self.record_transfer(response, decoded)
+
+    def throttle_bytes(self, amount):
+        """依頻寬上限消耗 token，於讀取每個區塊後呼叫"""
+        if self.bandwidth_limiter and amount:
+            with profiling.stage("throttle"):
+                self.bandwidth_limiter.acquire(amount)
+
     def get_ctf_name(self):
         """從首頁 HTML title 取得 CTF 名稱"""
         if self.ctf_name:
@@ -36,20 +137,16 @@ class CTFdClient:
 
         try:
             log("api", "*", "正在獲取 CTF 名稱...")
-            response = self.session.get(self.base_url, timeout=self.api_timeout)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, "html.parser")
-                title = soup.find("title")
-                if title and title.string:
-                    # 移除常見的後綴
-                    name = title.string.strip()
-                    name = name.replace(" - CTFd", "").strip()
-                    # 清理檔案名稱不合法字元
-                    for char in ["/", "\\", ":", "*", "?", '"', "<", ">", "|"]:
-                        name = name.replace(char, "_")
-                    self.ctf_name = name or "ctf"
-                    log("api", "+", f"CTF 名稱: {self.ctf_name}")
-                    return self.ctf_name
+            title = self.probe_title(self.base_url)
+            if title:
+                # 移除常見的後綴
+                name = title.replace(" - CTFd", "").strip()
+                # 清理檔案名稱不合法字元
+                for char in ["/", "\\", ":", "*", "?", '"', "<", ">", "|"]:
+                    name = name.replace(char, "_")
+                self.ctf_name = name or "ctf"
+                log("api", "+", f"CTF 名稱: {self.ctf_name}")
+                return self.ctf_name
         except Exception as e:
             log("api", "!", f"無法獲取 CTF 名稱: {e}")
 
@@ -57,24 +154,76 @@ class CTFdClient:
         log("api", "*", f"使用預設名稱: {self.ctf_name}")
         return self.ctf_name
 
-    def fetch_api(self, endpoint, debug=False):
-        """通用 API 請求函數"""
+    def probe_title(self, url):
+        """串流讀取頁面直到 ``</title>`` 為止，回傳標題文字或 None
+
+        只需要標題時不必下載與解析整份 HTML；讀到結束標籤後立即關閉連線。
+        """
+        response = self.get(url, stream=True)
         try:
-            r = self.session.get(f"{self.base_url}{endpoint}", timeout=self.api_timeout)
-            content_type = r.headers.get("Content-Type", "")
+            if response.status_code != 200:
+                return None
+
+            head = b""
+            for chunk in response.iter_content(chunk_size=TITLE_PROBE_CHUNK):
+                head += chunk
+                match = _TITLE_RE.search(head)
+                if match:
+                    break
+                if len(head) >= TITLE_PROBE_LIMIT:
+                    return None
+            else:
+                match = _TITLE_RE.search(head)
+                if not match:
+                    return None
+        finally:
+            response.close()
+
+        # <meta charset> 優先，其次是 Content-Type，最後預設 UTF-8
+        charset = _CHARSET_RE.search(head[: match.start()]) or _CHARSET_RE.search(
+            response.headers.get("Content-Type", "").encode("latin-1", errors="ignore")
+        )
+        encoding = charset.group(1).decode("ascii") if charset else "utf-8"
+        try:
+            text = match.group(1).decode(encoding, errors="replace")
+        except LookupError:
+            text = match.group(1).decode("utf-8", errors="replace")
+        return html.unescape(text).strip() or None
 
-            if r.status_code == 200:
-                if "application/json" in content_type:
-                    return r.json().get("data", None)
-            return None
+    def fetch_api(self, endpoint, debug=False):
+        """通用 API 請求函數，任何錯誤都回傳 None"""
+        try:
+            return self.fetch_data(endpoint)
         except Exception as e:
             if debug:
                 log("api", "!", f"API 請求錯誤 ({endpoint}): {e}")
             return None
 
-    def fetch_all_pages(self, endpoint):
-        """獲取所有分頁資料"""
-        all_data = []
+    def fetch_data(self, endpoint, allow_missing=False):
+        """取得 API 回應的 data 欄位，失敗時拋出例外而不是回傳 None
+
+        讓呼叫端區分「沒有資料」與「請求失敗」，後者可以稍後重試。
+
+        Args:
+            endpoint: API 路徑
+            allow_missing: True 時 403/404 (隱藏、封鎖或已刪除) 回傳 None
+
+        Raises:
+            APIError: 非 200 或非 JSON 回應
+            requests.RequestException: 連線錯誤或逾時
+        """
+        r = self.get(f"{self.base_url}{endpoint}")
+        if r.status_code != 200:
+            if allow_missing and r.status_code in MISSING_STATUS:
+                return None
+            raise APIError(endpoint, r.status_code)
+        if "application/json" not in r.headers.get("Content-Type", ""):
+            raise APIError(endpoint, r.status_code, "非 JSON 回應")
+        with profiling.stage("parse"):
+            return r.json().get("data", None)
+
+    def iter_pages(self, endpoint):
+        """逐頁串流分頁資料，每次只保留一頁在記憶體中"""
         page = 1
 
         while True:
@@ -82,11 +231,13 @@ class CTFdClient:
             if not data:
                 break
 
-            all_data.extend(data)
+            yield from data
 
             if len(data) < 50:
                 break
 
             page += 1
 
-        return all_data
+    def fetch_all_pages(self, endpoint):
+        """獲取所有分頁資料"""
+        return list(self.iter_pages(endpoint))
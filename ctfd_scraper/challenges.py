@@ -4,77 +4,180 @@ import json
 import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from .api_client import MISSING_STATUS
+from .executor import WINDOW_FACTOR, submit_bounded
+from .failures import FailureQueue, describe_error, retry_failed
+from .jsonstream import STREAM_CHUNK_SIZE, iter_json_array
 from .logger import log, print_lock
+from .render import Table, escape_cell, link
+from . import events, profiling, stats, storage
 
 MAX_WORKERS_CHALLENGES = 10
 MAX_WORKERS_FILES = 5
-CHUNK_SIZE = 8192
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+UNKNOWN_SIZE_CHUNK = 1024 * 1024
+THROTTLED_CHUNK_SIZE = 256 * 1024
 PROGRESS_THRESHOLD_MB = 5
 
+SOLVES_TABLE = Table("| Solver | Time |", "|--------|------|")
+INDEX_TABLE = Table("| 題目 | 作者 | 分數 | 解題人數 |", "|------|------|-----:|---------:|")
 
-def download_file(client, f_url, f_name, save_path):
-    """下載單個檔案（支援大檔案串流下載）"""
+
+def pick_chunk_size(total_size):
+    """依檔案大小選擇讀取區塊大小
+
+    小檔一次讀完，大檔約切成 16 塊，並限制在 MIN/MAX 之間。
+    未知長度時使用固定的 1 MB 區塊，確保記憶體用量有上限。
+    """
+    if total_size <= 0:
+        return UNKNOWN_SIZE_CHUNK
+    size = MIN_CHUNK_SIZE
+    while size < MAX_CHUNK_SIZE and size * 16 < total_size:
+        size *= 2
+    return size
+
+
+def _preallocate(f_out, total_size):
+    """預先配置檔案空間以減少碎片，不支援時直接略過"""
+    if total_size <= 0 or not hasattr(os, "posix_fallocate"):
+        return False
+    try:
+        os.posix_fallocate(f_out.fileno(), 0, total_size)
+        return True
+    except OSError:
+        return False
+
+
+def _write_all(write, chunk):
+    """寫入整個區塊；無緩衝檔案的 write 可能只寫入一部分 (例如被訊號中斷)"""
+    n = write(chunk)
+    if n is None or n == len(chunk):
+        return
+    view = memoryview(chunk)[n:]
+    while view:
+        n = write(view)
+        if not n:
+            raise IOError(f"寫入失敗: 剩餘 {len(view)} bytes 無法寫入")
+        view = view[n:]
+
+
+def download_file(client, f_url, f_name, save_path, allow_missing=False):
+    """下載單個檔案（支援大檔案串流下載）
+
+    以 MB 等級的區塊串流寫入無緩衝檔案，每個區塊通常僅一次 write 系統呼叫，
+    只寫入部分時繼續寫入剩餘資料；
+    未提供 content-length 時同樣串流處理，不會將整個檔案載入記憶體。
+    未壓縮的回應會比對實際寫入量與 content-length，不符時視為失敗並刪除檔案。
+
+    Returns:
+        bool: 下載成功與否；allow_missing 為 True 且附件回應 403/404
+            (無權限或已刪除，重試也不會成功) 時回傳 None
+    """
+    target = f"{save_path}/{f_name}"
+    handle = None
+    response = None
     try:
-        response = client.session.get(f_url, timeout=client.file_timeout, stream=True)
+        response = client.get(f_url, timeout=client.file_timeout, stream=True)
+        if allow_missing and response.status_code in MISSING_STATUS:
+            log("file", "!", f"{f_name}: 無權限或不存在 (HTTP {response.status_code})，跳過")
+            return None
         response.raise_for_status()
 
         total_size = int(response.headers.get("content-length", 0))
-
-        with open(f"{save_path}/{f_name}", "wb") as f_out:
-            if total_size > 0:
-                downloaded = 0
-                last_progress = 0
-                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
-                    if chunk:
-                        f_out.write(chunk)
-                        downloaded += len(chunk)
-                        if downloaded - last_progress >= PROGRESS_THRESHOLD_MB * 1024 * 1024:
-                            mb_downloaded = downloaded / (1024 * 1024)
-                            log("file", "*", f"{f_name}: {mb_downloaded:.1f} MB")
-                            last_progress = downloaded
-            else:
-                f_out.write(response.content)
-
-        if total_size > 1024 * 1024:
-            mb_size = total_size / (1024 * 1024)
+        handle = stats.download_start(f_name, total_size)
+        # 有 content-encoding 時 content-length 是壓縮後大小，無法與解碼後的位元組比較
+        encoded = response.headers.get("content-encoding", "identity") != "identity"
+        chunk_size = pick_chunk_size(total_size)
+        limiter = client.bandwidth_limiter
+        if limiter:
+            # 限速時配額在整個區塊讀完後才扣除，大區塊會變成突發後長時間等待；
+            # 以不超過 burst 的小區塊讀取，流量才會平均
+            chunk_size = min(chunk_size, THROTTLED_CHUNK_SIZE, max(1, int(limiter.burst)))
+        progress_step = PROGRESS_THRESHOLD_MB * 1024 * 1024
+        next_progress = progress_step
+
+        # 讀取回應本體計為 fetch，迴圈內的 write 與 throttle 另外計時
+        with storage.open(target, "wb", source=f_url) as f_out, profiling.stage("fetch"):
+            preallocated = _preallocate(f_out, total_size)
+            downloaded = 0
+            write = f_out.write
+            throttle = client.throttle_bytes
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                n = len(chunk)
+                throttle(n)
+                _write_all(write, chunk)
+                stats.download_bytes(handle, n)
+                downloaded += n
+                if downloaded >= next_progress:
+                    log("file", "*", f"{f_name}: {downloaded / (1024 * 1024):.1f} MB")
+                    next_progress = downloaded + progress_step
+
+            if total_size and not encoded and downloaded != total_size:
+                raise IOError(f"檔案不完整: 收到 {downloaded} / {total_size} bytes")
+
+            # 預先配置的大小是壓縮前的 content-length，需截到實際寫入量
+            if preallocated:
+                f_out.truncate(downloaded)
+
+        if downloaded > 1024 * 1024:
+            mb_size = downloaded / (1024 * 1024)
             log("file", "+", f"{f_name} ({mb_size:.1f} MB)")
+        stats.download_end(handle)
         return True
     except Exception as e:
         log("file", "-", f"{f_name}: {e}")
+        if handle is not None:
+            stats.download_end(handle, ok=False)
+        try:
+            storage.remove(target)
+        except Exception:
+            pass
         return False
+    finally:
+        # 錯誤狀態碼或中途失敗時回應未讀完，需關閉以歸還連線 (HTTP/2 為 stream 配額)
+        if response is not None:
+            response.close()
+
+
+def process_challenge(client, chal_data, idx, total, backup_dir, index=None):
+    """處理單個題目的備份，提供 index (SearchIndex) 時一併寫入全文索引
+
+    Returns:
+        dict: 題目摘要；題目隱藏或已刪除時回傳 None (略過)。回應 403/404 的附件
+            不視為失敗，檔名記錄在 ``missing_files``
+
+    Raises:
+        APIError, requests.RequestException, IOError: 請求或附件下載失敗，
+            由 backup_challenges 稍後重試
+    """
+    detail = client.fetch_data(f"/api/v1/challenges/{chal_data['id']}", allow_missing=True)
+    if not detail:
+        log("chal", "!", f"ID {chal_data['id']} 無權限或不存在，跳過")
+        return None
 
+    name = detail["name"].replace("/", "_").strip()
+    category = detail.get("category", "Uncategorized").replace("/", "_").strip()
 
-def process_challenge(client, chal_data, idx, total, backup_dir):
-    """處理單個題目的備份"""
-    try:
-        detail = client.session.get(
-            f"{client.base_url}/api/v1/challenges/{chal_data['id']}", timeout=15
-        ).json()["data"]
-
-        name = detail["name"].replace("/", "_").strip()
-        category = detail.get("category", "Uncategorized").replace("/", "_").strip()
-
-        log("chal", "*", f"{name} | {category} | {detail.get('value', 'N/A')} pts")
+    log("chal", "*", f"{name} | {category} | {detail.get('value', 'N/A')} pts")
 
-        path = f"{backup_dir}/Challenges/{category}/{name}"
-        os.makedirs(path, exist_ok=True)
+    path = f"{backup_dir}/Challenges/{category}/{name}"
+    storage.makedirs(path)
 
-        # 獲取解題紀錄
-        solves_list = []
-        try:
-            solves_url = f"{client.base_url}/api/v1/challenges/{chal_data['id']}/solves"
-            solves_r = client.session.get(solves_url, timeout=15)
-            if solves_r.status_code == 200:
-                solves_data = solves_r.json().get("data", [])
-                for solve in solves_data:
-                    solver_name = solve.get("name", solve.get("user", "Unknown"))
-                    solve_time = solve.get("date", "N/A")
-                    solves_list.append((solver_name, solve_time))
-        except Exception as e:
-            log("chal", "!", f"{name} 無法取得解題紀錄: {e}")
+    # 獲取解題紀錄
+    # 解題紀錄被隱藏 (403/404) 時視為沒有紀錄，其他錯誤讓整個題目稍後重試
+    solves_list = []
+    solves_data = client.fetch_data(
+        f"/api/v1/challenges/{chal_data['id']}/solves", allow_missing=True
+    )
+    for solve in solves_data or []:
+        solver_name = solve.get("name", solve.get("user", "Unknown"))
+        solve_time = solve.get("date", "N/A")
+        solves_list.append((solver_name, solve_time))
 
-        # 存下題目說明
-        desc_content = f"""# {detail['name']}
+    # 存下題目說明
+    with storage.open(f"{path}/description.md", "w") as f:
+        f.write(f"""# {detail['name']}
 
 **Category:** {detail.get('category', 'N/A')}  
 **Points:** {detail.get('value', 'N/A')}  
@@ -86,95 +189,203 @@ def process_challenge(client, chal_data, idx, total, backup_dir):
 
 ## Solves
 
-"""
+""")
 
         if solves_list:
-            desc_content += "| Solver | Time |\n"
-            desc_content += "|--------|------|\n"
-            for solver_name, solve_time in solves_list:
-                desc_content += f"| {solver_name} | {solve_time} |\n"
+            SOLVES_TABLE.write(f, (f"| {who} | {when} |\n" for who, when in solves_list))
         else:
-            desc_content += "No solves yet.\n"
+            f.write("No solves yet.\n")
 
         # 附件清單
-        desc_content += "\n## Files\n\n"
+        f.write("\n## Files\n\n")
         if "files" in detail and detail["files"]:
-            for f_link in detail["files"]:
-                f_name = f_link.split("/")[-1].split("?")[0]
-                desc_content += f"- `{f_name}`\n"
+            f.writelines(
+                f"- `{f_link.split('/')[-1].split('?')[0]}`\n" for f_link in detail["files"]
+            )
         else:
-            desc_content += "No files.\n"
-
-        with open(f"{path}/description.md", "w", encoding="utf-8") as f:
-            f.write(desc_content)
-
-        # 下載附件
-        files_to_download = []
-        if "files" in detail and detail["files"]:
-            log("chal", "*", f"{name} 發現 {len(detail['files'])} 個附件")
-
-            for f_link in detail["files"]:
-                f_url = f"{client.base_url}{f_link.split('?')[0]}"
-                f_name = f_url.split("/")[-1]
-                files_to_download.append((f_url, f_name, path))
-
-            if files_to_download:
-                with ThreadPoolExecutor(
-                    max_workers=min(MAX_WORKERS_FILES, len(files_to_download))
-                ) as file_executor:
-                    file_futures = [
-                        file_executor.submit(download_file, client, f_url, f_name, save_path)
-                        for f_url, f_name, save_path in files_to_download
-                    ]
-                    for future in as_completed(file_futures):
-                        future.result()
-
-        log("chal", "+", f"{name} 備份完成")
-
-        return {
-            "name": detail["name"],
-            "folder_name": name,
-            "category": category,
-            "value": detail.get("value", 0),
-            "solves": len(solves_list),
-            "author": detail.get("author", "Unknown"),
-        }
-
-    except Exception as e:
-        log("chal", "-", f"ID {chal_data.get('id')} 處理失敗: {e}")
-        return None
-
-
-def backup_challenges(client, backup_dir):
-    """備份所有題目"""
+            f.write("No files.\n")
+    written = [os.path.relpath(f"{path}/description.md", backup_dir)]
+
+    # 下載附件
+    files_to_download = []
+    missing_files = []
+    if "files" in detail and detail["files"]:
+        log("chal", "*", f"{name} 發現 {len(detail['files'])} 個附件")
+
+        for f_link in detail["files"]:
+            f_url = f"{client.base_url}{f_link.split('?')[0]}"
+            f_name = f_url.split("/")[-1]
+            files_to_download.append((f_url, f_name, path))
+
+        if files_to_download:
+            with ThreadPoolExecutor(
+                max_workers=min(MAX_WORKERS_FILES, len(files_to_download)),
+                thread_name_prefix="file",
+            ) as file_executor:
+                file_futures = {
+                    file_executor.submit(
+                        download_file, client, f_url, f_name, save_path, allow_missing=True
+                    ): (save_path, f_name)
+                    for f_url, f_name, save_path in files_to_download
+                }
+                failed = 0
+                for future in as_completed(file_futures):
+                    save_path, f_name = file_futures[future]
+                    ok = future.result()
+                    if ok:
+                        written.append(os.path.relpath(f"{save_path}/{f_name}", backup_dir))
+                    elif ok is None:
+                        missing_files.append(f_name)
+                    else:
+                        failed += 1
+            # 只有暫時性錯誤需要重試，403/404 的附件重試也不會成功
+            if failed:
+                raise IOError(f"{failed}/{len(files_to_download)} 個附件下載失敗")
+
+    log("chal", "+", f"{name} 備份完成")
+
+    result = {
+        "id": chal_data["id"],
+        "name": detail["name"],
+        "folder_name": name,
+        "category": category,
+        "value": detail.get("value", 0),
+        "solves": len(solves_list),
+        "author": detail.get("author", "Unknown"),
+        "written": written,
+    }
+    if missing_files:
+        result["missing_files"] = sorted(missing_files)
+    if index:
+        index.add(result, detail.get("description"), [f[1] for f in files_to_download])
+    return result
+
+
+def _index_resumed(index, summaries, backup_dir):
+    """續傳時將 journal 中已完成、但尚未在索引中的題目補進搜尋索引"""
+    if not index or not summaries:
+        return
+    added = index.add_backed_up(summaries, backup_dir)
+    if added:
+        log("chal", "*", f"續傳: 由已備份的說明補建 {added} 個題目的搜尋索引")
+
+
+def backup_challenges(client, backup_dir, journal=None, index=None, filters=None, failures=None):
+    """備份所有題目
+
+    Args:
+        client: CTFdClient
+        backup_dir: 備份目錄
+        journal: Journal，提供時會跳過已完成的題目並記錄新完成的題目
+        index: SearchIndex，提供時建立題目全文索引
+        filters: Filters，不符合的題目在送出任何詳細資料請求前就略過
+        failures: FailureQueue，處理失敗的題目在階段結束時重試，仍失敗者留在佇列中
+    """
     log("chal", "*", "開始備份題目")
 
+    if journal and journal.phase_done("challenges"):
+        success_list = journal.summaries("challenge")
+        log("chal", "+", f"journal 顯示題目已全部完成 ({len(success_list)} 個)，僅重建索引")
+        _index_resumed(index, success_list, backup_dir)
+        generate_challenges_readme(success_list, backup_dir)
+        return success_list
+
     try:
-        r = client.session.get(f"{client.base_url}/api/v1/challenges", timeout=15)
+        r = client.get(f"{client.base_url}/api/v1/challenges", stream=True)
         if r.status_code != 200:
             log("chal", "-", f"無法獲取題目列表，狀態碼：{r.status_code}")
+            r.close()
             return []
     except Exception as e:
         log("chal", "-", f"無法連接到 API: {e}")
         return []
 
-    challenges = r.json()["data"]
-    log("chal", "+", f"找到 {len(challenges)} 個題目")
-    log("chal", "*", f"使用 {MAX_WORKERS_CHALLENGES} 個並行線程")
+    success_list = journal.summaries("challenge") if journal else []
+    if success_list:
+        log("chal", "*", f"續傳: 跳過 {len(success_list)} 個已完成題目")
+        _index_resumed(index, success_list, backup_dir)
+    if failures is None:
+        failures = FailureQueue()
 
-    success_list = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS_CHALLENGES) as executor:
-        futures = {
-            executor.submit(process_challenge, client, chal, idx, len(challenges), backup_dir): chal
-            for idx, chal in enumerate(challenges, 1)
-        }
+    log("chal", "*", f"使用 {MAX_WORKERS_CHALLENGES} 個並行線程")
 
-        for future in as_completed(futures):
+    # 題目列表邊解析邊提交，不需先載入整份回應
+    listing = {"count": 0, "filtered": 0, "queued": 0, "done": False}
+
+    def pending_challenges():
+        for chal in iter_json_array(client.iter_body(r, STREAM_CHUNK_SIZE)):
+            if filters and not filters.keep_challenge(chal):
+                listing["filtered"] += 1
+                continue
+            listing["count"] += 1
+            stats.listed("challenges")
+            if journal and journal.is_done("challenge", chal.get("id")):
+                stats.entity_done("challenges")
+                continue
+            listing["queued"] += 1
+            yield listing["count"], chal
+        listing["done"] = True
+        stats.listing_done("challenges")
+
+    def process(item):
+        idx, chal = item
+        # 列表仍在串流時總數未定，讀完後進度才顯示為 N/本次需處理的總數 (不含續傳略過者)
+        total = listing["queued"] if listing["done"] else None
+        return process_challenge(client, chal, idx, total, backup_dir, index)
+
+    def handle(item, future):
+        _, chal = item
+        try:
             result = future.result()
-            if result:
-                success_list.append(result)
+        except Exception as e:
+            log("chal", "-", f"ID {chal.get('id')} 處理失敗: {describe_error(e)}")
+            failures.add("challenge", item, chal.get("id"), chal.get("name"), e)
+            return
+
+        stats.entity_done("challenges")
+        if not result:
+            if journal:
+                journal.record_entity("challenge", chal.get("id"), None)
+            return
+        success_list.append(result)
+        if journal:
+            journal.record_entity("challenge", result["id"], result, result["written"])
+        events.emit(events.ChallengeRecord(result))
 
-    log("chal", "+", f"題目備份完成！成功 {len(success_list)}/{len(challenges)} 個")
+    try:
+        with ThreadPoolExecutor(
+            max_workers=MAX_WORKERS_CHALLENGES, thread_name_prefix="chal"
+        ) as executor:
+            window = MAX_WORKERS_CHALLENGES * WINDOW_FACTOR
+
+            for item, future in submit_bounded(executor, process, pending_challenges(), window):
+                handle(item, future)
+    finally:
+        # 列表解析失敗時回應未讀完，關閉以歸還連線
+        r.close()
+
+    for item, future in retry_failed(
+        failures, "challenge", process, MAX_WORKERS_CHALLENGES, "chal"
+    ):
+        handle(item, future)
+    unresolved = failures.remaining("challenge")
+    for _ in unresolved:
+        stats.entity_done("challenges", ok=False)
+    if unresolved:
+        log("chal", "-", f"{len(unresolved)} 個題目重試後仍失敗")
+
+    total = listing["count"]
+    log("chal", "+", f"找到 {total} 個題目")
+    if listing["filtered"]:
+        log("chal", "*", f"篩選略過 {listing['filtered']} 個題目")
+    log("chal", "+", f"題目備份完成！成功 {len(success_list)}/{total} 個")
+    # 篩選過的執行不算完成整個階段，之後不加篩選續傳時仍會補齊其餘題目
+    if (
+        journal
+        and journal.done_count("challenge") == total
+        and not (filters and filters.challenge_filtered())
+    ):
+        journal.record_phase("challenges")
 
     # 生成 README
     generate_challenges_readme(success_list, backup_dir)
@@ -197,27 +408,22 @@ def generate_challenges_readme(challenges_list, backup_dir):
         categories[cat].sort(key=lambda x: x["value"])
 
     # 生成 Markdown
-    md_content = "# Challenges\n\n"
-    md_content += f"總計 {len(challenges_list)} 個題目，{len(categories)} 個分類\n\n"
-
-    for cat in sorted(categories.keys()):
-        md_content += f"## {cat}\n\n"
-        md_content += "| 題目 | 作者 | 分數 | 解題人數 |\n"
-        md_content += "|------|------|-----:|---------:|\n"
-
-        for chal in categories[cat]:
-            display_name = chal["name"].replace("|", "\\|")
-            from urllib.parse import quote
-
-            safe_cat = quote(chal["category"])
-            safe_name = quote(chal["folder_name"])
-
-            md_content += f"| [{display_name}](./{safe_cat}/{safe_name}/) | {chal['author']} | {chal['value']} | {chal['solves']} |\n"
-
-        md_content += "\n"
-
     readme_path = f"{backup_dir}/Challenges/README.md"
-    with open(readme_path, "w", encoding="utf-8") as f:
-        f.write(md_content)
+    with storage.open(readme_path, "w") as f:
+        f.write("# Challenges\n\n")
+        f.write(f"總計 {len(challenges_list)} 個題目，{len(categories)} 個分類\n\n")
+
+        for cat in sorted(categories.keys()):
+            f.write(f"## {cat}\n\n")
+            INDEX_TABLE.write(
+                f,
+                (
+                    f"| [{escape_cell(chal['name'])}]"
+                    f"(./{link(chal['category'], chal['folder_name'])}/)"
+                    f" | {chal['author']} | {chal['value']} | {chal['solves']} |\n"
+                    for chal in categories[cat]
+                ),
+            )
+            f.write("\n")
 
     log("chal", "+", "Challenges README.md 已生成")
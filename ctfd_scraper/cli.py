@@ -4,12 +4,14 @@ import argparse
 import os
 import sys
 
-from .api_client import CTFdClient
-from .challenges import backup_challenges
-from .logger import log
-from .scoreboard import backup_scoreboard
-from .teams import backup_teams
-from .users import backup_users
+from .logger import log, rule
+from .filters import parse_ids
+from .ratelimit import parse_rate
+
+UNCOMPRESSED_WARN_BYTES = 1024 * 1024  # Warn when this many API bytes arrive uncompressed
+
+# requests 與各備份模組在 run_backup 內才載入，讓 --help、--version 與參數錯誤
+# 不必付出 HTTP 堆疊的匯入成本
 
 
 def run_backup(config):
@@ -24,9 +26,39 @@ def run_backup(config):
             - backup_challenges, backup_teams, backup_users, backup_scoreboard: 布林值
             - max_workers_*: 並行數量
             - *_timeout: 超時設定
+            - max_rps: 全域每秒請求數上限 (可選)
+            - max_bandwidth: 全域下載頻寬上限 bytes/s (可選)
+            - burst_seconds: 突發容量秒數 (可選)
+            - resume: 依 journal 跳過已完成的實體 (可選)
+            - storage: 儲存後端，"local"、"memory"、"s3://bucket/prefix" 或後端物件 (可選)
+            - s3_endpoint: S3 相容服務端點，例如 MinIO (可選)
+            - search_index: 建立題目全文索引 search.db (可選)
+            - plan: 只估算請求數、資料量與時間，不進行備份 (可選)
+            - dashboard: 以即時面板取代逐行日誌 (可選)
+            - profile: 記錄各階段與步驟的 wall/CPU 時間 (可選)
+            - profile_samples: 取樣分析輸出檔案，folded stacks 格式 (可選)
+            - http2: 以 HTTP/2 多工連線取代每個 worker 各自的連線 (可選)
+            - max_streams: HTTP/2 同時進行的請求上限 (可選)
+            - compress_json: JSON 輸出的壓縮格式，"gzip" 或 "zstd" (可選)
+            - analytics: 由使用者解題紀錄產生 Scoreboard/analytics.json (預設開啟)
+            - categories: 只備份這些分類的題目 (可選)
+            - challenge_ids, team_ids, user_ids: parse_ids 格式的 ID 範圍 (可選)
+            - top: 只備份 Scoreboard 前 N 名的隊伍與使用者 (可選)
+            - brackets: 只備份這些 bracket 的隊伍與使用者，名稱或 ID (可選)
+            - has_solves: 只備份有解題的題目、隊伍與使用者 (可選)
     """
+    from . import challenges, events, profiling, scoreboard, stats, storage, teams, users
+    from .api_client import CTFdClient
+    from .failures import FAILURES_FILE, FailureQueue
+    from .filters import Filters
+    from .journal import Journal
+    from .manifest import Manifest
+    from .render import set_json_compression
+
     log("main", "*", "CTFd Scraper v1.0.0")
-    print("-" * 40)
+    rule()
+    stats.reset()
+    set_json_compression(config.get("compress_json"))
 
     # 初始化客戶端
     client = CTFdClient(
@@ -34,8 +66,28 @@ def run_backup(config):
         session_cookie=config["session"],
         api_timeout=config.get("api_timeout", 15),
         file_timeout=config.get("file_timeout", 60),
+        max_rps=config.get("max_rps"),
+        max_bandwidth=config.get("max_bandwidth"),
+        burst_seconds=config.get("burst_seconds", 1.0),
+        http2=config.get("http2", False),
+        max_streams=config.get("max_streams"),
     )
 
+    if config.get("http2"):
+        log("main", "*", f"HTTP/2 傳輸，同時請求上限 {client.session.max_streams}")
+    # requests 與 httpx 在安裝 brotli / zstandard 時會自動加入 br、zstd
+    log("main", "*", f"Accept-Encoding: {client.session.headers.get('Accept-Encoding')}")
+    if config.get("compress_json"):
+        log("main", "*", f"JSON 輸出以 {config['compress_json']} 壓縮")
+    if config.get("max_rps"):
+        log("main", "*", f"請求速率上限: {config['max_rps']} req/s")
+    if config.get("max_bandwidth"):
+        log("main", "*", f"頻寬上限: {config['max_bandwidth'] / (1024 * 1024):.2f} MB/s")
+
+    filters = Filters.from_config(config)
+    if filters:
+        log("main", "*", f"篩選條件: {filters.describe()}")
+
     # 取得或設定 CTF 名稱
     if config.get("ctf_name"):
         ctf_name = config["ctf_name"]
@@ -43,6 +95,12 @@ def run_backup(config):
     else:
         ctf_name = client.get_ctf_name()
 
+    if config.get("plan"):
+        from .planner import plan_backup, print_plan
+
+        print_plan(plan_backup(client, config, filters))
+        return
+
     # 設定備份目錄
     output_dir = config.get("output_dir", ".")
     backup_dir = os.path.join(output_dir, f"{ctf_name}_backup")
@@ -51,32 +109,181 @@ def run_backup(config):
     os.makedirs(backup_dir, exist_ok=True)
 
     # 更新配置到模組
-    from . import challenges, teams, users
-
     challenges.MAX_WORKERS_CHALLENGES = config.get("max_workers_challenges", 10)
     challenges.MAX_WORKERS_FILES = config.get("max_workers_files", 5)
     teams.MAX_WORKERS_TEAMS = config.get("max_workers_teams", 20)
     users.MAX_WORKERS_TEAMS = config.get("max_workers_teams", 20)
 
-    # 依序備份各項資料
-    if config.get("backup_scoreboard", True):
-        backup_scoreboard(client, backup_dir)
+    # 設定儲存後端；journal 需要 fsync，一律寫在本機備份目錄
+    backend = config.get("storage") or "local"
+    if isinstance(backend, str):
+        backend = storage.from_url(backend, endpoint_url=config.get("s3_endpoint"))
+    storage.set_backend(backend)
+    if not isinstance(backend, storage.LocalStorage):
+        log("main", "*", f"儲存後端: {type(backend).__name__}")
+
+    # 依序備份各項資料，journal 記錄進度供中斷後續傳
+    journal = Journal(backup_dir, resume=config.get("resume", False))
+    # 每個寫入的檔案在串流時計算雜湊，完成後寫出 manifest
+    manifest = Manifest(backup_dir, journal)
+
+    def observe(path, size, sha256, source):
+        manifest.record(path, size, sha256, source)
+        # 只有附件下載帶有來源 URL
+        if source:
+            events.emit(events.AttachmentWritten(path, size, sha256, source))
+
+    storage.set_observer(observe)
+    # 各階段重試後仍失敗的實體，結束時寫出 failures.json
+    failures = FailureQueue()
+
+    dashboard = None
+    if config.get("dashboard") and not sys.stderr.isatty():
+        log("main", "!", "stderr 不是終端機，停用即時面板")
+    elif config.get("dashboard"):
+        from .dashboard import Dashboard
+
+        dashboard = Dashboard()
+        dashboard.start()
+
+    sampler = None
+    if config.get("profile") or config.get("profile_samples"):
+        profiling.enable()
+        if config.get("profile_samples"):
+            sampler = profiling.Sampler(config["profile_samples"])
+            sampler.start()
+    try:
+        if config.get("backup_scoreboard", True):
+            with stats.phase("scoreboard"):
+                scoreboard.backup_scoreboard(client, backup_dir, journal=journal)
+
+        if config.get("backup_challenges", True):
+            index = None
+            if config.get("search_index"):
+                from .search import SearchIndex
+
+                # 與 journal 相同，SQLite 索引一律寫在本機備份目錄
+                index = SearchIndex(backup_dir, ctf_name)
+            try:
+                with stats.phase("challenges"):
+                    challenges.backup_challenges(
+                        client,
+                        backup_dir,
+                        journal=journal,
+                        index=index,
+                        filters=filters,
+                        failures=failures,
+                    )
+            finally:
+                if index:
+                    index.close()
+
+        if config.get("backup_teams", True):
+            with stats.phase("teams"):
+                teams.backup_teams(
+                    client, backup_dir, journal=journal, filters=filters, failures=failures
+                )
+
+        if config.get("backup_users", True):
+            solves = None
+            if config.get("analytics", True):
+                from .analytics import SolveTable, write_analytics
+
+                solves = SolveTable()
+            with stats.phase("users"):
+                users.backup_users(
+                    client,
+                    backup_dir,
+                    journal=journal,
+                    analytics=solves,
+                    filters=filters,
+                    failures=failures,
+                )
+            if solves is not None:
+                with stats.phase("analytics"):
+                    write_analytics(solves, backup_dir)
+
+        manifest.write()
+        log_transfers(stats.snapshot()["transfers"])
+        remaining = failures.write(backup_dir)
+        if remaining:
+            log(
+                "main",
+                "!",
+                f"{remaining} 個項目重試後仍失敗，清單見 {FAILURES_FILE}；可用 --resume 補齊",
+            )
+    finally:
+        if dashboard:
+            dashboard.stop()
+        if sampler:
+            samples = sampler.stop()
+            log("main", "*", f"取樣分析已寫入 {sampler.path} ({samples} 次取樣)")
+        if config.get("profile") or config.get("profile_samples"):
+            profiling.disable()
+            profiling.print_report(profiling.report())
+        storage.set_observer(None)
+        journal.close()
+        storage.flush()
+
+    rule()
+    log("main", "+", "所有備份作業完成")
 
-    if config.get("backup_challenges", True):
-        backup_challenges(client, backup_dir)
 
-    if config.get("backup_teams", True):
-        backup_teams(client, backup_dir)
+def log_transfers(transfers):
+    """輸出 API 回應依 Content-Encoding 分類的線上與解碼後位元組數"""
+    for encoding, t in sorted(transfers.items()):
+        wire_mb = t["wire"] / (1024 * 1024)
+        decoded_mb = t["decoded"] / (1024 * 1024)
+        line = f"傳輸 {encoding}: {t['responses']} 個回應，線上 {wire_mb:.2f} MB"
+        if encoding != "identity" and t["decoded"]:
+            saved = 1 - t["wire"] / t["decoded"]
+            line += f"，解碼後 {decoded_mb:.2f} MB (節省 {saved:.0%})"
+        log("main", "*", line)
 
-    if config.get("backup_users", True):
-        backup_users(client, backup_dir)
+    plain = transfers.get("identity")
+    if plain and plain["decoded"] >= UNCOMPRESSED_WARN_BYTES:
+        log(
+            "main",
+            "!",
+            f"{plain['responses']} 個 API 回應未壓縮 ({plain['decoded'] / (1024 * 1024):.2f} MB)，"
+            "伺服器或反向代理可能未啟用 gzip",
+        )
+
+
+def verify_command(argv):
+    from .manifest import verify_main
+
+    verify_main(argv)
 
-    print("-" * 40)
-    log("main", "+", "所有備份作業完成")
 
+def search_command(argv):
+    from .search import search_main
 
-def main():
+    search_main(argv)
+
+
+def diff_command(argv):
+    from .diff import diff_main
+
+    diff_main(argv)
+
+
+# 第一個參數為子命令名稱時轉交對應的處理函數，其餘情況執行備份
+SUBCOMMANDS = {
+    "verify": verify_command,
+    "search": search_command,
+    "diff": diff_command,
+}
+
+
+def main(argv=None):
     """CLI entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in SUBCOMMANDS:
+        SUBCOMMANDS[argv[0]](argv[1:])
+        return
+
     parser = argparse.ArgumentParser(
         prog="ctfdscraper",
         description="High-performance CTFd competition backup tool",
@@ -97,6 +304,26 @@ Examples:
   
   # Specify max workers for parallel processing
   ctfdscraper -u https://ctf.example.com -s cookie --max-workers-chal 15
+
+  # Write the backup straight to an S3-compatible bucket
+  ctfdscraper -u https://ctf.example.com -s cookie --storage s3://archive/ctfs
+
+  # Estimate requests, bytes and duration before a big pull
+  ctfdscraper -u https://ctf.example.com -s cookie --plan --max-workers-chal 20
+
+  # Resume an interrupted backup, skipping finished entities
+  ctfdscraper -u https://ctf.example.com -s cookie --resume
+
+  # Find out where a slow run spends its time and write a flame graph input
+  ctfdscraper -u https://ctf.example.com -s cookie --profile-samples backup.folded
+
+  # Stay under 5 requests/s and 2 MB/s across all workers
+  ctfdscraper -u https://ctf.example.com -s cookie --max-rps 5 --max-bandwidth 2M
+
+Subcommands:
+  ctfdscraper verify BACKUP_DIR   Re-hash a backup and compare it with MANIFEST.sha256
+  ctfdscraper search QUERY [DIR]  Search challenge indexes built with --search-index
+  ctfdscraper diff OLD NEW        Changelog between two backups of the same CTF
         """,
     )
 
@@ -121,6 +348,56 @@ Examples:
         help="Output directory for backup (default: current directory)",
     )
 
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted backup using the journal in the backup directory",
+    )
+
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry run: list entities, probe attachment sizes and estimate requests, "
+        "bytes and duration without backing up",
+    )
+
+    parser.add_argument(
+        "--dashboard",
+        action="store_true",
+        help="Show a live progress dashboard (throughput, ETA, active downloads) "
+        "instead of per-entity log lines",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report wall and CPU time per phase and per stage (fetch, parse, render, write)",
+    )
+
+    parser.add_argument(
+        "--profile-samples",
+        metavar="FILE",
+        help="Also sample all thread stacks and write folded stacks to FILE "
+        "(speedscope, flamegraph.pl); implies --profile",
+    )
+
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="Build a full-text search index (search.db) over challenges",
+    )
+
+    parser.add_argument(
+        "--storage",
+        default="local",
+        help="Storage backend: local or s3://bucket/prefix (default: local)",
+    )
+
+    parser.add_argument(
+        "--s3-endpoint",
+        help="Endpoint URL for S3-compatible stores such as MinIO (e.g., http://localhost:9000)",
+    )
+
     # Selective backup options
     backup_group = parser.add_argument_group("backup selection")
     backup_group.add_argument("--no-chal", action="store_true", help="Skip challenges backup")
@@ -131,12 +408,64 @@ Examples:
 
     backup_group.add_argument("--no-scoreboard", action="store_true", help="Skip scoreboard backup")
 
+    backup_group.add_argument(
+        "--no-analytics",
+        action="store_true",
+        help="Skip first-blood, score-curve and category analytics over user solves",
+    )
+
     backup_group.add_argument(
         "--only-chal",
         action="store_true",
         help="Only backup challenges (skip teams, users, scoreboard)",
     )
 
+    # Selective sync filters
+    filter_group = parser.add_argument_group(
+        "filters (applied to listings before any detail request)"
+    )
+    filter_group.add_argument(
+        "--category",
+        action="append",
+        metavar="NAME",
+        help="Only back up challenges in this category (repeatable, case-insensitive)",
+    )
+
+    filter_group.add_argument(
+        "--chal-ids",
+        type=parse_ids,
+        metavar="RANGES",
+        help="Only these challenge IDs, e.g. 1-50,72,100-",
+    )
+
+    filter_group.add_argument(
+        "--team-ids", type=parse_ids, metavar="RANGES", help="Only these team IDs"
+    )
+
+    filter_group.add_argument(
+        "--user-ids", type=parse_ids, metavar="RANGES", help="Only these user IDs"
+    )
+
+    filter_group.add_argument(
+        "--top",
+        type=int,
+        metavar="N",
+        help="Only the top N scoreboard accounts (and their members in team mode)",
+    )
+
+    filter_group.add_argument(
+        "--bracket",
+        action="append",
+        metavar="NAME_OR_ID",
+        help="Only teams/users in this bracket (repeatable)",
+    )
+
+    filter_group.add_argument(
+        "--has-solves",
+        action="store_true",
+        help="Skip unsolved challenges and accounts without a score",
+    )
+
     # Performance tuning
     perf_group = parser.add_argument_group("performance tuning")
     perf_group.add_argument(
@@ -160,6 +489,50 @@ Examples:
         help="Maximum concurrent files per challenge (default: 5)",
     )
 
+    perf_group.add_argument(
+        "--http2",
+        action="store_true",
+        help="Multiplex all requests over a few HTTP/2 connections (requires httpx[http2])",
+    )
+
+    perf_group.add_argument(
+        "--compress-json",
+        choices=["gzip", "zstd"],
+        default=None,
+        help="Store team/user/ranking JSON compressed as .json.gz or .json.zst "
+        "(zstd requires zstandard)",
+    )
+
+    perf_group.add_argument(
+        "--max-streams",
+        type=int,
+        default=None,
+        help="Maximum concurrent HTTP/2 requests (default: 100)",
+    )
+
+    # Rate limiting
+    rate_group = parser.add_argument_group("rate limiting")
+    rate_group.add_argument(
+        "--max-rps",
+        type=float,
+        default=None,
+        help="Maximum HTTP requests per second across all workers (default: unlimited)",
+    )
+
+    rate_group.add_argument(
+        "--max-bandwidth",
+        type=parse_rate,
+        default=None,
+        help="Maximum download bandwidth in bytes/s, accepts K/M/G suffixes (default: unlimited)",
+    )
+
+    rate_group.add_argument(
+        "--burst",
+        type=float,
+        default=1.0,
+        help="Burst allowance in seconds of rate for both limiters (default: 1.0)",
+    )
+
     # Timeout settings
     timeout_group = parser.add_argument_group("timeout settings")
     timeout_group.add_argument(
@@ -176,7 +549,7 @@ Examples:
     # Version
     parser.add_argument("-v", "--version", action="version", version="%(prog)s 1.0.0")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # Process --only-chal flag
     if args.only_chal:
@@ -197,6 +570,22 @@ Examples:
         log("cli", "-", "max-workers-file must be between 1 and 20")
         sys.exit(1)
 
+    if args.max_streams is not None and args.max_streams < 1:
+        log("cli", "-", "max-streams must be at least 1")
+        sys.exit(1)
+
+    if args.top is not None and args.top < 1:
+        log("cli", "-", "top must be at least 1")
+        sys.exit(1)
+
+    if args.max_rps is not None and args.max_rps <= 0:
+        log("cli", "-", "max-rps must be greater than 0")
+        sys.exit(1)
+
+    if args.burst <= 0:
+        log("cli", "-", "burst must be greater than 0")
+        sys.exit(1)
+
     # Build configuration
     config = {
         "url": args.url,
@@ -212,12 +601,34 @@ Examples:
         "max_workers_files": args.max_workers_file,
         "api_timeout": args.api_timeout,
         "file_timeout": args.file_timeout,
+        "max_rps": args.max_rps,
+        "max_bandwidth": args.max_bandwidth,
+        "burst_seconds": args.burst,
+        "resume": args.resume,
+        "storage": args.storage,
+        "s3_endpoint": args.s3_endpoint,
+        "search_index": args.search_index,
+        "plan": args.plan,
+        "dashboard": args.dashboard,
+        "profile": args.profile,
+        "profile_samples": args.profile_samples,
+        "http2": args.http2,
+        "max_streams": args.max_streams,
+        "compress_json": args.compress_json,
+        "analytics": not args.no_analytics,
+        "categories": args.category,
+        "challenge_ids": args.chal_ids,
+        "team_ids": args.team_ids,
+        "user_ids": args.user_ids,
+        "top": args.top,
+        "brackets": args.bracket,
+        "has_solves": args.has_solves,
     }
 
     try:
         run_backup(config)
     except KeyboardInterrupt:
-        log("cli", "!", "Backup interrupted by user")
+        log("cli", "!", "Backup interrupted by user (rerun with --resume to continue)")
         sys.exit(130)
     except Exception as e:
         log("cli", "-", f"Unexpected error: {e}")
@@ -19,5 +19,6 @@ API_TIMEOUT = 15
 FILE_TIMEOUT = 60
 
 # File download settings
-CHUNK_SIZE = 8192
+MIN_CHUNK_SIZE = 256 * 1024  # Adaptive chunk size lower bound
+MAX_CHUNK_SIZE = 8 * 1024 * 1024  # Adaptive chunk size upper bound
 PROGRESS_THRESHOLD_MB = 5  # Show progress every N MB
@@ -0,0 +1,145 @@
+"""Live terminal dashboard fed from the shared progress counters."""
+
+import collections
+import shutil
+import sys
+import threading
+
+from . import logger, stats
+
+REFRESH_INTERVAL = 0.5  # Seconds between redraws
+RATE_WINDOW = 5.0  # Seconds of history used for rates and ETA
+MAX_DOWNLOAD_ROWS = 8
+MAX_ISSUE_ROWS = 5
+
+
+def _format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def _format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class Dashboard:
+    """以固定頻率重繪的進度面板
+
+    只讀取 ``stats.snapshot()``，worker 端不需要任何輸出；執行期間 log() 的
+    一般訊息會被略過，警告與錯誤保留最近幾筆顯示在面板下方。
+
+    Args:
+        stream: 輸出目標，預設 stderr
+        interval: 重繪間隔（秒）
+    """
+
+    def __init__(self, stream=None, interval=REFRESH_INTERVAL):
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.issues = collections.deque(maxlen=MAX_ISSUE_ROWS)
+        self._history = collections.deque()
+        self._lines = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sink(self, tag, level, message):
+        if level in ("-", "!"):
+            self.issues.append(f"[{level}] [{tag}] {message}")
+
+    def start(self):
+        logger.set_sink(self._sink)
+        self._thread = threading.Thread(target=self._run, name="dashboard", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止重繪並畫出最終狀態，恢復一般日誌輸出"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.draw()
+        logger.set_sink(None)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.draw()
+
+    def _rates(self, snap):
+        """以 RATE_WINDOW 內最舊的樣本計算 req/s、bytes/s 與各階段完成速率"""
+        done = {name: p["done"] + p["failed"] for name, p in snap["phases"].items()}
+        self._history.append((snap["now"], snap["requests"], snap["bytes"], done))
+        while len(self._history) > 1 and snap["now"] - self._history[0][0] > RATE_WINDOW:
+            self._history.popleft()
+
+        then, requests, received, then_done = self._history[0]
+        elapsed = snap["now"] - then
+        if elapsed <= 0:
+            return 0.0, 0.0, {}
+        phase_rates = {
+            name: (count - then_done.get(name, 0)) / elapsed for name, count in done.items()
+        }
+        req_rate = (snap["requests"] - requests) / elapsed
+        return req_rate, (snap["bytes"] - received) / elapsed, phase_rates
+
+    def render(self, snap):
+        """產生面板文字行"""
+        req_rate, byte_rate, phase_rates = self._rates(snap)
+        errors = snap["download_errors"] + sum(p["failed"] for p in snap["phases"].values())
+        lines = [
+            f"CTFd Scraper  {_format_duration(snap['now'] - snap['started'])}  "
+            f"requests {snap['requests']} ({req_rate:.1f}/s)  "
+            f"downloaded {_format_bytes(snap['bytes'])} ({_format_bytes(byte_rate)}/s)  "
+            f"errors {errors}",
+            f"  {'phase':<12}{'done':>8}{'failed':>8}{'listed':>9}{'rate':>9}{'ETA':>9}",
+        ]
+
+        for name, p in snap["phases"].items():
+            if p["finished"] is not None:
+                took = _format_duration(p["finished"] - p["started"])
+                lines.append(
+                    f"  {name:<12}{p['done']:>8}{p['failed']:>8}{p['listed']:>9}"
+                    f"{'':>9}{'done ' + took:>9}"
+                )
+                continue
+            rate = phase_rates.get(name, 0.0)
+            remaining = p["listed"] - p["done"] - p["failed"]
+            if rate > 0:
+                eta = _format_duration(remaining / rate)
+                # 清單仍在串流時總數未知，ETA 只是下限
+                eta = eta if p["listing_done"] else f">{eta}"
+            else:
+                eta = "-"
+            listed = f"{p['listed']}" if p["listing_done"] else f"{p['listed']}+"
+            lines.append(
+                f"  {name:<12}{p['done']:>8}{p['failed']:>8}{listed:>9}{rate:>7.1f}/s{eta:>9}"
+            )
+
+        downloads = sorted(snap["downloads"], key=lambda d: d["total"], reverse=True)
+        if downloads:
+            lines.append(f"  active downloads: {len(downloads)}")
+            for d in downloads[:MAX_DOWNLOAD_ROWS]:
+                elapsed = max(snap["now"] - d["started"], 1e-6)
+                total = _format_bytes(d["total"]) if d["total"] else "?"
+                lines.append(
+                    f"    {d['name'][:32]:<32} {_format_bytes(d['received']):>10} / {total:<10}"
+                    f" {_format_bytes(d['received'] / elapsed)}/s"
+                )
+
+        if self.issues:
+            lines.append("  recent issues:")
+            lines.extend(f"    {issue}" for issue in list(self.issues))
+        return lines
+
+    def draw(self):
+        width = shutil.get_terminal_size().columns
+        lines = [line[: width - 1] for line in self.render(stats.snapshot())]
+        # 游標回到上一次面板的第一行並清除到畫面底部後重畫
+        prefix = f"\x1b[{self._lines}F\x1b[J" if self._lines else ""
+        with logger.print_lock:
+            self.stream.write(prefix + "\n".join(lines) + "\n")
+            self.stream.flush()
+        self._lines = len(lines)
@@ -0,0 +1,446 @@
+"""Snapshot diff between two backups of the same CTF and the diff command.
+
+Instead of walking and reading every file, a backup is summarised from the
+records it already has: the journal's per-entity summaries, the manifest's
+file hashes and the ranking JSON. Comparing two backups therefore costs time
+proportional to the number of entities and files, not bytes. The only
+content read is the ``user_info.json`` (or ``team_info.json``) of accounts
+whose hash changed, to list the individual solves that were added.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from .journal import JOURNAL_FILE, id_key, iter_records
+from .logger import log
+from .manifest import MANIFEST_FILE, MANIFEST_JSON
+from .render import JSON_SUFFIXES, Table, dumps_json, escape_cell, load_json, write_lines
+
+DIFF_JSON = "diff.json"
+DIFF_MD = "DIFF.md"
+
+# journal 實體類別與輸出區段名稱
+KINDS = (("challenge", "challenges"), ("team", "teams"), ("user", "users"))
+LABELS = {"challenge": "題目", "team": "隊伍", "user": "使用者"}
+IGNORED_FIELDS = {"written"}  # Summary fields that only mirror file paths
+
+SUMMARY_TABLE = Table("| 項目 | 新增 | 移除 | 變更 |", "|------|-----:|-----:|-----:|")
+SOLVES_TABLE = Table("| 帳號 | 題目 | 時間 |", "|------|------|------|")
+RANKING_TABLE = Table("| 名稱 | 排名 | 分數 |", "|------|------|------|")
+
+
+class Snapshot:
+    """一個備份目錄的實體摘要、檔案雜湊與排名
+
+    只讀取 journal、manifest 與 Scoreboard/team_ranking.json，不讀取其他檔案。
+
+    Args:
+        backup_dir: 備份目錄 (含 .journal.jsonl 或 manifest.json 的目錄)
+    """
+
+    def __init__(self, backup_dir):
+        self.backup_dir = backup_dir
+        self.entities = {kind: {} for kind, _ in KINDS}  # kind -> {id: journal 紀錄}
+        self.files = {}  # 相對路徑 -> sha256
+        self.ranking = {}  # account_id -> team_ranking.json 的一列
+        journal_files = self._load_journal()
+        self._load_files(journal_files)
+        self._load_ranking()
+        self._folders = None
+
+    def empty(self):
+        return not self.files and not any(self.entities.values())
+
+    def _load_journal(self):
+        path = os.path.join(self.backup_dir, JOURNAL_FILE)
+        files = {}
+        if not os.path.exists(path):
+            log("diff", "!", f"{self.backup_dir} 沒有 {JOURNAL_FILE}，只比較檔案與排名")
+            return files
+        for record in iter_records(path):
+            if record.get("type") == "entity" and record.get("kind") in self.entities:
+                entities = self.entities[record["kind"]]
+                # 略過的實體 (無解題、無權限) 沒有摘要，視為不在備份中
+                if record.get("summary") is None:
+                    entities.pop(record["id"], None)
+                else:
+                    entities[record["id"]] = record
+            elif record.get("type") == "file":
+                files[record["path"]] = record["sha256"]
+        return files
+
+    def _load_files(self, journal_files):
+        """依序嘗試 manifest.json、MANIFEST.sha256 與 journal 的檔案紀錄"""
+        manifest_json = os.path.join(self.backup_dir, MANIFEST_JSON)
+        manifest_file = os.path.join(self.backup_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_json):
+            with open(manifest_json, encoding="utf-8") as f:
+                entries = json.load(f).get("files", {})
+            self.files = {path: e["sha256"] for path, e in entries.items()}
+        elif os.path.exists(manifest_file):
+            with open(manifest_file, encoding="utf-8") as f:
+                for line in f:
+                    sha256, sep, path = line.rstrip("\n").partition("  ")
+                    if sep:
+                        self.files[path] = sha256
+        else:
+            self.files = journal_files
+
+    def _load_ranking(self):
+        for suffix in JSON_SUFFIXES.values():
+            path = os.path.join(self.backup_dir, "Scoreboard", f"team_ranking.json{suffix}")
+            if os.path.exists(path):
+                for row in load_json(path):
+                    self.ranking[row.get("account_id")] = row
+                return
+
+    def folder_files(self, folder):
+        """資料夾內直接包含的檔案 {檔名: sha256}，第一次呼叫時一次建立全部資料夾的索引"""
+        if self._folders is None:
+            self._folders = {}
+            for path, sha256 in self.files.items():
+                parent, _, name = path.rpartition("/")
+                self._folders.setdefault(parent, {})[name] = sha256
+        return self._folders.get(folder, {})
+
+    def info_path(self, record):
+        """team_info.json / user_info.json 的完整路徑，written 的第一項即為此檔"""
+        written = record.get("written") or []
+        return os.path.join(self.backup_dir, written[0]) if written else None
+
+
+def _folder(record):
+    written = record.get("written") or []
+    return written[0].replace(os.sep, "/").rpartition("/")[0] if written else None
+
+
+def _diff_fields(old, new):
+    """摘要欄位的差異 {欄位: [舊, 新]}"""
+    return {
+        key: [old.get(key), new.get(key)]
+        for key in sorted(set(old) | set(new))
+        if key not in IGNORED_FIELDS and old.get(key) != new.get(key)
+    }
+
+
+def _diff_hashes(old, new):
+    """比較兩個 {名稱: sha256}，回傳 added / removed / changed 排序清單"""
+    return {
+        "added": sorted(new.keys() - old.keys()),
+        "removed": sorted(old.keys() - new.keys()),
+        "changed": sorted(k for k in old.keys() & new.keys() if old[k] != new[k]),
+    }
+
+
+def _has_changes(changes):
+    return any(changes.values())
+
+
+def diff_entities(old, new, kind):
+    """比較一類實體：新增、移除，以及摘要欄位或資料夾內檔案有變動者"""
+    before, after = old.entities[kind], new.entities[kind]
+    changed = []
+    for entity_id in sorted(before.keys() & after.keys(), key=id_key):
+        fields = _diff_fields(before[entity_id]["summary"], after[entity_id]["summary"])
+        # 改名時資料夾不同，依各自的資料夾比較檔名
+        files = _diff_hashes(
+            old.folder_files(_folder(before[entity_id])),
+            new.folder_files(_folder(after[entity_id])),
+        )
+        if fields or _has_changes(files):
+            changed.append(
+                {
+                    "id": entity_id,
+                    "name": after[entity_id]["summary"].get("name"),
+                    "fields": fields,
+                    "files": files,
+                }
+            )
+    return {
+        "added": [after[i]["summary"] for i in sorted(after.keys() - before.keys(), key=id_key)],
+        "removed": [before[i]["summary"] for i in sorted(before.keys() - after.keys(), key=id_key)],
+        "changed": changed,
+    }
+
+
+def _solve_keys(path):
+    info = load_json(path) if path and os.path.exists(path) else {}
+    return {(s.get("challenge_id"), s.get("date")): s for s in info.get("solves", [])}
+
+
+def diff_solves(old, new, entity_changes):
+    """列出新增與消失的解題，只讀取內容有變動或新增帳號的 info JSON
+
+    使用者備份存在時以使用者為單位，否則使用隊伍的解題紀錄。
+    """
+    kind = "user" if old.entities["user"] or new.entities["user"] else "team"
+    changes = entity_changes[kind]
+    info_name = f"{kind}_info.json"
+    solves = {"kind": kind, "new": [], "removed": []}
+
+    def collect(target, entity_id, name, keys):
+        for key, solve in keys.items():
+            target.append(
+                {
+                    "id": entity_id,
+                    "name": name,
+                    "challenge_id": key[0],
+                    "challenge": solve.get("challenge", "Unknown"),
+                    "date": key[1],
+                }
+            )
+
+    for summary in changes["added"]:
+        record = new.entities[kind][summary["id"]]
+        collect(solves["new"], summary["id"], summary["name"], _solve_keys(new.info_path(record)))
+
+    # 沒有檔案雜湊時無法判斷 info JSON 是否變動，改以分數變動為依據
+    hashed = bool(old.files and new.files)
+    for entry in changes["changed"]:
+        if hashed:
+            touched = any(name.startswith(info_name) for name in entry["files"]["changed"])
+        else:
+            touched = "score" in entry["fields"]
+        if not touched:
+            continue
+        before = _solve_keys(old.info_path(old.entities[kind][entry["id"]]))
+        after = _solve_keys(new.info_path(new.entities[kind][entry["id"]]))
+        collect(
+            solves["new"],
+            entry["id"],
+            entry["name"],
+            {k: after[k] for k in after.keys() - before.keys()},
+        )
+        collect(
+            solves["removed"],
+            entry["id"],
+            entry["name"],
+            {k: before[k] for k in before.keys() - after.keys()},
+        )
+
+    for key in ("new", "removed"):
+        solves[key].sort(key=lambda s: (str(s["date"]), id_key(s["id"]), id_key(s["challenge_id"])))
+    return solves
+
+
+def diff_ranking(old, new):
+    """比較 team_ranking.json：名次或分數變動、新進榜與離榜的帳號"""
+    before, after = old.ranking, new.ranking
+    moves = [
+        {
+            "id": account_id,
+            "name": after[account_id].get("name"),
+            "pos": [before[account_id].get("pos"), after[account_id].get("pos")],
+            "score": [before[account_id].get("score"), after[account_id].get("score")],
+        }
+        for account_id in before.keys() & after.keys()
+        if before[account_id].get("pos") != after[account_id].get("pos")
+        or before[account_id].get("score") != after[account_id].get("score")
+    ]
+    moves.sort(key=lambda m: (m["pos"][1] is None, m["pos"][1] or 0))
+
+    def rows(ranking, ids):
+        return sorted(
+            (
+                {
+                    "id": i,
+                    "name": ranking[i].get("name"),
+                    "pos": ranking[i].get("pos"),
+                    "score": ranking[i].get("score"),
+                }
+                for i in ids
+            ),
+            key=lambda r: (r["pos"] is None, r["pos"] or 0),
+        )
+
+    return {
+        "moves": moves,
+        "entered": rows(after, after.keys() - before.keys()),
+        "left": rows(before, before.keys() - after.keys()),
+    }
+
+
+def diff_backups(old_dir, new_dir):
+    """比較兩個備份目錄，回傳可直接寫成 diff.json 的 dict
+
+    Raises:
+        ValueError: 任一目錄沒有 journal、manifest 可供比較
+    """
+    old, new = Snapshot(old_dir), Snapshot(new_dir)
+    for snapshot in (old, new):
+        if snapshot.empty():
+            raise ValueError(f"{snapshot.backup_dir} 中找不到 {JOURNAL_FILE} 或 manifest")
+
+    entity_changes = {kind: diff_entities(old, new, kind) for kind, _ in KINDS}
+    result = {"old": old_dir, "new": new_dir}
+    for kind, section in KINDS:
+        result[section] = entity_changes[kind]
+    result["solves"] = diff_solves(old, new, entity_changes)
+    result["ranking"] = diff_ranking(old, new)
+    result["files"] = _diff_hashes(old.files, new.files)
+
+    summary = {
+        section: {key: len(result[section][key]) for key in ("added", "removed", "changed")}
+        for _, section in KINDS
+    }
+    summary["files"] = {key: len(paths) for key, paths in result["files"].items()}
+    summary["new_solves"] = len(result["solves"]["new"])
+    summary["removed_solves"] = len(result["solves"]["removed"])
+    summary["ranking_moves"] = len(result["ranking"]["moves"])
+    result["summary"] = summary
+    return result
+
+
+def _describe_change(entry):
+    """一個變動實體的單行說明"""
+    parts = [f"{key} {old} → {new}" for key, (old, new) in entry["fields"].items()]
+    for key, label in (("added", "新增"), ("changed", "更新"), ("removed", "移除")):
+        if entry["files"][key]:
+            parts.append(f"{label}檔案 {', '.join(entry['files'][key])}")
+    return "；".join(parts)
+
+
+def write_diff_readme(result, path):
+    """將 diff_backups() 的結果寫成 Markdown 變更紀錄"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Backup Diff\n\n")
+        f.write(f"- 舊備份: `{result['old']}`\n- 新備份: `{result['new']}`\n\n")
+
+        summary = result["summary"]
+        f.write("## 摘要\n\n")
+        SUMMARY_TABLE.write(
+            f,
+            (
+                f"| {label} | {summary[section]['added']} | {summary[section]['removed']}"
+                f" | {summary[section]['changed']} |\n"
+                for label, section in [(LABELS[k], s) for k, s in KINDS] + [("檔案", "files")]
+            ),
+        )
+        f.write(
+            f"\n新解題 {summary['new_solves']} 筆，消失的解題 {summary['removed_solves']} 筆，"
+            f"排名變動 {summary['ranking_moves']} 個帳號\n"
+        )
+
+        for kind, section in KINDS:
+            changes = result[section]
+            if not any(changes.values()):
+                continue
+            f.write(f"\n## {LABELS[kind]}\n\n")
+            write_lines(
+                f,
+                (
+                    f"- 新增: {escape_cell(e.get('name'))} (ID {e.get('id')})\n"
+                    for e in changes["added"]
+                ),
+            )
+            write_lines(
+                f,
+                (
+                    f"- 移除: {escape_cell(e.get('name'))} (ID {e.get('id')})\n"
+                    for e in changes["removed"]
+                ),
+            )
+            write_lines(
+                f,
+                (
+                    f"- 變更: {escape_cell(e['name'])} (ID {e['id']}): {_describe_change(e)}\n"
+                    for e in changes["changed"]
+                ),
+            )
+
+        solves = result["solves"]
+        for key, title in (("new", "新解題"), ("removed", "消失的解題")):
+            if solves[key]:
+                f.write(f"\n## {title} ({len(solves[key])} 筆)\n\n")
+                SOLVES_TABLE.write(
+                    f,
+                    (
+                        f"| {escape_cell(s['name'])} | {escape_cell(s['challenge'])}"
+                        f" | {s['date']} |\n"
+                        for s in solves[key]
+                    ),
+                )
+
+        ranking = result["ranking"]
+        if any(ranking.values()):
+            f.write("\n## 排名變動\n")
+            if ranking["moves"]:
+                f.write("\n")
+                RANKING_TABLE.write(
+                    f,
+                    (
+                        f"| {escape_cell(m['name'])} | {m['pos'][0]} → {m['pos'][1]}"
+                        f" | {m['score'][0]} → {m['score'][1]} |\n"
+                        for m in ranking["moves"]
+                    ),
+                )
+            for key, label in (("entered", "新進榜"), ("left", "離榜")):
+                if ranking[key]:
+                    f.write(f"\n{label}: ")
+                    f.write(
+                        ", ".join(f"{escape_cell(r['name'])} (#{r['pos']})" for r in ranking[key])
+                    )
+                    f.write("\n")
+
+        files = result["files"]
+        if any(files.values()):
+            f.write("\n## 檔案\n\n")
+            for key, label in (("added", "新增"), ("changed", "變更"), ("removed", "移除")):
+                write_lines(f, (f"- {label}: `{p}`\n" for p in files[key]))
+
+
+def diff_main(argv):
+    """``ctfdscraper diff`` 子命令"""
+    parser = argparse.ArgumentParser(
+        prog="ctfdscraper diff",
+        description="Compare two backups of the same CTF using their journals and manifests",
+    )
+    parser.add_argument("old", help="Older backup directory")
+    parser.add_argument("new", help="Newer backup directory")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=".",
+        help=f"Directory for {DIFF_JSON} and {DIFF_MD} (default: current directory)",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the changelog as JSON instead of writing files"
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        result = diff_backups(args.old, args.new)
+    except ValueError as e:
+        log("diff", "-", str(e))
+        sys.exit(2)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(dumps_json(result))
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, DIFF_JSON), "w", encoding="utf-8") as f:
+        f.write(dumps_json(result))
+    write_diff_readme(result, os.path.join(args.output, DIFF_MD))
+
+    summary = result["summary"]
+    for kind, section in KINDS:
+        counts = summary[section]
+        log(
+            "diff",
+            "*",
+            f"{LABELS[kind]}: 新增 {counts['added']}、移除 {counts['removed']}、"
+            f"變更 {counts['changed']}",
+        )
+    log(
+        "diff",
+        "+",
+        f"新解題 {summary['new_solves']} 筆、排名變動 {summary['ranking_moves']} 個帳號、"
+        f"檔案變動 {sum(summary['files'].values())} 個 ({elapsed:.1f} ms)，"
+        f"已寫出 {DIFF_JSON} 與 {DIFF_MD}",
+    )
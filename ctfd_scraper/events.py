@@ -0,0 +1,192 @@
+"""Typed backup events and iterator APIs for programmatic consumers.
+
+``iter_backup(config)`` and ``aiter_backup(config)`` run ``run_backup`` in a
+background thread and yield events as each record is produced, so downstream
+pipelines can ingest while the scrape is still running instead of re-reading
+the files afterwards::
+
+    for event in iter_backup(config):
+        if isinstance(event, TeamRecord):
+            ingest(event.team)
+
+With ``resume`` enabled, entities skipped because the journal already has them
+produce no events. Only one backup can run per process at a time (counters,
+storage backend and logger are module globals).
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+
+QUEUE_SIZE = 1024  # Events buffered before backup workers block
+
+_listener = None
+
+
+@dataclass(frozen=True)
+class ScoreboardRow:
+    """Scoreboard 中的一個隊伍 (API 原始資料，含 pos、score、members)"""
+
+    team: dict
+
+
+@dataclass(frozen=True)
+class ChallengeRecord:
+    """一個題目完成備份，內容與 journal 摘要相同 (id、name、category、written ...)"""
+
+    challenge: dict
+
+
+@dataclass(frozen=True)
+class AttachmentWritten:
+    """一個附件寫入完成；path 為儲存後端中的路徑，url 為下載來源"""
+
+    path: str
+    size: int
+    sha256: str
+    url: str
+
+
+@dataclass(frozen=True)
+class TeamRecord:
+    """一個隊伍完成備份，內容與 team_info.json 相同"""
+
+    team: dict
+
+
+@dataclass(frozen=True)
+class UserRecord:
+    """一位使用者完成備份，內容與 user_info.json 相同"""
+
+    user: dict
+
+
+@dataclass(frozen=True)
+class BackupError:
+    """錯誤 ('-') 日誌；警告 ('!') 不產生事件"""
+
+    tag: str
+    level: str
+    message: str
+
+
+def set_listener(listener):
+    """以 ``listener(event)`` 接收所有事件，None 表示停止"""
+    global _listener
+    _listener = listener
+
+
+def enabled():
+    """是否有 listener；產生事件需要額外成本時先檢查"""
+    return _listener is not None
+
+
+def emit(event):
+    listener = _listener
+    if listener is not None:
+        listener(event)
+
+
+class _Done:
+    def __init__(self, error=None):
+        self.error = error
+
+
+def _start(config, put):
+    """在背景執行緒執行備份，結束時以 _Done 通知 (含例外)"""
+    from .cli import run_backup
+
+    def run():
+        error = None
+        try:
+            run_backup(config)
+        except BaseException as e:
+            error = e
+        finally:
+            # 先移除 listener，消費端收到 _Done 後即可開始下一次備份
+            set_listener(None)
+        put(_Done(error))
+
+    set_listener(put)
+    thread = threading.Thread(target=run, name="backup", daemon=True)
+    thread.start()
+    return thread
+
+
+def iter_backup(config, maxsize=QUEUE_SIZE):
+    """執行備份並依產生順序 yield 事件
+
+    佇列滿時 worker 會暫停等待消費端，記憶體用量固定。提前結束迭代時不再排入
+    事件，但仍會等待備份完成，確保 journal 與 manifest 一致。備份過程的例外
+    在迭代結束時重新拋出。
+
+    Args:
+        config: run_backup 的配置字典
+        maxsize: 事件佇列大小
+    """
+    events = queue.Queue(maxsize)
+    closed = threading.Event()
+
+    def put(event):
+        if not closed.is_set() or isinstance(event, _Done):
+            events.put(event)
+
+    thread = _start(config, put)
+    try:
+        while True:
+            event = events.get()
+            if isinstance(event, _Done):
+                if event.error is not None:
+                    raise event.error
+                return
+            yield event
+    finally:
+        closed.set()
+        # 清空佇列，讓已在等待的 worker 繼續
+        while thread.is_alive():
+            try:
+                events.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+
+
+async def aiter_backup(config, maxsize=QUEUE_SIZE):
+    """``iter_backup`` 的 async 版本，備份仍在背景執行緒中進行
+
+    事件經由 asyncio.Queue 傳給事件迴圈；佇列滿時 worker 同樣會暫停。
+    """
+    # logger 會匯入本模組，asyncio 只在使用 async API 時才載入以免拖慢 CLI 啟動
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue(maxsize)
+    closed = threading.Event()
+
+    def put(event):
+        if closed.is_set() and not isinstance(event, _Done):
+            return
+        future = asyncio.run_coroutine_threadsafe(events.put(event), loop)
+        # 等待放入佇列以形成背壓；事件迴圈已關閉時放棄
+        try:
+            future.result()
+        except Exception:
+            pass
+
+    thread = _start(config, put)
+    try:
+        while True:
+            event = await events.get()
+            if isinstance(event, _Done):
+                if event.error is not None:
+                    raise event.error
+                return
+            yield event
+    finally:
+        closed.set()
+        while thread.is_alive():
+            try:
+                events.get_nowait()
+            except asyncio.QueueEmpty:
+                await asyncio.sleep(0.05)
+        await loop.run_in_executor(None, thread.join)
@@ -0,0 +1,40 @@
+"""Bounded task submission helpers for thread pools."""
+
+from concurrent.futures import FIRST_COMPLETED, wait
+
+WINDOW_FACTOR = 2  # In-flight tasks per worker
+
+
+def submit_bounded(executor, fn, iterable, window):
+    """以有上限的視窗提交任務，依完成順序產出 (item, future)
+
+    最多同時有 window 個未完成的 future；視窗滿時會先等待任一任務完成再
+    從 iterable 取下一筆，因此 iterable 可以是惰性的串流（例如分頁 API），
+    記憶體用量只與並行數相關，與資料總量無關。
+
+    Args:
+        executor: ThreadPoolExecutor
+        fn: 任務函數，以 fn(item) 呼叫
+        iterable: 任務參數來源
+        window: 同時在途的任務上限
+    """
+    window = max(1, window)
+    pending = {}
+    source = iter(iterable)
+    exhausted = False
+
+    while True:
+        while not exhausted and len(pending) < window:
+            try:
+                item = next(source)
+            except StopIteration:
+                exhausted = True
+                break
+            pending[executor.submit(fn, item)] = item
+
+        if not pending:
+            return
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future
@@ -0,0 +1,113 @@
+"""Deferred failure queue and the low-concurrency retry pass run at the end of each phase.
+
+A failed challenge, team or user is not dropped: the backup phase records it
+here with the reason and moves on. Once the phase's main pool has drained,
+the failed entities are retried once, after a short pause and with a quarter
+of the workers, so a transient burst of errors (rate limiting, a restarting
+server) does not require a full rerun. Entities that still fail are written
+to ``failures.json``; a later ``--resume`` run picks them up because they
+never reach the journal.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import storage
+from .executor import WINDOW_FACTOR, submit_bounded
+from .journal import id_key
+from .logger import log
+from .render import dump_json
+
+FAILURES_FILE = "failures.json"
+RETRY_DIVISOR = 4  # Retry pass uses this fraction of the phase's workers
+RETRY_DELAY = 5.0  # Seconds to wait before the retry pass
+
+
+def describe_error(error):
+    """例外的簡短說明，訊息為空時使用例外類別名稱"""
+    return str(error) or type(error).__name__
+
+
+class FailureQueue:
+    """記錄處理失敗的實體與原因，供階段結束時重試
+
+    多個 worker 的結果迴圈可能同時呼叫，所有操作都加鎖。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # kind -> {entity_id: (item, record)}
+        self._attempts = {}  # (kind, entity_id) -> 失敗次數
+
+    def add(self, kind, item, entity_id, name, error):
+        """記錄一次失敗；同一實體再次失敗時累加嘗試次數
+
+        Args:
+            kind: 'challenge'、'team' 或 'user'
+            item: 重試時傳回處理函數的原始參數
+            entity_id: 實體 ID
+            name: 顯示名稱
+            error: 例外物件
+        """
+        with self._lock:
+            attempts = self._attempts.get((kind, entity_id), 0) + 1
+            self._attempts[(kind, entity_id)] = attempts
+            record = {
+                "kind": kind,
+                "id": entity_id,
+                "name": name,
+                "error": describe_error(error),
+                "attempts": attempts,
+            }
+            self._pending.setdefault(kind, {})[entity_id] = (item, record)
+
+    def take(self, kind):
+        """取出某類別所有待重試的原始參數"""
+        with self._lock:
+            pending = self._pending.pop(kind, {})
+        return [item for item, _ in pending.values()]
+
+    def remaining(self, kind=None):
+        """目前仍失敗的紀錄，依類別與 ID (數值) 排序"""
+        with self._lock:
+            kinds = [kind] if kind else list(self._pending)
+            records = [r for k in kinds for _, r in self._pending.get(k, {}).values()]
+        return sorted(records, key=lambda r: (r["kind"], id_key(r["id"])))
+
+    def write(self, backup_dir):
+        """寫出 failures.json；沒有失敗時刪除先前執行留下的檔案
+
+        Returns:
+            int: 仍失敗的實體數
+        """
+        path = f"{backup_dir}/{FAILURES_FILE}"
+        records = self.remaining()
+        if records:
+            with storage.open(path, "w") as f:
+                dump_json(records, f)
+        elif storage.exists(path):
+            storage.remove(path)
+        return len(records)
+
+
+def retry_failed(queue, kind, fn, workers, prefix):
+    """以較低並行數重試佇列中某類別的失敗實體，依完成順序產出 (item, future)
+
+    再次失敗的實體由呼叫端的結果處理重新加入佇列。
+
+    Args:
+        queue: FailureQueue
+        kind: 實體類別
+        fn: 與主要階段相同的處理函數
+        workers: 主要階段的並行數，重試時使用其 1/RETRY_DIVISOR
+        prefix: 執行緒名稱前綴
+    """
+    items = queue.take(kind)
+    if not items:
+        return
+    workers = max(1, workers // RETRY_DIVISOR)
+    log(prefix, "*", f"{len(items)} 個失敗項目將在 {RETRY_DELAY:g} 秒後以 {workers} 個線程重試")
+    time.sleep(RETRY_DELAY)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{prefix}_retry") as executor:
+        yield from submit_bounded(executor, fn, items, workers * WINDOW_FACTOR)
@@ -0,0 +1,221 @@
+"""Selective sync filters applied to listing results before per-entity requests.
+
+Challenge filters use fields present in ``/api/v1/challenges`` (category, id,
+solves). Team and user filters use the paginated listings plus, for ``top``
+and ``has_solves``, one ``/api/v1/scoreboard`` request: CTFd only lists
+accounts with a score there, in ranking order. Backup phases and the
+``--plan`` estimate share the same ``Filters`` object, so a plan reflects the
+filtered request count.
+"""
+
+import threading
+
+from .logger import log
+
+
+def parse_ids(value):
+    """解析 ID 範圍字串，如 ``1-50,72,100-``，回傳 (下限, 上限) tuple 清單，上限 None 表示無上限"""
+    ranges = []
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, dash, high = part.partition("-")
+        try:
+            low = int(low) if low.strip() else 0
+            high = (int(high) if high.strip() else None) if dash else low
+        except ValueError:
+            raise ValueError(f"invalid ID range: {part}") from None
+        if high is not None and high < low:
+            raise ValueError(f"invalid ID range: {part}")
+        ranges.append((low, high))
+    if not ranges:
+        raise ValueError(f"invalid ID range: {value}")
+    return ranges
+
+
+def _in_ranges(entity_id, ranges):
+    if entity_id is None:
+        return False
+    return any(low <= entity_id and (high is None or entity_id <= high) for low, high in ranges)
+
+
+class Filters:
+    """依配置篩選題目、隊伍與使用者
+
+    Args:
+        categories: 題目分類名稱 (不分大小寫)
+        challenge_ids, team_ids, user_ids: parse_ids 格式的 ID 範圍
+        top: 只保留 Scoreboard 前 N 名帳號 (隊伍賽時含其成員)
+        brackets: bracket 名稱或 ID
+        has_solves: 只保留有解題的題目與 Scoreboard 上有分數的帳號
+    """
+
+    def __init__(
+        self,
+        categories=None,
+        challenge_ids=None,
+        team_ids=None,
+        user_ids=None,
+        top=None,
+        brackets=None,
+        has_solves=False,
+    ):
+        self.categories = {c.casefold() for c in categories} if categories else None
+        self.challenge_ids = challenge_ids
+        self.team_ids = team_ids
+        self.user_ids = user_ids
+        self.top = top
+        self.brackets = {str(b) for b in brackets} if brackets else None
+        self.has_solves = has_solves
+        self._lock = threading.Lock()
+        self._standings = None
+        self._bracket_ids = None
+
+    @classmethod
+    def from_config(cls, config):
+        """由 run_backup 的配置字典建立，沒有任何篩選條件時回傳 None"""
+        filters = cls(
+            categories=config.get("categories"),
+            challenge_ids=config.get("challenge_ids"),
+            team_ids=config.get("team_ids"),
+            user_ids=config.get("user_ids"),
+            top=config.get("top"),
+            brackets=config.get("brackets"),
+            has_solves=config.get("has_solves", False),
+        )
+        return filters if filters.active() else None
+
+    def active(self):
+        return any(
+            (
+                self.categories,
+                self.challenge_ids,
+                self.team_ids,
+                self.user_ids,
+                self.top,
+                self.brackets,
+                self.has_solves,
+            )
+        )
+
+    def describe(self):
+        """篩選條件的簡短說明，用於日誌"""
+        parts = []
+        if self.categories:
+            parts.append(f"分類 {', '.join(sorted(self.categories))}")
+        for label, ranges in (
+            ("題目", self.challenge_ids),
+            ("隊伍", self.team_ids),
+            ("使用者", self.user_ids),
+        ):
+            if ranges:
+                text = ",".join(
+                    str(low) if low == high else f"{low}-{'' if high is None else high}"
+                    for low, high in ranges
+                )
+                parts.append(f"{label} ID {text}")
+        if self.top:
+            parts.append(f"前 {self.top} 名")
+        if self.brackets:
+            parts.append(f"bracket {', '.join(sorted(self.brackets))}")
+        if self.has_solves:
+            parts.append("有解題")
+        return "、".join(parts)
+
+    def challenge_filtered(self):
+        return bool(self.categories or self.challenge_ids or self.has_solves)
+
+    def team_filtered(self):
+        return bool(self.team_ids or self.top or self.brackets or self.has_solves)
+
+    def user_filtered(self):
+        return bool(self.user_ids or self.top or self.brackets or self.has_solves)
+
+    def keep_challenge(self, chal):
+        """題目清單中的一筆是否要備份"""
+        if self.categories and str(chal.get("category", "")).casefold() not in self.categories:
+            return False
+        if self.challenge_ids and not _in_ranges(chal.get("id"), self.challenge_ids):
+            return False
+        # 清單沒有 solves 欄位 (舊版或隱藏) 時無法判斷，不排除
+        if self.has_solves and chal.get("solves", 1) == 0:
+            return False
+        return True
+
+    def keep_team(self, client, team):
+        """隊伍清單中的一筆是否要備份"""
+        if self.team_ids and not _in_ranges(team.get("id"), self.team_ids):
+            return False
+        if not self._bracket_ok(client, team):
+            return False
+        return self._standing_ok(client, "team", team.get("id"))
+
+    def keep_user(self, client, user):
+        """使用者清單中的一筆是否要備份；隊伍賽時依所屬隊伍的排名判斷"""
+        if self.user_ids and not _in_ranges(user.get("id"), self.user_ids):
+            return False
+        if not self._bracket_ok(client, user):
+            return False
+        return self._standing_ok(client, "user", user.get("id"))
+
+    def _bracket_ok(self, client, entity):
+        if not self.brackets:
+            return True
+        # CTFd 3.7 起清單只有 bracket_id，較舊版本為 bracket 名稱字串
+        bracket = entity.get("bracket")
+        if bracket is not None and str(bracket) in self.brackets:
+            return True
+        return entity.get("bracket_id") in self.bracket_ids(client)
+
+    def bracket_ids(self, client):
+        """將 bracket 名稱與 ID 轉為 ID 集合，名稱需要一次 /api/v1/brackets 請求"""
+        with self._lock:
+            if self._bracket_ids is None:
+                ids = {int(b) for b in self.brackets if b.isdigit()}
+                if len(ids) < len(self.brackets):
+                    for bracket in client.fetch_api("/api/v1/brackets") or []:
+                        if bracket.get("name") in self.brackets:
+                            ids.add(bracket.get("id"))
+                self._bracket_ids = ids
+            return self._bracket_ids
+
+    def _standing_ok(self, client, kind, entity_id):
+        if not (self.top or self.has_solves):
+            return True
+        standings = self.standings(client)
+        if standings is None:
+            return True
+        return entity_id in standings[kind]
+
+    def standings(self, client):
+        """從 Scoreboard 取得要保留的隊伍與使用者 ID，整次備份只請求一次
+
+        Returns:
+            dict: {"team": set, "user": set}；無法取得 Scoreboard 時為 None (不篩選)
+        """
+        with self._lock:
+            if self._standings is None:
+                self._standings = self._fetch_standings(client)
+            return self._standings or None
+
+    def _fetch_standings(self, client):
+        rows = client.fetch_api("/api/v1/scoreboard")
+        if not rows:
+            log("filter", "!", "無法取得 Scoreboard，--top / --has-solves 不套用於隊伍與使用者")
+            return {}
+
+        if self.has_solves:
+            rows = [row for row in rows if row.get("score", 0) > 0]
+        if self.top:
+            rows = rows[: self.top]
+
+        standings = {"team": set(), "user": set()}
+        for row in rows:
+            if row.get("account_type") == "team":
+                standings["team"].add(row.get("account_id"))
+                standings["user"].update(m.get("id") for m in row.get("members") or [])
+            else:
+                standings["user"].add(row.get("account_id"))
+        log("filter", "*", f"Scoreboard 篩選: {len(rows)} 個帳號")
+        return standings
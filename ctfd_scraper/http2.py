@@ -0,0 +1,168 @@
+"""Optional HTTP/2 transport for CTFdClient built on httpx.
+
+``Http2Session`` exposes the small part of ``requests.Session`` that the
+backup modules use (``get``/``head``, ``cookies``, ``headers``, response
+``hooks``), so ``CTFdClient`` can swap it in without touching any caller.
+``max_streams`` bounds how many requests are in flight at once. Over HTTP/2
+they share one connection, and httpx opens another only when the server's
+concurrent-stream limit is reached. Servers that do not negotiate HTTP/2 fall
+back to one HTTP/1.1 connection per in-flight request, like ``requests``.
+"""
+
+import datetime
+import json
+import threading
+import time
+
+from .logger import log
+
+DEFAULT_MAX_STREAMS = 100  # Concurrent requests across all connections
+GOAWAY_RETRIES = 3  # Retries when the server closes a connection (GOAWAY)
+
+
+class Http2Response:
+    """包裝 httpx.Response，提供備份模組使用的 requests 介面
+
+    串流回應在 close() 或讀完內容時釋放 stream 配額；呼叫端遺漏 close() 時
+    由 __del__ 釋放，避免配額永久減少。
+    """
+
+    def __init__(self, response, elapsed, release):
+        self._response = response
+        self._release = release
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        # 與 requests 相同，elapsed 是送出到收到標頭的時間
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+
+    @property
+    def wire_bytes(self):
+        """已從連線讀取的原始 (壓縮後) 位元組數"""
+        return self._response.num_bytes_downloaded
+
+    @property
+    def http_version(self):
+        return self._response.http_version
+
+    @property
+    def content(self):
+        try:
+            return self._response.read()
+        finally:
+            self.close()
+
+    def json(self, **kwargs):
+        return json.loads(self.content, **kwargs)
+
+    def iter_content(self, chunk_size=1):
+        try:
+            yield from self._response.iter_bytes(chunk_size=chunk_size)
+        finally:
+            self.close()
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+    def close(self):
+        self._response.close()
+        release, self._release = self._release, None
+        if release:
+            release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class Http2Session:
+    """以 httpx 實作的 HTTP/2 session，執行緒安全
+
+    Args:
+        max_streams: 同時進行的請求上限，超過時呼叫端會等待
+    """
+
+    def __init__(self, max_streams=DEFAULT_MAX_STREAMS):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError(
+                "HTTP/2 transport requires httpx[http2]: pip install 'ctfd-scraper[http2]'"
+            ) from e
+
+        # 連線池上限與 stream 配額相同，請求不會在 httpx 連線池中排隊；
+        # HTTP/2 連線在 stream 未滿前會被重複使用，實際連線數由伺服器上限決定
+        # 連線被關閉時可能表現為協定、讀取或寫入錯誤；逾時不重送
+        self._retry_errors = (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError)
+        self._client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=max_streams, max_keepalive_connections=max_streams),
+        )
+        self.max_streams = max_streams
+        self._streams = threading.BoundedSemaphore(max_streams)
+        self.cookies = self._client.cookies
+        self.headers = self._client.headers
+        self.hooks = {"response": []}
+        self._checked_version = False
+
+    def request(self, method, url, timeout=None, stream=False, allow_redirects=True, **kwargs):
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        request = self._client.build_request(method, url, **kwargs)
+        retries = GOAWAY_RETRIES if method in ("GET", "HEAD") else 0
+
+        self._streams.acquire()
+        try:
+            # 伺服器處理一定數量的請求後會送出 GOAWAY 關閉連線 (nginx 預設 1000 個)，
+            # 同一連線上進行中的 stream 會失敗；GET/HEAD 可以安全地在新連線上重送。
+            # 串流回應已交給呼叫端後無法重送，由下載的錯誤處理負責
+            for attempt in range(retries + 1):
+                try:
+                    start = time.perf_counter()
+                    raw = self._client.send(request, stream=True, follow_redirects=allow_redirects)
+                    elapsed = time.perf_counter() - start
+                    if not stream:
+                        # 與 requests 相同，非串流請求回傳前讀完內容
+                        try:
+                            raw.read()
+                        finally:
+                            raw.close()
+                    break
+                except self._retry_errors:
+                    if attempt == retries:
+                        raise
+        except BaseException:
+            self._streams.release()
+            raise
+
+        response = Http2Response(raw, elapsed, self._streams.release)
+        if not stream:
+            response.close()
+        if not self._checked_version:
+            self._checked_version = True
+            if raw.http_version != "HTTP/2":
+                log(
+                    "api",
+                    "!",
+                    f"伺服器未協商 HTTP/2 ({raw.http_version})，每個進行中的請求各用一條連線",
+                )
+        for hook in self.hooks["response"]:
+            hook(response)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def close(self):
+        self._client.close()
@@ -0,0 +1,167 @@
+"""Append-only checkpoint journal for resumable backups."""
+
+import json
+import os
+import threading
+import time
+
+from .logger import log
+
+JOURNAL_FILE = ".journal.jsonl"
+FSYNC_INTERVAL = 1.0  # Seconds between fsync calls
+TAIL_SCAN = 64 * 1024  # Bytes read per step when looking for the last newline
+
+
+def iter_records(path):
+    """依序讀出 journal 的每筆紀錄，不開啟寫入；diff 等唯讀工具也使用"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # 崩潰時最後一行可能寫到一半，直接忽略
+                continue
+
+
+def id_key(entity_id):
+    """實體 ID 的排序鍵：整數 ID 依數值排序，其他型別依字串排在後面"""
+    if isinstance(entity_id, int):
+        return (0, entity_id, "")
+    return (1, 0, str(entity_id))
+
+
+def _truncate_torn_tail(path):
+    """截掉最後一個換行之後寫到一半的紀錄，之後的追加才會從新的一行開始"""
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(TAIL_SCAN, pos)
+            f.seek(pos - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                pos = pos - step + newline + 1
+                break
+            pos -= step
+        if pos < end:
+            f.truncate(pos)
+            log("journal", "!", f"捨棄 journal 結尾不完整的紀錄 ({end - pos} bytes)")
+
+
+class Journal:
+    """記錄已完成的實體與寫入檔案，讓中斷的備份可以續傳
+
+    每筆紀錄是一行 JSON，寫入後立即 flush，因此程序被 Ctrl-C 或 OOM 終止時
+    已完成的紀錄不會遺失；fsync 以 FSYNC_INTERVAL 為間隔批次進行，以免每個
+    實體都付出一次磁碟同步的代價。斷電時最多遺失最後一個間隔的紀錄，這些
+    實體在續傳時會被重新處理，結果相同。
+
+    紀錄格式：
+        {"type": "entity", "kind": "team", "id": 1, "summary": {...}, "written": [...]}
+        {"type": "phase", "name": "teams"}
+        {"type": "file", "path": "Teams/README.md", "size": 123, "sha256": "...", "url": null}
+    """
+
+    def __init__(self, backup_dir, resume=False):
+        """開啟 journal
+
+        Args:
+            backup_dir: 備份目錄
+            resume: True 時載入既有紀錄並接續寫入；False 時清空重新開始
+        """
+        self.path = os.path.join(backup_dir, JOURNAL_FILE)
+        self._entities = {}
+        self._phases = set()
+        self._files = {}
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+
+        if resume:
+            self._load()
+            if os.path.exists(self.path):
+                _truncate_torn_tail(self.path)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            log("journal", "!", "找不到 journal，將從頭開始備份")
+            return
+
+        for record in iter_records(self.path):
+            if record.get("type") == "entity":
+                self._entities.setdefault(record["kind"], {})[record["id"]] = record
+            elif record.get("type") == "phase":
+                self._phases.add(record["name"])
+            elif record.get("type") == "file":
+                self._files[record["path"]] = record
+
+        done = ", ".join(f"{kind} {len(ids)}" for kind, ids in self._entities.items())
+        log("journal", "+", f"載入 journal: {done or '無已完成實體'}")
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            now = time.monotonic()
+            if now - self._last_sync >= FSYNC_INTERVAL:
+                os.fsync(self._file.fileno())
+                self._last_sync = now
+
+    def record_entity(self, kind, entity_id, summary, written=()):
+        """記錄一個已完成的實體
+
+        Args:
+            kind: 'challenge'、'team' 或 'user'
+            entity_id: 實體 ID
+            summary: 重建索引所需的摘要資料
+            written: 此實體寫入的檔案路徑
+        """
+        record = {
+            "type": "entity",
+            "kind": kind,
+            "id": entity_id,
+            "summary": summary,
+            "written": list(written),
+        }
+        self._entities.setdefault(kind, {})[entity_id] = record
+        self._append(record)
+
+    def record_phase(self, name):
+        """記錄一個已完整結束的備份階段"""
+        self._phases.add(name)
+        self._append({"type": "phase", "name": name})
+
+    def record_file(self, path, size, sha256, url=None):
+        """記錄一個已完整寫入的檔案與其雜湊，供續傳後重建 manifest"""
+        record = {"type": "file", "path": path, "size": size, "sha256": sha256, "url": url}
+        self._files[path] = record
+        self._append(record)
+
+    def files(self):
+        """回傳 {相對路徑: 檔案紀錄}，同一路徑以最後一次寫入為準"""
+        return dict(self._files)
+
+    def is_done(self, kind, entity_id):
+        return entity_id in self._entities.get(kind, {})
+
+    def phase_done(self, name):
+        return name in self._phases
+
+    def done_count(self, kind):
+        """已完成的實體數，包含沒有摘要 (略過) 的實體"""
+        return len(self._entities.get(kind, {}))
+
+    def summaries(self, kind):
+        """回傳已完成實體的摘要清單"""
+        return [
+            r["summary"] for r in self._entities.get(kind, {}).values() if r["summary"] is not None
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
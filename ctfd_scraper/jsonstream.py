@@ -0,0 +1,147 @@
+"""Incremental JSON parsing and writing for large API payloads."""
+
+import codecs
+import json
+
+from .render import dumps_json
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+
+
+class _ChunkReader:
+    """在文字區塊串流上逐步解析 JSON 值，只保留尚未消耗的部分"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, want=0):
+        """讀入區塊直到未消耗的部分超過 want 個字元，回傳是否有讀到資料"""
+        if self.eof:
+            return False
+        # 丟棄已消耗的前綴，讓緩衝區大小維持在單一元素的量級
+        parts = [self.buf[self.pos :]]
+        size = len(parts[0])
+        self.pos = 0
+        read = False
+        for chunk in self._chunks:
+            text = self._decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                parts.append(text)
+                size += len(text)
+                read = True
+                if size > want:
+                    break
+        else:
+            parts.append(self._decode(b"", final=True))
+            self.eof = True
+        self.buf = "".join(parts)
+        return read
+
+    def peek(self):
+        """跳過空白並回傳下一個字元，串流結束時回傳空字串"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"unexpected {char!r} at stream offset, expected one of {chars!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """解析下一個完整的 JSON 值"""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # 值跨越多個區塊時每次讀入的量加倍，每個字元只會被重新解析常數次，
+                # 而不是每讀一個區塊就從頭解析一次 (平方時間)
+                if not self._fill(2 * (len(self.buf) - self.pos)):
+                    raise
+                continue
+            # 數字等值可能剛好在區塊邊界被截斷，需要再讀一些確認
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_array(chunks, key="data"):
+    """串流解析頂層物件中 ``key`` 對應的陣列，逐一產出元素
+
+    適用於 CTFd 的 ``{"success": true, "data": [...]}`` 格式。整份回應不會
+    同時存在記憶體中；其他頂層欄位會被解析後丟棄。
+
+    Args:
+        chunks: bytes 或 str 區塊的可迭代物件，例如 ``response.iter_content()``
+        key: 要串流的陣列欄位名稱
+    """
+    reader = _ChunkReader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key:
+            if reader.peek() == "n":
+                reader.value()  # null
+            else:
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.expect(",]") == "]":
+                            break
+            return
+        reader.value()
+        if reader.expect(",}") == "}":
+            return
+
+
+def iter_response_array(response, key="data"):
+    """從 requests 串流回應中逐一產出 ``key`` 陣列的元素"""
+    return iter_json_array(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), key)
+
+
+class JsonArrayWriter:
+    """逐筆寫出 JSON 陣列，輸出與 ``json.dump(items, f, indent=2)`` 相同"""
+
+    def __init__(self, f):
+        self._f = f
+        self._pad = "  "
+        self._newline = "\n  "
+        self.count = 0
+
+    def write(self, item):
+        text = dumps_json(item)
+        self._f.write(("[\n" if not self.count else ",\n") + self._pad)
+        self._f.write(text.replace("\n", self._newline))
+        self.count += 1
+
+    def close(self):
+        self._f.write("\n]" if self.count else "[]")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
@@ -2,9 +2,14 @@
 
 import threading
 
+from . import profiling
+
 # Thread-safe print lock
 print_lock = threading.Lock()
 
+# 設定時 log() 改交給此函數處理而不輸出，例如即時儀表板執行期間
+_sink = None
+
 
 # ANSI color codes
 class Colors:
@@ -23,7 +28,32 @@ def log(tag, level, message):
         level: '+' (success), '-' (error), '!' (warn), '*' (info)
         message: 日誌訊息
     """
+    if level == "-":
+        # 錯誤很少，在此才載入 events，CLI 啟動時不需建立事件類別；
+        # 警告 (例如略過隱藏的題目) 不是失敗，只留在日誌中
+        from . import events
+
+        if events.enabled():
+            events.emit(events.BackupError(tag, level, message))
+    if _sink is not None:
+        _sink(tag, level, message)
+        return
     colors = {"+": Colors.GREEN, "-": Colors.RED, "!": Colors.YELLOW, "*": Colors.BLUE}
     color = colors.get(level, Colors.RESET)
-    with print_lock:
+    # 含等待 print_lock 的時間，可看出輸出鎖的競爭
+    with profiling.stage("log"), print_lock:
         print(f"{color}[{level}]{Colors.RESET} [{tag}] {message}")
+
+
+def rule(width=40):
+    """輸出分隔線；日誌由 sink 接管時 (例如即時面板執行期間) 略過，避免打亂畫面"""
+    if _sink is not None:
+        return
+    with print_lock:
+        print("-" * width)
+
+
+def set_sink(sink):
+    """以 ``sink(tag, level, message)`` 接管日誌輸出，None 表示恢復直接輸出"""
+    global _sink
+    _sink = sink
@@ -0,0 +1,260 @@
+"""Integrity manifest for backups and the parallel verify command."""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import storage
+from .failures import FAILURES_FILE
+from .logger import log
+from .render import dumps_json
+
+MANIFEST_FILE = "MANIFEST.sha256"
+MANIFEST_JSON = "manifest.json"
+
+# 不列入 manifest 的檔案：manifest 本身與本機狀態檔
+EXCLUDED = {MANIFEST_FILE, MANIFEST_JSON, ".journal.jsonl", "search.db", FAILURES_FILE}
+
+MMAP_THRESHOLD = 4 * 1024 * 1024  # Files at least this large are hashed via mmap
+READ_SIZE = 1024 * 1024  # Read size for smaller files
+HASH_SLICE = 64 * 1024 * 1024  # Bytes passed to hashlib per update call
+BATCH_BYTES = 32 * 1024 * 1024  # Small files grouped per worker task
+BATCH_FILES = 256
+
+
+class Manifest:
+    """收集備份中每個檔案的大小、SHA-256 與來源 URL
+
+    作為 ``storage.set_observer`` 的回呼，在寫入串流時取得雜湊，不需事後
+    重讀檔案。提供 journal 時每筆紀錄同時寫入 journal，續傳時可接續前一次
+    執行的結果。
+
+    Args:
+        backup_dir: 備份目錄，紀錄中的路徑相對於此目錄
+        journal: Journal (可選)
+    """
+
+    def __init__(self, backup_dir, journal=None):
+        self.backup_dir = backup_dir
+        self.journal = journal
+        self.entries = {}
+        self._lock = threading.Lock()
+        if journal:
+            for path, record in journal.files().items():
+                self.entries[path] = {
+                    "size": record["size"],
+                    "sha256": record["sha256"],
+                    "url": record.get("url"),
+                }
+
+    def record(self, path, size, sha256, url=None):
+        """storage observer：記錄一個寫入完成的檔案"""
+        relpath = os.path.relpath(path, self.backup_dir).replace(os.sep, "/")
+        if relpath in EXCLUDED or relpath.startswith("../"):
+            return
+        with self._lock:
+            self.entries[relpath] = {"size": size, "sha256": sha256, "url": url}
+        if self.journal:
+            self.journal.record_file(relpath, size, sha256, url)
+
+    def write(self):
+        """寫出 sha256sum 相容的 MANIFEST.sha256 與含大小、來源的 manifest.json"""
+        with self._lock:
+            entries = dict(sorted(self.entries.items()))
+
+        with storage.open(f"{self.backup_dir}/{MANIFEST_FILE}", "w") as f:
+            f.writelines(f"{e['sha256']}  {path}\n" for path, e in entries.items())
+
+        with storage.open(f"{self.backup_dir}/{MANIFEST_JSON}", "w") as f:
+            f.write(dumps_json({"algorithm": "sha256", "files": entries}))
+
+        total = sum(e["size"] for e in entries.values())
+        log(
+            "manifest",
+            "+",
+            f"manifest 已生成 ({len(entries)} 個檔案，{total / (1024 * 1024):.1f} MB)",
+        )
+
+
+def hash_file(path):
+    """計算檔案 SHA-256，回傳 (大小, hex)；大檔案以 mmap 避免複製到 Python 緩衝"""
+    size = os.path.getsize(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for offset in range(0, size, HASH_SLICE):
+                        digest.update(view[offset : offset + HASH_SLICE])
+                finally:
+                    view.release()
+        else:
+            for block in iter(lambda: f.read(READ_SIZE), b""):
+                digest.update(block)
+    return size, digest.hexdigest()
+
+
+def _hash_batch(paths):
+    """worker 行程：雜湊一批檔案，無法讀取的檔案回傳錯誤訊息"""
+    results = []
+    for path in paths:
+        try:
+            results.append((path, *hash_file(path), None))
+        except OSError as e:
+            results.append((path, None, None, str(e)))
+    return results
+
+
+def _batches(backup_dir, entries):
+    """大檔案各自成為一個任務，小檔案合併以攤平行程間通訊成本；大的先排"""
+    items = []
+    for relpath, entry in entries.items():
+        items.append((entry.get("size") or 0, os.path.join(backup_dir, relpath)))
+    items.sort(reverse=True)
+
+    batch, batch_bytes = [], 0
+    for size, path in items:
+        if size >= BATCH_BYTES:
+            yield [path]
+            continue
+        batch.append(path)
+        batch_bytes += size
+        if batch_bytes >= BATCH_BYTES or len(batch) >= BATCH_FILES:
+            yield batch
+            batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+def load_manifest(backup_dir):
+    """讀取 manifest.json；只有 MANIFEST.sha256 時大小未知"""
+    json_path = os.path.join(backup_dir, MANIFEST_JSON)
+    if os.path.exists(json_path):
+        with open(json_path, encoding="utf-8") as f:
+            return json.load(f)["files"]
+
+    entries = {}
+    with open(os.path.join(backup_dir, MANIFEST_FILE), encoding="utf-8") as f:
+        for line in f:
+            sha256, _, relpath = line.rstrip("\n").partition("  ")
+            entries[relpath] = {"size": None, "sha256": sha256, "url": None}
+    return entries
+
+
+def verify_backup(backup_dir, workers=None, strict=False):
+    """以多個行程平行重新計算雜湊，與 manifest 比對
+
+    Args:
+        backup_dir: 本機備份目錄
+        workers: 行程數，預設為 CPU 核心數
+        strict: True 時 manifest 未列出的檔案也視為問題
+
+    Returns:
+        dict: checked 與 missing、size_mismatch、hash_mismatch、unreadable、
+        untracked 各類問題的路徑清單
+    """
+    entries = load_manifest(backup_dir)
+    report = {
+        "checked": 0,
+        "bytes": 0,
+        "missing": [],
+        "size_mismatch": [],
+        "hash_mismatch": [],
+        "unreadable": [],
+        "untracked": [],
+    }
+
+    present = {}
+    for relpath, entry in entries.items():
+        if os.path.isfile(os.path.join(backup_dir, relpath)):
+            present[relpath] = entry
+        else:
+            report["missing"].append(relpath)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for results in executor.map(_hash_batch, _batches(backup_dir, present)):
+            for path, size, sha256, error in results:
+                relpath = os.path.relpath(path, backup_dir).replace(os.sep, "/")
+                expected = present[relpath]
+                report["checked"] += 1
+                if error:
+                    report["unreadable"].append(relpath)
+                    continue
+                report["bytes"] += size
+                if expected.get("size") is not None and size != expected["size"]:
+                    report["size_mismatch"].append(relpath)
+                elif sha256 != expected["sha256"]:
+                    report["hash_mismatch"].append(relpath)
+
+    if strict:
+        for root, _, files in os.walk(backup_dir):
+            for name in files:
+                relpath = os.path.relpath(os.path.join(root, name), backup_dir)
+                relpath = relpath.replace(os.sep, "/")
+                if relpath not in entries and relpath not in EXCLUDED:
+                    report["untracked"].append(relpath)
+
+    for key in ("missing", "size_mismatch", "hash_mismatch", "unreadable", "untracked"):
+        report[key].sort()
+    return report
+
+
+def verify_main(argv):
+    """``ctfdscraper verify`` 子命令"""
+    parser = argparse.ArgumentParser(
+        prog="ctfdscraper verify",
+        description="Re-hash a backup in parallel and compare it with its manifest",
+    )
+    parser.add_argument("backup_dir", help="Backup directory containing manifest.json")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="Hashing processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--strict", action="store_true", help="Also report files missing from the manifest"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if not any(
+        os.path.exists(os.path.join(args.backup_dir, name))
+        for name in (MANIFEST_JSON, MANIFEST_FILE)
+    ):
+        log("verify", "-", f"{args.backup_dir} 中找不到 {MANIFEST_JSON} 或 {MANIFEST_FILE}")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    report = verify_backup(args.backup_dir, workers=args.workers, strict=args.strict)
+    elapsed = time.perf_counter() - start
+
+    problems = sum(
+        len(report[key])
+        for key in ("missing", "size_mismatch", "hash_mismatch", "unreadable", "untracked")
+    )
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        for key, label in (
+            ("missing", "缺少"),
+            ("size_mismatch", "大小不符"),
+            ("hash_mismatch", "雜湊不符"),
+            ("unreadable", "無法讀取"),
+            ("untracked", "未列於 manifest"),
+        ):
+            for relpath in report[key]:
+                log("verify", "-", f"{label}: {relpath}")
+        mb = report["bytes"] / (1024 * 1024)
+        rate = mb / elapsed if elapsed > 0 else 0
+        log(
+            "verify",
+            "+" if not problems else "-",
+            f"檢查 {report['checked']} 個檔案 ({mb:.1f} MB, {rate:.1f} MB/s)，{problems} 個問題",
+        )
+
+    sys.exit(1 if problems else 0)
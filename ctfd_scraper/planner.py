@@ -0,0 +1,306 @@
+"""Dry-run planner: estimate requests, bytes and wall time before a backup."""
+
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .jsonstream import iter_response_array
+from .logger import log
+
+PAGE_SIZE = 50  # Items per page returned by CTFd list endpoints
+MAX_PROBE_WORKERS = 50  # Upper bound on parallel HEAD probes
+THROUGHPUT_PROBE_BYTES = 4 * 1024 * 1024  # Bytes read to measure download speed
+THROUGHPUT_PROBE_SECONDS = 3.0  # Stop the throughput probe after this long
+DEFAULT_RESPONSE_BYTES = 2048  # Assumed API response size when none was measured
+
+
+class _LatencyRecorder:
+    """requests response hook：記錄每個回應從送出到收到標頭的時間"""
+
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def __call__(self, response, *args, **kwargs):
+        with self._lock:
+            self.samples.append(response.elapsed.total_seconds())
+        return response
+
+    def median(self):
+        with self._lock:
+            return statistics.median(self.samples) if self.samples else 0.0
+
+
+def list_pages(count):
+    """iter_pages 取得 count 筆資料所需的請求數（最後一頁未滿或多一頁空頁）"""
+    return count // PAGE_SIZE + 1
+
+
+def probe_size(client, url):
+    """以 HEAD 取得附件大小；不支援 HEAD 時改用串流 GET 只讀標頭"""
+    try:
+        response = client.head(url, timeout=client.file_timeout)
+        if response.status_code in (405, 501) or "content-length" not in response.headers:
+            response = client.get(url, timeout=client.file_timeout, stream=True)
+            response.close()
+        if response.status_code != 200 or "content-encoding" in response.headers:
+            return None
+        length = response.headers.get("content-length")
+        return int(length) if length is not None else None
+    except Exception:
+        return None
+
+
+def probe_throughput(client, url):
+    """下載附件開頭一段資料，回傳單一連線的 bytes/s"""
+    try:
+        start = time.perf_counter()
+        received = 0
+        response = client.get(url, timeout=client.file_timeout, stream=True)
+        try:
+            for chunk in response.iter_content(chunk_size=256 * 1024):
+                received += len(chunk)
+                elapsed = time.perf_counter() - start
+                if received >= THROUGHPUT_PROBE_BYTES or elapsed >= THROUGHPUT_PROBE_SECONDS:
+                    break
+        finally:
+            response.close()
+        elapsed = time.perf_counter() - start
+        return received / elapsed if received and elapsed > 0 else None
+    except Exception:
+        return None
+
+
+def estimate_phases(counts, rtt, throughput, config, response_bytes=DEFAULT_RESPONSE_BYTES):
+    """依清單數量與量測值估算每個階段的請求數、資料量與時間
+
+    每個 worker 依序執行一個實體的所有請求，因此階段時間取下列最大者：
+    所有實體的工作時間除以並行數、最慢的單一實體、頻寬上限、請求速率上限。
+
+    Args:
+        counts: 由 plan_backup 收集，含 challenges、files (每題附件大小清單)、
+            teams、members、users
+        rtt: 單一 API 請求的往返時間（秒）
+        throughput: 單一下載連線的 bytes/s，None 表示未量測
+        config: run_backup 的配置字典
+        response_bytes: 平均 API 回應大小
+
+    Returns:
+        dict: 階段名稱 → {entities, requests, bytes, unknown_sizes, seconds, bound}
+    """
+    max_rps = config.get("max_rps")
+    max_bandwidth = config.get("max_bandwidth")
+    phases = {}
+
+    def finish(name, entities, requests, download_bytes, unknown, terms):
+        if max_rps:
+            terms["rate limit"] = requests / max_rps
+        if max_bandwidth and download_bytes:
+            terms["bandwidth"] = download_bytes / max_bandwidth
+        bound = max(terms, key=terms.get)
+        phases[name] = {
+            "entities": entities,
+            "requests": requests,
+            "bytes": download_bytes + requests * response_bytes,
+            "unknown_sizes": unknown,
+            "seconds": terms[bound],
+            "bound": bound,
+        }
+
+    if config.get("backup_scoreboard", True):
+        finish("scoreboard", 1, 1, 0, 0, {"latency": rtt})
+
+    if config.get("backup_challenges", True) and "challenges" in counts:
+        workers = config.get("max_workers_challenges", 10)
+        file_workers = config.get("max_workers_files", 5)
+        files = counts["files"]
+        known = [size for sizes in files for size in sizes if size is not None]
+        average = sum(known) / len(known) if known else 0
+        unknown = sum(size is None for sizes in files for size in sizes)
+
+        chal_times = []
+        for sizes in files:
+            if throughput:
+                file_times = [rtt + (average if s is None else s) / throughput for s in sizes]
+            else:
+                file_times = [rtt for _ in sizes]
+            downloads = max(max(file_times, default=0), sum(file_times) / file_workers)
+            chal_times.append(2 * rtt + downloads)
+
+        n_files = sum(len(sizes) for sizes in files)
+        requests = 1 + 2 * counts["challenges"] + n_files
+        finish(
+            "challenges",
+            counts["challenges"],
+            requests,
+            int(sum(known) + average * unknown),
+            unknown,
+            {
+                "workers": sum(chal_times) / workers,
+                "largest item": max(chal_times, default=0),
+            },
+        )
+
+    if config.get("backup_teams", True) and "teams" in counts:
+        workers = config.get("max_workers_teams", 20)
+        teams = counts["teams"]
+        # 詳細資料、解題、獎項，加上每位成員一次請求
+        per_team = 3 * teams + counts["members"]
+        finish(
+            "teams",
+            teams,
+            list_pages(teams) + per_team,
+            0,
+            0,
+            {"workers": per_team * rtt / workers, "listing": list_pages(teams) * rtt},
+        )
+
+    if config.get("backup_users", True) and "users" in counts:
+        workers = config.get("max_workers_teams", 20)
+        users = counts["users"]
+        per_user = 3 * users
+        finish(
+            "users",
+            users,
+            list_pages(users) + per_user,
+            0,
+            0,
+            {"workers": per_user * rtt / workers, "listing": list_pages(users) * rtt},
+        )
+
+    return phases
+
+
+def plan_backup(client, config, filters=None):
+    """只執行清單請求與附件 HEAD 探測，估算完整備份的成本
+
+    會取得題目清單與每題詳細資料（附件清單只在詳細資料中）、隊伍與使用者
+    的分頁清單，並對每個附件送出 HEAD；不寫入任何檔案。提供 filters 時
+    套用與備份相同的篩選，只探測與計算符合條件的實體。
+
+    Returns:
+        dict: rtt、throughput、probe_requests、phases 與 total
+    """
+    recorder = _LatencyRecorder()
+    client.session.hooks["response"].append(recorder)
+    counts = {}
+    response_sizes = []
+    attachments = []
+
+    try:
+        if config.get("backup_challenges", True):
+            log("plan", "*", "正在取得題目清單與附件資訊...")
+            r = client.get(f"{client.base_url}/api/v1/challenges", stream=True)
+            listing = list(iter_response_array(r)) if r.status_code == 200 else []
+            if filters:
+                listing = [chal for chal in listing if filters.keep_challenge(chal)]
+
+            def detail(chal):
+                try:
+                    response = client.get(f"{client.base_url}/api/v1/challenges/{chal['id']}")
+                    response_sizes.append(len(response.content))
+                    data = response.json().get("data") or {}
+                except Exception:
+                    return []
+                return [f"{client.base_url}{f.split('?')[0]}" for f in data.get("files") or []]
+
+            workers = config.get("max_workers_challenges", 10)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                file_urls = list(executor.map(detail, listing))
+
+            probe_workers = min(MAX_PROBE_WORKERS, workers * config.get("max_workers_files", 5))
+            flat = [url for urls in file_urls for url in urls]
+            log("plan", "*", f"{len(listing)} 個題目，探測 {len(flat)} 個附件大小...")
+            with ThreadPoolExecutor(max_workers=probe_workers) as executor:
+                sizes = dict(zip(flat, executor.map(lambda u: probe_size(client, u), flat)))
+
+            counts["challenges"] = len(listing)
+            counts["files"] = [[sizes[url] for url in urls] for urls in file_urls]
+            attachments = [(size, url) for url, size in sizes.items() if size]
+
+        # 篩選隊伍時只計算保留隊伍的成員
+        team_ids = None
+        if config.get("backup_teams", True):
+            log("plan", "*", "正在取得隊伍清單...")
+            teams = client.iter_pages("/api/v1/teams")
+            if filters and filters.team_filtered():
+                team_ids = {t.get("id") for t in teams if filters.keep_team(client, t)}
+                counts["teams"] = len(team_ids)
+            else:
+                counts["teams"] = sum(1 for _ in teams)
+
+        if config.get("backup_users", True) or config.get("backup_teams", True):
+            log("plan", "*", "正在取得使用者清單...")
+            users = members = 0
+            for user in client.iter_pages("/api/v1/users"):
+                if not filters or filters.keep_user(client, user):
+                    users += 1
+                team_id = user.get("team_id")
+                members += team_id is not None and (team_ids is None or team_id in team_ids)
+            counts["users"] = users
+            # 清單沒有 team_id 時（個人賽或欄位被隱藏）以使用者數估算成員數
+            counts["members"] = members or users
+    finally:
+        client.session.hooks["response"].remove(recorder)
+
+    rtt = recorder.median()
+    probe_requests = len(recorder.samples)
+
+    throughput = None
+    if attachments:
+        size, url = max(attachments)
+        log("plan", "*", f"量測下載速度: {url.split('/')[-1]}")
+        throughput = probe_throughput(client, url)
+
+    response_bytes = (
+        sum(response_sizes) / len(response_sizes) if response_sizes else DEFAULT_RESPONSE_BYTES
+    )
+    phases = estimate_phases(counts, rtt, throughput, config, response_bytes)
+    total = {
+        key: sum(phase[key] for phase in phases.values())
+        for key in ("requests", "bytes", "unknown_sizes", "seconds")
+    }
+    return {
+        "rtt": rtt,
+        "throughput": throughput,
+        "probe_requests": probe_requests,
+        "phases": phases,
+        "total": total,
+    }
+
+
+def _format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def _format_seconds(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def print_plan(plan):
+    """輸出估算表"""
+    rate = plan["throughput"]
+    rate_text = f"{rate / (1024 * 1024):.2f} MB/s" if rate else "未量測"
+    log("plan", "*", f"RTT 中位數 {plan['rtt'] * 1000:.0f} ms，單一連線下載速度 {rate_text}")
+    log("plan", "*", f"探測共使用 {plan['probe_requests']} 個請求")
+
+    print(f"{'phase':<12}{'entities':>10}{'requests':>10}{'bytes':>12}{'time':>10}  bound")
+    rows = list(plan["phases"].items()) + [("total", plan["total"])]
+    for name, phase in rows:
+        print(
+            f"{name:<12}{phase.get('entities', ''):>10}{phase['requests']:>10}"
+            f"{_format_bytes(phase['bytes']):>12}{_format_seconds(phase['seconds']):>10}"
+            f"  {phase.get('bound', '')}"
+        )
+
+    if plan["total"]["unknown_sizes"]:
+        log("plan", "!", f"{plan['total']['unknown_sizes']} 個附件大小未知，以平均大小估算")
+    log("plan", "*", "瓶頸為 workers 時提高對應的 --max-workers-* 可縮短時間")
@@ -0,0 +1,205 @@
+"""Optional wall/CPU timing per backup stage and a thread-aware sampling profiler.
+
+Stages (fetch, parse, render, write, ...) are timed with ``stage()`` blocks and
+attributed to the phase currently running in ``stats``. Nested stages are
+exclusive: time spent in an inner stage is subtracted from the outer one, so a
+download loop timed as ``fetch`` does not also count its ``write`` calls.
+Everything is a no-op until ``enable()`` is called.
+"""
+
+import collections
+import contextlib
+import functools
+import os
+import re
+import sys
+import threading
+import time
+
+from . import stats
+
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples (200 Hz)
+MAX_STACK_DEPTH = 128
+
+_enabled = False
+_lock = threading.Lock()
+_totals = {}  # (phase, stage) -> [calls, wall, cpu]
+_local = threading.local()
+_NULL = contextlib.nullcontext()
+
+
+class _Stage:
+    __slots__ = ("name", "wall", "cpu")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        # 每層記錄內層 stage 已用掉的 wall/cpu，離開時扣除
+        stack.append([0.0, 0.0])
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        stack = _local.stack
+        child_wall, child_cpu = stack.pop()
+        if stack:
+            stack[-1][0] += wall
+            stack[-1][1] += cpu
+        key = (stats.current_phase() or "other", self.name)
+        with _lock:
+            total = _totals.get(key)
+            if total is None:
+                total = _totals[key] = [0, 0.0, 0.0]
+            total[0] += 1
+            total[1] += wall - child_wall
+            total[2] += cpu - child_cpu
+        return False
+
+
+def stage(name):
+    """以 with 區塊計時一個階段內的步驟；未啟用時回傳共用的空 context"""
+    return _Stage(name) if _enabled else _NULL
+
+
+def timed(name):
+    """將整個函數計為 name 步驟的裝飾器"""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def enable():
+    """開始記錄，並清除先前的結果"""
+    global _enabled
+    with _lock:
+        _totals.clear()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def report():
+    """彙整各階段的 wall/CPU 時間與步驟明細
+
+    Returns:
+        dict: 階段名稱 → {wall, cpu, stages: {步驟 → {calls, wall, cpu}}}。
+        階段的 wall/cpu 是整個行程的時間；步驟的 wall 為各執行緒加總
+        (thread-seconds)，cpu 為該執行緒本身的 CPU 時間。
+    """
+    snap = stats.snapshot()
+    with _lock:
+        totals = {key: list(value) for key, value in _totals.items()}
+
+    phases = {}
+    for name, p in snap["phases"].items():
+        finished = p["finished"] if p["finished"] is not None else snap["now"]
+        cpu_finished = p["cpu_finished"]
+        if cpu_finished is None:
+            cpu_finished = time.process_time()
+        phases[name] = {
+            "wall": finished - p["started"],
+            "cpu": cpu_finished - p["cpu_started"],
+            "stages": {},
+        }
+
+    for (phase, name), (calls, wall, cpu) in sorted(totals.items()):
+        entry = phases.setdefault(phase, {"wall": None, "cpu": None, "stages": {}})
+        entry["stages"][name] = {"calls": calls, "wall": wall, "cpu": cpu}
+    return phases
+
+
+def print_report(phases):
+    """輸出 report() 的表格"""
+    print(f"{'phase / stage':<24}{'calls':>8}{'wall s':>10}{'cpu s':>10}")
+    for name, phase in phases.items():
+        wall = f"{phase['wall']:.2f}" if phase["wall"] is not None else "-"
+        cpu = f"{phase['cpu']:.2f}" if phase["cpu"] is not None else "-"
+        print(f"{name:<24}{'':>8}{wall:>10}{cpu:>10}")
+        order = sorted(phase["stages"].items(), key=lambda item: -item[1]["wall"])
+        for stage_name, s in order:
+            print(f"  {stage_name:<22}{s['calls']:>8}{s['wall']:>10.2f}{s['cpu']:>10.2f}")
+
+
+def _thread_label(name):
+    # 同一個執行緒池的 worker (chal_0, chal_1 ...) 合併為一個根節點
+    return re.sub(r"_\d+$", "", name).replace(";", ":") or "thread"
+
+
+def _frame_label(code):
+    path = code.co_filename
+    short = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ":")
+
+
+class Sampler:
+    """以 ``sys._current_frames()`` 定期取樣所有執行緒的堆疊
+
+    結果以 folded stacks 格式 (``thread;outer;...;inner count``) 寫出，
+    可直接以 speedscope、flamegraph.pl 或 inferno 開啟。取樣的是 wall clock，
+    等待網路或鎖的執行緒同樣會出現在結果中。
+
+    Args:
+        path: 輸出檔案路徑
+        interval: 取樣間隔（秒）
+    """
+
+    def __init__(self, path, interval=SAMPLE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.samples = 0
+        self.counts = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        labels = {}
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(_thread_label(names.get(ident, str(ident))))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        """停止取樣並寫出檔案，回傳取樣次數"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        # 分析輸出屬於本機診斷資料，不經過儲存後端也不列入 manifest
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in sorted(self.counts.items()))
+        return self.samples
@@ -0,0 +1,67 @@
+"""Token-bucket rate limiting shared by all backup phases."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket with burst capacity.
+
+    Tokens refill continuously at ``rate`` per second up to ``burst``. A single
+    bucket is shared by every worker thread, so the aggregate rate across all
+    phases never exceeds ``rate``.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """初始化 token bucket
+
+        Args:
+            rate: 每秒補充的 token 數（必須大於 0）
+            burst: bucket 容量，預設為一秒的量
+            clock: 單調時鐘函數（測試用）
+            sleep: 等待函數（測試用）
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(self.rate, 1.0)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, amount=1):
+        """取得 amount 個 token，不足時阻塞等待
+
+        大於 burst 的請求會拆成多次取得，避免永遠無法滿足。
+        """
+        while amount > 0:
+            step = min(amount, self.burst)
+            with self._lock:
+                self._refill()
+                # 先扣除再等待，讓其他執行緒排在後面而不是搶同一批 token
+                self._tokens -= step
+                wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if wait > 0:
+                self._sleep(wait)
+            amount -= step
+
+
+def parse_rate(value):
+    """解析帶單位的速率字串，如 ``500K``、``2.5M``、``1G``（單位：bytes/s）"""
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    text = str(value).strip().upper().rstrip("/S").rstrip("B")
+    multiplier = 1
+    if text and text[-1] in units:
+        multiplier = units[text[-1]]
+        text = text[:-1]
+    rate = float(text) * multiplier
+    if rate <= 0:
+        raise ValueError(f"invalid rate: {value}")
+    return rate
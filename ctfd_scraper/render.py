@@ -0,0 +1,168 @@
+"""Shared Markdown/JSON rendering helpers.
+
+All README and ranking generators stream rows to the output file in batches
+instead of concatenating the whole document in memory.
+"""
+
+import gzip
+import io
+import json
+from itertools import islice
+from urllib.parse import quote
+
+from . import storage
+from .profiling import timed
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+ROW_BATCH = 4096  # Rows joined per write call
+GZIP_LEVEL = 6  # Same default as the gzip CLI
+ZSTD_LEVEL = 3  # zstandard default; fast with a better ratio than gzip -6
+JSON_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+_json_compression = None
+
+
+class Table:
+    """Markdown 表格的標題與分隔列
+
+    資料列由呼叫端以 f-string 產生，CPython 會將其編譯為單一 BUILD_STRING，
+    比 ``str.format`` 模板更快；本類別負責批次寫出。
+
+    Args:
+        header: 標題列，例如 ``"| 名稱 | 分數 |"``
+        separator: 分隔列，例如 ``"|------|-----:|"``
+    """
+
+    def __init__(self, header, separator):
+        self.head = f"{header}\n{separator}\n"
+
+    def write(self, f, rows):
+        """寫出標題與所有資料列，rows 為已含換行的字串可迭代物件"""
+        f.write(self.head)
+        write_lines(f, rows)
+
+
+@timed("render")
+def write_lines(f, lines):
+    """將字串串流每 ROW_BATCH 行合併為一次 write，記憶體用量固定"""
+    lines = iter(lines)
+    while True:
+        batch = "".join(islice(lines, ROW_BATCH))
+        if not batch:
+            return
+        f.write(batch)
+
+
+def escape_cell(value):
+    """跳脫 Markdown 表格儲存格中的 ``|``"""
+    return str(value).replace("|", "\\|")
+
+
+def folder_link(entity):
+    """隊伍或使用者資料夾（``{名稱}_{ID}``）的 URL 編碼連結"""
+    return quote(f"{entity['name'].replace('/', '_').strip()}_{entity['id']}")
+
+
+def link(*parts):
+    """組成 URL 編碼後的相對連結路徑"""
+    return "/".join(quote(part) for part in parts)
+
+
+@timed("render")
+def dumps_json(obj):
+    """以 indent=2 序列化 JSON，安裝 orjson 時使用較快的編碼器"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def dump_json(obj, f):
+    """將 JSON 一次寫入已開啟的文字檔"""
+    f.write(dumps_json(obj))
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd output requires zstandard: pip install 'ctfd-scraper[compress]'"
+        ) from e
+    return zstandard
+
+
+def set_json_compression(kind):
+    """設定 JSON 輸出的壓縮格式：None、``"gzip"`` 或 ``"zstd"``"""
+    global _json_compression
+    if kind not in JSON_SUFFIXES:
+        raise ValueError(f"unknown JSON compression: {kind!r}")
+    if kind == "zstd":
+        _zstd()  # 缺少套件時在開始備份前就失敗
+    _json_compression = kind
+
+
+def json_path(path):
+    """依目前的壓縮設定加上 ``.gz`` / ``.zst`` 副檔名"""
+    return path + JSON_SUFFIXES[_json_compression]
+
+
+class _CompressedText(io.TextIOWrapper):
+    """壓縮串流上的文字 writer，關閉時先寫出壓縮尾端再關閉底層檔案"""
+
+    def __init__(self, compressor, raw):
+        super().__init__(compressor, encoding="utf-8")
+        self._raw = raw
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            super().close()
+        finally:
+            self._raw.close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # 寫出壓縮尾端但不關閉底層檔案，再放棄寫入，不回報為完成的檔案
+        try:
+            super().close()
+        except Exception:
+            pass
+        storage.abort(self._raw)
+
+
+def open_json(path):
+    """開啟 JSON 輸出檔，path 不含壓縮副檔名
+
+    未設定壓縮時等同 ``storage.open(path, "w")``；否則寫入 ``json_path(path)``，
+    內容邊寫邊壓縮，記憶體用量與未壓縮時相同。
+    """
+    kind = _json_compression
+    if kind is None:
+        return storage.open(path, "w")
+    # 壓縮器每次只寫出小區塊，先合併再交給儲存後端 (與雜湊)
+    raw = io.BufferedWriter(storage.open(json_path(path), "wb"))
+    if kind == "gzip":
+        # mtime=0 讓相同內容產生相同位元組，manifest 雜湊可直接比較
+        compressor = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+    else:
+        compressor = _zstd().ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+    return _CompressedText(compressor, raw)
+
+
+def load_json(path):
+    """讀取 JSON 輸出檔，依副檔名自動解壓縮 ``.gz`` / ``.zst``"""
+    with storage.open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        data = gzip.decompress(data)
+    elif path.endswith(".zst"):
+        data = _zstd().ZstdDecompressor().decompressobj().decompress(data)
+    return json.loads(data)
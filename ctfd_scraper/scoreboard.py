@@ -1,85 +1,125 @@
 """Scoreboard backup module."""
 
-import json
-import os
+import shutil
+import tempfile
 
+from .jsonstream import STREAM_CHUNK_SIZE, JsonArrayWriter, iter_json_array
 from .logger import log
+from .render import Table, open_json
+from . import events, storage
 
+TEAM_TABLE = Table(
+    "| 排名 | 隊伍名稱 | 分數 | 成員數 | 成員列表 |",
+    "|-----:|----------|-----:|-------:|----------|",
+)
+USER_TABLE = Table("| 排名 | 成員名稱 | 分數 | 隊伍 |", "|-----:|----------|-----:|------|")
+
+
+def backup_scoreboard(client, backup_dir, journal=None):
+    """備份完整 Scoreboard
+
+    Args:
+        client: CTFdClient
+        backup_dir: 備份目錄
+        journal: Journal，續傳時若已完成則跳過
+    """
+    if journal and journal.phase_done("scoreboard"):
+        log("scoreboard", "+", "journal 顯示 Scoreboard 已完成，跳過")
+        return
 
-def backup_scoreboard(client, backup_dir):
-    """備份完整 Scoreboard"""
     log("scoreboard", "*", "開始備份 Scoreboard")
 
     scoreboard_dir = f"{backup_dir}/Scoreboard"
-    os.makedirs(scoreboard_dir, exist_ok=True)
+    storage.makedirs(scoreboard_dir)
 
     log("scoreboard", "*", "正在獲取 Scoreboard...")
-    scoreboard_response = client.session.get(f"{client.base_url}/api/v1/scoreboard", timeout=15)
-
-    if scoreboard_response.status_code == 200:
-        scoreboard_data = scoreboard_response.json().get("data", [])
-
-        # 儲存完整 JSON
-        with open(f"{scoreboard_dir}/team_ranking.json", "w", encoding="utf-8") as f:
-            json.dump(scoreboard_data, f, indent=2, ensure_ascii=False)
-
-        log("scoreboard", "+", f"找到 {len(scoreboard_data)} 個隊伍")
-
-        # 建立 Markdown 排行榜
-        md_content = "# Team Ranking\n\n"
-        md_content += f"總計 {len(scoreboard_data)} 個隊伍\n\n"
-        md_content += "| 排名 | 隊伍名稱 | 分數 | 成員數 | 成員列表 |\n"
-        md_content += "|-----:|----------|-----:|-------:|----------|\n"
-
-        for team in scoreboard_data:
-            pos = team.get("pos", "N/A")
-            name = team.get("name", "Unknown")
-            score = team.get("score", 0)
-            members = team.get("members", [])
-            member_count = len(members)
-
-            member_names = ", ".join([m.get("name", "Unknown") for m in members[:5]])
-            if len(members) > 5:
-                member_names += f" ... ({len(members)-5} more)"
-
-            md_content += f"| {pos} | {name} | {score} | {member_count} | {member_names} |\n"
-
-        with open(f"{scoreboard_dir}/TEAM_RANKING.md", "w", encoding="utf-8") as f:
-            f.write(md_content)
-
-        log("scoreboard", "+", "完整 Scoreboard 已儲存")
-
-        # 建立詳細的成員排行榜
-        all_members = []
-        for team in scoreboard_data:
-            team_name = team.get("name", "Unknown")
-            for member in team.get("members", []):
-                all_members.append(
-                    {
-                        "name": member.get("name", "Unknown"),
-                        "id": member.get("id"),
-                        "score": member.get("score", 0),
-                        "team": team_name,
-                    }
+    scoreboard_response = client.get(f"{client.base_url}/api/v1/scoreboard", stream=True)
+
+    try:
+        if scoreboard_response.status_code == 200:
+            # 隊伍逐筆串流處理：JSON 直接寫出，Markdown 表格列先寫入本機暫存檔，
+            # 因為標題需要總數，最後再與標題合併；成員只保留排序所需的 tuple。
+            # 暫存檔由最外層的 with 管理，解析失敗時同樣會關閉
+            all_members = []
+            team_count = 0
+
+            with tempfile.TemporaryFile("w+", encoding="utf-8") as rows_file:
+                json_file = open_json(f"{scoreboard_dir}/team_ranking.json")
+                with json_file, JsonArrayWriter(json_file) as writer:
+                    for team in iter_json_array(
+                        client.iter_body(scoreboard_response, STREAM_CHUNK_SIZE)
+                    ):
+                        # 儲存完整 JSON
+                        writer.write(team)
+                        team_count += 1
+                        events.emit(events.ScoreboardRow(team))
+
+                        pos = team.get("pos", "N/A")
+                        name = team.get("name", "Unknown")
+                        score = team.get("score", 0)
+                        members = team.get("members", [])
+                        member_count = len(members)
+
+                        member_names = ", ".join([m.get("name", "Unknown") for m in members[:5]])
+                        if len(members) > 5:
+                            member_names += f" ... ({len(members)-5} more)"
+
+                        rows_file.write(
+                            f"| {pos} | {name} | {score} | {member_count} | {member_names} |\n"
+                        )
+
+                        for member in members:
+                            all_members.append(
+                                (
+                                    member.get("name", "Unknown"),
+                                    member.get("id"),
+                                    member.get("score", 0),
+                                    name,
+                                )
+                            )
+
+                log("scoreboard", "+", f"找到 {team_count} 個隊伍")
+
+                # 建立 Markdown 排行榜
+                with storage.open(f"{scoreboard_dir}/TEAM_RANKING.md", "w") as f:
+                    f.write("# Team Ranking\n\n")
+                    f.write(f"總計 {team_count} 個隊伍\n\n")
+                    f.write(TEAM_TABLE.head)
+                    rows_file.seek(0)
+                    shutil.copyfileobj(rows_file, f)
+
+            log("scoreboard", "+", "完整 Scoreboard 已儲存")
+
+            # 建立詳細的成員排行榜
+            all_members.sort(key=lambda x: -x[2])
+
+            # 建立成員排行榜
+            with storage.open(f"{scoreboard_dir}/USER_RANKING.md", "w") as f:
+                f.write("# User Ranking\n\n")
+                f.write(f"總計 {len(all_members)} 位成員\n\n")
+                USER_TABLE.write(
+                    f,
+                    (
+                        f"| {idx} | {m_name} | {m_score} | {m_team} |\n"
+                        for idx, (m_name, _, m_score, m_team) in enumerate(all_members, 1)
+                    ),
                 )
 
-        all_members.sort(key=lambda x: -x["score"])
-
-        # 建立成員排行榜
-        members_md = "# User Ranking\n\n"
-        members_md += f"總計 {len(all_members)} 位成員\n\n"
-        members_md += "| 排名 | 成員名稱 | 分數 | 隊伍 |\n"
-        members_md += "|-----:|----------|-----:|------|\n"
-
-        for idx, member in enumerate(all_members, 1):
-            members_md += f"| {idx} | {member['name']} | {member['score']} | {member['team']} |\n"
-
-        with open(f"{scoreboard_dir}/USER_RANKING.md", "w", encoding="utf-8") as f:
-            f.write(members_md)
-
-        with open(f"{scoreboard_dir}/user_ranking.json", "w", encoding="utf-8") as f:
-            json.dump(all_members, f, indent=2, ensure_ascii=False)
-
-        log("scoreboard", "+", f"成員排行榜已儲存 ({len(all_members)} 位成員)")
-    else:
-        log("scoreboard", "-", f"無法獲取 Scoreboard (狀態碼: {scoreboard_response.status_code})")
+            with open_json(f"{scoreboard_dir}/user_ranking.json") as f:
+                writer = JsonArrayWriter(f)
+                for m_name, m_id, m_score, m_team in all_members:
+                    writer.write({"name": m_name, "id": m_id, "score": m_score, "team": m_team})
+                writer.close()
+
+            log("scoreboard", "+", f"成員排行榜已儲存 ({len(all_members)} 位成員)")
+            if journal:
+                journal.record_phase("scoreboard")
+        else:
+            log(
+                "scoreboard",
+                "-",
+                f"無法獲取 Scoreboard (狀態碼: {scoreboard_response.status_code})",
+            )
+    finally:
+        # 非 200 或解析中途失敗時回應未讀完，關閉以歸還連線 (HTTP/2 為 stream 配額)
+        scoreboard_response.close()
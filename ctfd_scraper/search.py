@@ -0,0 +1,236 @@
+"""SQLite FTS5 full-text index over backed-up challenges."""
+
+import argparse
+import glob
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+
+from . import storage
+from .logger import log
+
+SEARCH_DB = "search.db"
+DEFAULT_LIMIT = 20
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS challenges USING fts5(
+    name, category, author, description, files,
+    id UNINDEXED, value UNINDEXED, path UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# snippet() 取 description 欄位（第 4 欄，索引 3）
+_QUERY = """
+SELECT name, category, author, id, value, path,
+       snippet(challenges, 3, '[', ']', '…', 12) AS snippet,
+       bm25(challenges, 10.0, 2.0, 2.0, 1.0, 4.0) AS rank
+FROM challenges WHERE challenges MATCH ? ORDER BY rank LIMIT ?
+"""
+
+
+_DESCRIPTION_START = "\n## Description\n\n"
+_DESCRIPTION_END = "\n\n## Solves\n\n"
+
+
+def description_from_markdown(text):
+    """由 description.md 取回題目說明原文 (``## Description`` 與 ``## Solves`` 之間)"""
+    start = text.find(_DESCRIPTION_START)
+    if start < 0:
+        return ""
+    start += len(_DESCRIPTION_START)
+    end = text.rfind(_DESCRIPTION_END)
+    return text[start:end] if end >= start else text[start:]
+
+
+class SearchIndex:
+    """題目全文索引，寫在本機備份目錄中的 ``search.db``
+
+    索引名稱、分類、作者、說明與附件檔名。多個題目執行緒共用同一個連線，
+    每筆寫入後立即 commit，因此與 journal 一樣在中斷後仍保持一致；同一題目
+    重新處理時會取代舊的紀錄。
+
+    Args:
+        backup_dir: 備份目錄
+        ctf_name: CTF 名稱，查詢結果用來標示來源
+    """
+
+    def __init__(self, backup_dir, ctf_name=None):
+        self.path = os.path.join(backup_dir, SEARCH_DB)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('ctf_name', ?)",
+                (ctf_name or os.path.basename(os.path.normpath(backup_dir)),),
+            )
+
+    def add(self, chal, description, files):
+        """新增或取代一個題目
+
+        Args:
+            chal: process_challenge 的摘要 (id、name、category、author、value、folder_name)
+            description: 題目說明原文
+            files: 附件檔名清單
+        """
+        path = f"Challenges/{chal['category']}/{chal['folder_name']}"
+        with self._lock, self._conn:
+            # rowid 即題目 ID，重新處理時以 rowid 刪除舊紀錄
+            self._conn.execute("DELETE FROM challenges WHERE rowid = ?", (chal["id"],))
+            self._conn.execute(
+                "INSERT INTO challenges(rowid, name, category, author, description, files, "
+                "id, value, path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    chal["id"],
+                    chal["name"],
+                    chal["category"],
+                    chal.get("author") or "",
+                    description or "",
+                    " ".join(files),
+                    chal["id"],
+                    chal.get("value", 0),
+                    path,
+                ),
+            )
+
+    def add_backed_up(self, summaries, backup_dir):
+        """補建索引中缺少的題目，說明由已備份的 description.md 讀回
+
+        續傳時 journal 中已完成的題目不會再經過 process_challenge，若先前的
+        執行沒有建立索引，這些題目只能從備份內容補上。
+
+        Args:
+            summaries: journal 中的題目摘要
+            backup_dir: 備份目錄
+
+        Returns:
+            int: 補建的題目數
+        """
+        with self._lock:
+            indexed = {row[0] for row in self._conn.execute("SELECT rowid FROM challenges")}
+        added = 0
+        for chal in summaries:
+            if chal["id"] in indexed:
+                continue
+            folder = f"Challenges/{chal['category']}/{chal['folder_name']}"
+            try:
+                with storage.open(f"{backup_dir}/{folder}/description.md", "r") as f:
+                    description = description_from_markdown(f.read())
+            except Exception as e:
+                log("search", "!", f"{chal['name']}: 無法讀取 description.md，略過索引 ({e})")
+                continue
+            files = [
+                path.rsplit("/", 1)[-1]
+                for path in chal.get("written", [])
+                if not path.endswith("/description.md")
+            ]
+            self.add(chal, description, files + chal.get("missing_files", []))
+            added += 1
+        return added
+
+    def close(self):
+        with self._lock:
+            self._conn.execute("INSERT INTO challenges(challenges) VALUES ('optimize')")
+            self._conn.commit()
+            self._conn.close()
+
+
+def find_databases(paths):
+    """展開路徑為 search.db 清單：可直接指定檔案、備份目錄或其上層目錄"""
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            candidates = [path]
+        elif os.path.isfile(os.path.join(path, SEARCH_DB)):
+            candidates = [os.path.join(path, SEARCH_DB)]
+        else:
+            candidates = sorted(glob.glob(os.path.join(path, "*", SEARCH_DB)))
+        found.extend(c for c in candidates if c not in found)
+    return found
+
+
+def _quote_terms(query):
+    """將查詢字詞逐一加上引號，避免 ``-``、``:`` 等字元被當成 FTS5 語法"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def search(databases, query, limit=DEFAULT_LIMIT):
+    """在多個索引中查詢，依 bm25 分數合併排序
+
+    query 使用 FTS5 語法 (``heap AND tcache``、``tcache*``、``"use after free"``)；
+    語法錯誤時改為將每個字詞視為字面字串再查詢一次。
+
+    Returns:
+        list[dict]: 依相關度排序的結果，含 ctf、backup、name、category、path、snippet 等
+    """
+    results = []
+    for db_path in databases:
+        uri = pathlib.Path(db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            try:
+                rows = conn.execute(_QUERY, (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                rows = conn.execute(_QUERY, (_quote_terms(query), limit)).fetchall()
+        finally:
+            conn.close()
+
+        backup = os.path.dirname(db_path)
+        for row in rows:
+            result = dict(row)
+            result["ctf"] = meta.get("ctf_name", os.path.basename(backup))
+            result["backup"] = backup
+            results.append(result)
+
+    results.sort(key=lambda r: r["rank"])
+    return results[:limit]
+
+
+def search_main(argv):
+    """``ctfdscraper search`` 子命令"""
+    parser = argparse.ArgumentParser(
+        prog="ctfdscraper search",
+        description="Full-text search across challenge indexes built with --search-index",
+    )
+    parser.add_argument("query", help='FTS5 query, e.g. "heap tcache" or "use after free"')
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["."],
+        help="search.db files, backup directories or directories containing backups "
+        "(default: current directory)",
+    )
+    parser.add_argument(
+        "-l", "--limit", type=int, default=DEFAULT_LIMIT, help="Maximum results (default: 20)"
+    )
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    databases = find_databases(args.paths)
+    if not databases:
+        log("search", "-", "找不到 search.db，請先以 --search-index 備份")
+        sys.exit(2)
+
+    start = time.perf_counter()
+    results = search(databases, args.query, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    for r in results:
+        print(f"{r['ctf']} | {r['category']} | {r['name']} ({r['value']} pts)")
+        print(f"    {os.path.join(r['backup'], r['path'])}")
+        if r["snippet"]:
+            print(f"    {' '.join(r['snippet'].split())}")
+    log("search", "*", f"{len(results)} 筆結果，搜尋 {len(databases)} 個備份 ({elapsed:.1f} ms)")
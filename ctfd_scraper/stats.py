@@ -0,0 +1,207 @@
+"""Shared progress counters updated by backup workers.
+
+Workers only bump counters under a short lock; anything that displays progress
+(the live dashboard, profiling) reads a consistent copy with ``snapshot()``.
+"""
+
+import contextlib
+import itertools
+import threading
+import time
+
+
+class _Phase:
+    __slots__ = (
+        "listed",
+        "done",
+        "failed",
+        "listing_done",
+        "started",
+        "finished",
+        "cpu_started",
+        "cpu_finished",
+    )
+
+    def __init__(self):
+        self.listed = 0
+        self.done = 0
+        self.failed = 0
+        self.listing_done = False
+        self.started = time.monotonic()
+        self.finished = None
+        # 行程 CPU 時間，涵蓋所有 worker 執行緒
+        self.cpu_started = time.process_time()
+        self.cpu_finished = None
+
+
+class _Download:
+    __slots__ = ("name", "total", "received", "started")
+
+    def __init__(self, name, total):
+        self.name = name
+        self.total = total
+        self.received = 0
+        self.started = time.monotonic()
+
+
+class Stats:
+    """一次備份執行的計數器"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.bytes = 0
+        self.download_errors = 0
+        # content-encoding → [回應數, 線上位元組, 解碼後位元組]
+        self.transfers = {}
+        self.phases = {}
+        self.current = None
+        self.downloads = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+
+_stats = Stats()
+
+
+def _phase(s, name):
+    # 直接呼叫 backup_* 而未經 run_backup 時，第一個事件即建立階段
+    phase = s.phases.get(name)
+    if phase is None:
+        phase = s.phases[name] = _Phase()
+    return phase
+
+
+def reset():
+    """開始新的一次執行，清除所有計數"""
+    global _stats
+    _stats = Stats()
+
+
+def request():
+    """記錄一個 HTTP 請求"""
+    s = _stats
+    with s._lock:
+        s.requests += 1
+
+
+def transfer(encoding, wire, decoded):
+    """記錄一個回應本體在線上與解碼後的大小"""
+    s = _stats
+    with s._lock:
+        entry = s.transfers.get(encoding)
+        if entry is None:
+            entry = s.transfers[encoding] = [0, 0, 0]
+        entry[0] += 1
+        entry[1] += wire
+        entry[2] += decoded
+
+
+def phase_start(name):
+    """開始一個備份階段"""
+    s = _stats
+    with s._lock:
+        s.phases[name] = _Phase()
+        s.current = name
+
+
+def phase_end(name):
+    s = _stats
+    with s._lock:
+        phase = _phase(s, name)
+        phase.listing_done = True
+        phase.finished = time.monotonic()
+        phase.cpu_finished = time.process_time()
+        if s.current == name:
+            s.current = None
+
+
+def current_phase():
+    """目前執行中的階段名稱，不在任何階段內時為 None"""
+    return _stats.current
+
+
+@contextlib.contextmanager
+def phase(name):
+    """以 with 區塊標示一個備份階段的開始與結束"""
+    phase_start(name)
+    try:
+        yield
+    finally:
+        phase_end(name)
+
+
+def listed(name, count=1):
+    """清單串流中又取得 count 個實體"""
+    s = _stats
+    with s._lock:
+        _phase(s, name).listed += count
+
+
+def listing_done(name):
+    """清單已讀完，listed 即為總數"""
+    s = _stats
+    with s._lock:
+        _phase(s, name).listing_done = True
+
+
+def entity_done(name, ok=True):
+    """一個實體處理完成 (ok=False 表示失敗)"""
+    s = _stats
+    with s._lock:
+        phase = _phase(s, name)
+        if ok:
+            phase.done += 1
+        else:
+            phase.failed += 1
+
+
+def download_start(name, total):
+    """登記一個進行中的下載，回傳之後更新用的 handle"""
+    s = _stats
+    handle = next(s._ids)
+    with s._lock:
+        s.downloads[handle] = _Download(name, total)
+    return handle
+
+
+def download_bytes(handle, amount):
+    s = _stats
+    with s._lock:
+        s.bytes += amount
+        download = s.downloads.get(handle)
+        if download:
+            download.received += amount
+
+
+def download_end(handle, ok=True):
+    s = _stats
+    with s._lock:
+        s.downloads.pop(handle, None)
+        if not ok:
+            s.download_errors += 1
+
+
+def snapshot():
+    """回傳目前計數的複本（純 dict/list），供顯示端在鎖外使用"""
+    s = _stats
+    with s._lock:
+        return {
+            "now": time.monotonic(),
+            "started": s.started,
+            "requests": s.requests,
+            "bytes": s.bytes,
+            "download_errors": s.download_errors,
+            "transfers": {
+                encoding: {"responses": n, "wire": wire, "decoded": decoded}
+                for encoding, (n, wire, decoded) in s.transfers.items()
+            },
+            "phases": {
+                name: {slot: getattr(p, slot) for slot in _Phase.__slots__}
+                for name, p in s.phases.items()
+            },
+            "downloads": [
+                {slot: getattr(d, slot) for slot in _Download.__slots__}
+                for d in s.downloads.values()
+            ],
+        }
@@ -0,0 +1,407 @@
+"""Pluggable storage backends for backup output.
+
+Every backup module writes through ``storage.open()`` / ``storage.makedirs()``
+instead of the filesystem directly, so the same run can target the local
+disk, memory (tests, programmatic use) or an S3-compatible object store.
+"""
+
+import builtins
+import hashlib
+import io
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import profiling
+
+PART_SIZE = 8 * 1024 * 1024  # S3 multipart part size (minimum 5 MB)
+MAX_PENDING_UPLOADS = 256  # Small objects buffered before writers block
+
+
+def _normalize(path):
+    return posixpath.normpath(str(path).replace(os.sep, "/")).lstrip("/")
+
+
+def abort(f):
+    """放棄寫入中的檔案：關閉底層 writer 但不當作完成的檔案
+
+    支援 ``abort()`` 的 writer (S3 multipart、記憶體、雜湊) 不會留下物件，
+    也不會回報給 observer；其他檔案僅關閉。
+    """
+    raw = getattr(f, "raw", f)  # BufferedWriter 包裝時取出底層 writer
+    if hasattr(raw, "abort"):
+        raw.abort()
+    else:
+        raw.close()
+
+
+class _TextWriter(io.TextIOWrapper):
+    """binary writer 上的 UTF-8 文字 writer；with 區塊拋出例外時放棄寫入"""
+
+    def __init__(self, raw):
+        super().__init__(io.BufferedWriter(raw), encoding="utf-8")
+        self._raw = raw
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # 底層關閉後 TextIOWrapper 也視為已關閉，緩衝中的內容直接丟棄
+            abort(self._raw)
+
+
+def _wrap(raw, mode):
+    """依模式包裝原始 binary writer/reader"""
+    if "b" in mode:
+        return raw
+    if "w" in mode:
+        return _TextWriter(raw)
+    return io.TextIOWrapper(io.BufferedReader(raw), encoding="utf-8")
+
+
+class LocalStorage:
+    """本機檔案系統"""
+
+    def open(self, path, mode="w"):
+        if "b" in mode:
+            # 二進位寫入通常是大區塊，直接交給作業系統不再經過 Python 緩衝
+            return builtins.open(path, mode, buffering=0 if "w" in mode else -1)
+        return builtins.open(path, mode, encoding="utf-8")
+
+    def makedirs(self, path):
+        os.makedirs(path, exist_ok=True)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def flush(self):
+        pass
+
+
+class _MemoryWriter(io.RawIOBase):
+    def __init__(self, store, key):
+        self._store = store
+        self._key = key
+        self._buf = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buf += b
+        return len(b)
+
+    def abort(self):
+        self._buf = bytearray()
+        super().close()
+
+    def close(self):
+        if not self.closed:
+            with self._store._lock:
+                self._store.files[self._key] = bytes(self._buf)
+        super().close()
+
+
+class MemoryStorage:
+    """記憶體儲存，``files`` 以正規化路徑對應檔案內容 (bytes)"""
+
+    def __init__(self):
+        self.files = {}
+        self._lock = threading.Lock()
+
+    def open(self, path, mode="w"):
+        key = _normalize(path)
+        if "w" in mode:
+            return _wrap(_MemoryWriter(self, key), mode)
+        if key not in self.files:
+            raise FileNotFoundError(path)
+        return _wrap(io.BytesIO(self.files[key]), mode)
+
+    def makedirs(self, path):
+        pass
+
+    def exists(self, path):
+        return _normalize(path) in self.files
+
+    def remove(self, path):
+        with self._lock:
+            self.files.pop(_normalize(path), None)
+
+    def flush(self):
+        pass
+
+
+class _S3Writer(io.RawIOBase):
+    """緩衝寫入；超過 part_size 時轉為 multipart upload 邊寫邊傳"""
+
+    def __init__(self, store, key):
+        self._store = store
+        self._key = key
+        self._buf = bytearray()
+        self._upload_id = None
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buf += b
+        while len(self._buf) >= self._store.part_size:
+            self._upload_part(self._store.part_size)
+        return len(b)
+
+    def _upload_part(self, size):
+        s3, bucket = self._store.client, self._store.bucket
+        if self._upload_id is None:
+            response = s3.create_multipart_upload(Bucket=bucket, Key=self._key)
+            self._upload_id = response["UploadId"]
+        data = bytes(self._buf[:size])
+        del self._buf[:size]
+        number = len(self._parts) + 1
+        response = s3.upload_part(
+            Bucket=bucket, Key=self._key, UploadId=self._upload_id, PartNumber=number, Body=data
+        )
+        self._parts.append({"ETag": response["ETag"], "PartNumber": number})
+
+    def abort(self):
+        """放棄上傳（例如下載失敗），不留下不完整的物件"""
+        if self._upload_id is not None:
+            self._store.client.abort_multipart_upload(
+                Bucket=self._store.bucket, Key=self._key, UploadId=self._upload_id
+            )
+        self._buf = bytearray()
+        self._upload_id = None
+        super().close()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self._store._put_async(self._key, bytes(self._buf))
+            else:
+                if self._buf:
+                    self._upload_part(len(self._buf))
+                self._store.client.complete_multipart_upload(
+                    Bucket=self._store.bucket,
+                    Key=self._key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts},
+                )
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            super().close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class S3Storage:
+    """S3 相容物件儲存（AWS S3、MinIO 等）
+
+    小檔案在 close 時交給背景執行緒，每個檔案各自以一次 put_object 上傳，
+    寫入端不必等待；未完成的數量超過 MAX_PENDING_UPLOADS 時寫入端會等待。
+    附件等大檔案以 multipart upload 串流上傳，記憶體中最多保留一個 part。
+    寫入過程拋出例外時 (二進位或文字模式) 放棄 multipart upload，不留下物件。
+
+    Args:
+        bucket: bucket 名稱
+        prefix: 物件 key 前綴
+        client: boto3 S3 client，未提供時以 endpoint_url 建立
+        endpoint_url: S3 相容服務的端點，例如 ``http://localhost:9000``
+        part_size: multipart 每個 part 的大小
+        max_workers: 背景上傳執行緒數
+    """
+
+    def __init__(
+        self, bucket, prefix="", client=None, endpoint_url=None, part_size=PART_SIZE, max_workers=8
+    ):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise ImportError(
+                    "S3 storage requires boto3: pip install 'ctfd-scraper[s3]'"
+                ) from e
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = _normalize(prefix) if prefix else ""
+        self.part_size = part_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(MAX_PENDING_UPLOADS)
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def key(self, path):
+        key = _normalize(path)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _put(self, key, data):
+        try:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        finally:
+            self._slots.release()
+
+    def _put_async(self, key, data):
+        self._slots.acquire()
+        future = self._executor.submit(self._put, key, data)
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done() or f.exception()]
+            self._futures.append(future)
+
+    def open(self, path, mode="w"):
+        if "w" in mode:
+            return _wrap(_S3Writer(self, self.key(path)), mode)
+        response = self.client.get_object(Bucket=self.bucket, Key=self.key(path))
+        return _wrap(io.BytesIO(response["Body"].read()), mode)
+
+    def makedirs(self, path):
+        pass  # 物件儲存沒有目錄
+
+    def exists(self, path):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(path))
+            return True
+        except Exception:
+            return False
+
+    def remove(self, path):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(path))
+
+    def flush(self):
+        """等待所有背景上傳完成，有失敗時拋出第一個錯誤"""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+
+class _HashingWriter(io.RawIOBase):
+    """邊寫入邊計算 SHA-256，成功關閉後通知 observer"""
+
+    def __init__(self, raw, path, source, observer):
+        self._raw = raw
+        self._path = path
+        self._source = source
+        self._observer = observer
+        self._hash = hashlib.sha256()
+        self._size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        with profiling.stage("write"):
+            n = self._raw.write(b)
+            # 底層為無緩衝檔案時可能只寫入部分資料，只雜湊實際寫入的部分
+            if n is None or n == len(b):
+                self._hash.update(b)
+                n = len(b)
+            else:
+                self._hash.update(memoryview(b)[:n])
+        self._size += n
+        return n
+
+    def fileno(self):
+        return self._raw.fileno()
+
+    def truncate(self, size=None):
+        # 只用於截掉預先配置的空間，不影響已雜湊的內容
+        return self._raw.truncate(size)
+
+    def abort(self):
+        abort(self._raw)
+        super().close()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            with profiling.stage("write"):
+                self._raw.close()
+            self._observer(self._path, self._size, self._hash.hexdigest(), self._source)
+        finally:
+            super().close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+_backend = LocalStorage()
+_observer = None
+
+
+def set_backend(backend):
+    """設定全域儲存後端"""
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    return _backend
+
+
+def set_observer(observer):
+    """設定寫入完成時的回呼 ``observer(path, size, sha256, source)``，None 表示停用"""
+    global _observer
+    _observer = observer
+
+
+def open(path, mode="w", source=None):
+    """以目前的後端開啟檔案；文字模式一律使用 UTF-8
+
+    設定 observer 時，寫入的內容會在串流過程中計算 SHA-256，檔案成功關閉後
+    連同大小與 source（例如下載來源 URL）回報給 observer。
+    """
+    if "w" in mode and _observer is not None:
+        raw = _HashingWriter(_backend.open(path, "wb"), path, source, _observer)
+        return _wrap(raw, mode)
+    return _backend.open(path, mode)
+
+
+def makedirs(path):
+    _backend.makedirs(path)
+
+
+def exists(path):
+    return _backend.exists(path)
+
+
+def remove(path):
+    """刪除檔案，不存在時略過"""
+    _backend.remove(path)
+
+
+def flush():
+    """等待後端完成所有待處理的寫入"""
+    _backend.flush()
+
+
+def from_url(url, endpoint_url=None):
+    """由 ``--storage`` 參數建立後端：``local``、``memory`` 或 ``s3://bucket/prefix``"""
+    if not url or url == "local":
+        return LocalStorage()
+    if url == "memory":
+        return MemoryStorage()
+    if url.startswith("s3://"):
+        bucket, _, prefix = url[len("s3://") :].partition("/")
+        if not bucket:
+            raise ValueError(f"missing bucket in storage URL: {url}")
+        return S3Storage(bucket, prefix, endpoint_url=endpoint_url)
+    raise ValueError(f"unsupported storage URL: {url}")
@@ -1,33 +1,47 @@
 """Teams backup module."""
 
-import json
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
+from .executor import WINDOW_FACTOR, submit_bounded
+from .failures import FailureQueue, describe_error, retry_failed
 from .logger import log, print_lock
+from .render import Table, dump_json, escape_cell, folder_link, json_path, open_json
+from . import events, stats, storage
 
 MAX_WORKERS_TEAMS = 20
 
+MEMBERS_TABLE = Table("| 姓名 | ID | 分數 |", "|------|----:|-----:|")
+SOLVES_TABLE = Table("| 題目 | 解題者 | 時間 |", "|------|--------|------|")
+INDEX_TABLE = Table("| 隊伍名稱 | ID | 成員數 | 分數 |", "|----------|---:|-------:|-----:|")
+
 processed_count = {"teams": 0}
-failed_count = {"teams": 0}
+skipped_count = {"teams": 0}
 
 
 def process_team(client, team_data, idx, total, backup_dir):
-    """處理單個隊伍的備份"""
+    """處理單個隊伍的備份
+
+    Returns:
+        dict: 隊伍資料；無權限、不存在或無解題紀錄時回傳 None (略過)
+
+    Raises:
+        APIError, requests.RequestException: 請求失敗，由 backup_teams 稍後重試
+    """
     team_id = team_data.get("id")
     team_name = team_data.get("name", f"Team_{team_id}").replace("/", "_").strip()
 
-    team_detail = client.fetch_api(f"/api/v1/teams/{team_id}")
+    team_detail = client.fetch_data(f"/api/v1/teams/{team_id}", allow_missing=True)
     if not team_detail:
         with print_lock:
-            failed_count["teams"] += 1
+            skipped_count["teams"] += 1
         return None
 
-    solves_data = client.fetch_api(f"/api/v1/teams/{team_id}/solves")
+    solves_data = client.fetch_data(f"/api/v1/teams/{team_id}/solves", allow_missing=True)
     if not solves_data:
         log("team", "!", f"{team_name} (ID:{team_id}) 無解題紀錄，跳過")
         with print_lock:
-            failed_count["teams"] += 1
+            skipped_count["teams"] += 1
         return None
 
     solves_list = []
@@ -46,7 +60,7 @@ def process_team(client, team_data, idx, total, backup_dir):
     members_list = []
     if member_ids:
         for member_id in member_ids:
-            member_info = client.fetch_api(f"/api/v1/users/{member_id}")
+            member_info = client.fetch_data(f"/api/v1/users/{member_id}", allow_missing=True)
             if member_info:
                 members_list.append(
                     {
@@ -57,7 +71,7 @@ def process_team(client, team_data, idx, total, backup_dir):
                 )
 
     # 取得獎項
-    awards_data = client.fetch_api(f"/api/v1/teams/{team_id}/awards")
+    awards_data = client.fetch_data(f"/api/v1/teams/{team_id}/awards", allow_missing=True)
     awards_list = []
     if awards_data:
         for award in awards_data:
@@ -75,7 +89,8 @@ def process_team(client, team_data, idx, total, backup_dir):
         current_count = processed_count["teams"]
 
     if current_count % 10 == 0:
-        log("team", "*", f"進度: {current_count}/{total} 隊伍")
+        progress = f"{current_count}/{total}" if total else f"{current_count}"
+        log("team", "*", f"進度: {progress} 隊伍")
 
     return {
         "id": team_id,
@@ -93,45 +108,146 @@ def process_team(client, team_data, idx, total, backup_dir):
     }
 
 
-def backup_teams(client, backup_dir):
-    """備份所有隊伍資訊"""
+def backup_teams(client, backup_dir, journal=None, filters=None, failures=None):
+    """備份所有隊伍資訊
+
+    Args:
+        client: CTFdClient
+        backup_dir: 備份目錄
+        journal: Journal，提供時會跳過已完成的隊伍並記錄新完成的隊伍
+        filters: Filters，不符合的隊伍在送出任何詳細資料請求前就略過
+        failures: FailureQueue，請求失敗的隊伍在階段結束時重試，仍失敗者留在佇列中
+    """
     log("team", "*", "開始備份隊伍資訊")
 
-    log("team", "*", "正在獲取隊伍列表...")
-    teams_data = client.fetch_all_pages("/api/v1/teams")
-    if not teams_data:
-        log("team", "-", "無法取得隊伍列表")
+    teams_dir = f"{backup_dir}/Teams"
+    storage.makedirs(teams_dir)
+
+    if journal and journal.phase_done("teams"):
+        all_teams_summary = journal.summaries("team")
+        log("team", "+", f"journal 顯示隊伍已全部完成 ({len(all_teams_summary)} 個)，僅重建索引")
+        generate_teams_readme(all_teams_summary, teams_dir)
         return
 
-    log("team", "+", f"找到 {len(teams_data)} 個隊伍")
+    log("team", "*", "正在串流獲取隊伍列表...")
     log("team", "*", f"使用 {MAX_WORKERS_TEAMS} 個並行線程處理")
 
-    teams_dir = f"{backup_dir}/Teams"
-    os.makedirs(teams_dir, exist_ok=True)
-
-    all_teams_summary = []
+    all_teams_summary = journal.summaries("team") if journal else []
+    if all_teams_summary:
+        log("team", "*", f"續傳: 跳過 {len(all_teams_summary)} 個已完成隊伍")
     processed_count["teams"] = 0
-    failed_count["teams"] = 0
-
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS_TEAMS) as executor:
-        futures = {
-            executor.submit(process_team, client, team, idx, len(teams_data), backup_dir): team
-            for idx, team in enumerate(teams_data, 1)
+    skipped_count["teams"] = 0
+    if failures is None:
+        failures = FailureQueue()
+
+    listing = {"count": 0, "filtered": 0, "queued": 0, "done": False}
+
+    def pending_teams():
+        for team in client.iter_pages("/api/v1/teams"):
+            if filters and not filters.keep_team(client, team):
+                listing["filtered"] += 1
+                continue
+            listing["count"] += 1
+            stats.listed("teams")
+            if journal and journal.is_done("team", team.get("id")):
+                stats.entity_done("teams")
+                continue
+            listing["queued"] += 1
+            yield listing["count"], team
+        listing["done"] = True
+        stats.listing_done("teams")
+
+    def process(item):
+        idx, team = item
+        # 列表仍在串流時總數未定，讀完後進度才顯示為 N/本次需處理的總數 (不含續傳略過者)
+        total = listing["queued"] if listing["done"] else None
+        return process_team(client, team, idx, total, backup_dir)
+
+    def handle(item, future):
+        _, team = item
+        try:
+            team_info = future.result()
+        except Exception as e:
+            log(
+                "team",
+                "-",
+                f"{team.get('name')} (ID:{team.get('id')}) 處理失敗: {describe_error(e)}",
+            )
+            failures.add("team", item, team.get("id"), team.get("name"), e)
+            return
+
+        stats.entity_done("teams")
+        if not team_info:
+            # 略過的隊伍也記入 journal，續傳時不再請求
+            if journal:
+                journal.record_entity("team", team.get("id"), None)
+            return
+
+        team_name = team_info["name"].replace("/", "_").strip()
+        team_id = team_info["id"]
+        team_folder = f"{teams_dir}/{team_name}_{team_id}"
+        storage.makedirs(team_folder)
+
+        with open_json(f"{team_folder}/team_info.json") as f:
+            dump_json(team_info, f)
+
+        # 建立 Markdown
+        write_team_readme(team_info, f"{team_folder}/README.md")
+
+        # 索引只需要摘要欄位，不保留完整的解題與成員資料
+        summary = {
+            "id": team_info["id"],
+            "name": team_info["name"],
+            "score": team_info["score"],
+            "member_count": len(team_info["members"]),
         }
+        all_teams_summary.append(summary)
+        if journal:
+            written = [
+                os.path.relpath(json_path(f"{team_folder}/team_info.json"), backup_dir),
+                os.path.relpath(f"{team_folder}/README.md", backup_dir),
+            ]
+            journal.record_entity("team", team_id, summary, written)
+        events.emit(events.TeamRecord(team_info))
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS_TEAMS, thread_name_prefix="team") as executor:
+        window = MAX_WORKERS_TEAMS * WINDOW_FACTOR
+
+        for item, future in submit_bounded(executor, process, pending_teams(), window):
+            handle(item, future)
+
+    for item, future in retry_failed(failures, "team", process, MAX_WORKERS_TEAMS, "team"):
+        handle(item, future)
+    unresolved = failures.remaining("team")
+    for _ in unresolved:
+        stats.entity_done("teams", ok=False)
+    if unresolved:
+        log("team", "-", f"{len(unresolved)} 個隊伍重試後仍失敗")
+
+    if listing["filtered"]:
+        log("team", "*", f"篩選略過 {listing['filtered']} 個隊伍")
+    if not listing["count"] and not listing["filtered"]:
+        log("team", "-", "無法取得隊伍列表")
+        return
 
-        for future in as_completed(futures):
-            team_info = future.result()
-            if team_info:
-                team_name = team_info["name"].replace("/", "_").strip()
-                team_id = team_info["id"]
-                team_folder = f"{teams_dir}/{team_name}_{team_id}"
-                os.makedirs(team_folder, exist_ok=True)
+    log("team", "+", f"隊伍備份完成: {len(all_teams_summary)}/{listing['count']} 個隊伍")
+    if (
+        journal
+        and journal.done_count("team") == listing["count"]
+        and not (filters and filters.team_filtered())
+    ):
+        journal.record_phase("teams")
 
-                with open(f"{team_folder}/team_info.json", "w", encoding="utf-8") as f:
-                    json.dump(team_info, f, indent=2, ensure_ascii=False)
+    generate_teams_readme(all_teams_summary, teams_dir)
 
-                # 建立 Markdown
-                md_content = f"""# {team_info['name']}
+    if skipped_count["teams"] > 0:
+        log("team", "!", f"跳過 {skipped_count['teams']} 個隊伍（無解題紀錄或無權限）")
+
+
+def write_team_readme(team_info, readme_path):
+    """寫出單一隊伍的 README.md"""
+    with storage.open(readme_path, "w") as f:
+        f.write(f"""# {team_info['name']}
 
 ## 基本資訊
 
@@ -143,61 +259,45 @@ def backup_teams(client, backup_dir):
 
 ## 成員列表 ({len(team_info['members'])} 人)
 
-"""
-                if team_info["members"]:
-                    md_content += "| 姓名 | ID | 分數 |\n"
-                    md_content += "|------|----:|-----:|\n"
-                    for member in team_info["members"]:
-                        md_content += f"| {member['name']} | {member['id']} | {member['score']} |\n"
-                else:
-                    md_content += "無成員資料\n"
-
-                md_content += f"\n## 解題紀錄 ({len(team_info['solves'])} 題)\n\n"
-                if team_info["solves"]:
-                    md_content += "| 題目 | 解題者 | 時間 |\n"
-                    md_content += "|------|--------|------|\n"
-                    for solve in team_info["solves"]:
-                        md_content += (
-                            f"| {solve['challenge']} | {solve['user']} | {solve['date']} |\n"
-                        )
-
-                with open(f"{team_folder}/README.md", "w", encoding="utf-8") as f:
-                    f.write(md_content)
-
-                all_teams_summary.append(team_info)
+""")
+        if team_info["members"]:
+            MEMBERS_TABLE.write(
+                f,
+                (f"| {m['name']} | {m['id']} | {m['score']} |\n" for m in team_info["members"]),
+            )
+        else:
+            f.write("無成員資料\n")
+
+        f.write(f"\n## 解題紀錄 ({len(team_info['solves'])} 題)\n\n")
+        if team_info["solves"]:
+            SOLVES_TABLE.write(
+                f,
+                (
+                    f"| {sv['challenge']} | {sv['user']} | {sv['date']} |\n"
+                    for sv in team_info["solves"]
+                ),
+            )
 
-    log("team", "+", f"隊伍備份完成: {len(all_teams_summary)} 個隊伍")
 
-    # Generate Teams Index README.md
+def generate_teams_readme(teams_summary, teams_dir):
+    """生成 Teams/README.md 索引"""
     try:
         log("team", "*", "正在生成 Teams/README.md 索引...")
-        sorted_teams = sorted(all_teams_summary, key=lambda x: x["name"].lower())
-
-        readme_content = "# Teams Index\n\n"
-        readme_content += f"總計 {len(sorted_teams)} 個隊伍\n\n"
-        readme_content += "| 隊伍名稱 | ID | 成員數 | 分數 |\n"
-        readme_content += "|----------|---:|-------:|-----:|\n"
-
-        for team in sorted_teams:
-            safe_name = team["name"].replace("/", "_").strip()
-            # Escape pipes in team name for markdown table
-            display_name = team["name"].replace("|", "\\|")
-            folder_name = f"{safe_name}_{team['id']}"
-            # Ensure proper URL encoding for the link if needed, but for local files consistent naming is key
-            # Using urllib.parse.quote for the link part is safer for special chars
-            from urllib.parse import quote
-
-            link = quote(folder_name)
-
-            member_count = len(team.get("members", []))
-            readme_content += f"| [{display_name}](./{link}/) | {team['id']} | {member_count} | {team['score']} |\n"
-
-        with open(f"{teams_dir}/README.md", "w", encoding="utf-8") as f:
-            f.write(readme_content)
+        sorted_teams = sorted(teams_summary, key=lambda x: x["name"].lower())
+
+        with storage.open(f"{teams_dir}/README.md", "w") as f:
+            f.write("# Teams Index\n\n")
+            f.write(f"總計 {len(sorted_teams)} 個隊伍\n\n")
+            # 連結使用 URL 編碼的資料夾名稱，顯示名稱跳脫表格中的 |
+            INDEX_TABLE.write(
+                f,
+                (
+                    f"| [{escape_cell(team['name'])}](./{folder_link(team)}/)"
+                    f" | {team['id']} | {team['member_count']} | {team['score']} |\n"
+                    for team in sorted_teams
+                ),
+            )
         log("team", "+", "Teams/README.md 生成完成")
 
     except Exception as e:
         log("team", "!", f"生成 Teams/README.md 失敗: {str(e)}")
-
-    if failed_count["teams"] > 0:
-        log("team", "!", f"跳過 {failed_count['teams']} 個隊伍（無解題紀錄或無權限）")
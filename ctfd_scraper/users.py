@@ -1,33 +1,55 @@
 """Users backup module."""
 
-import json
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
+from .analytics import load_user_info
+from .executor import WINDOW_FACTOR, submit_bounded
+from .failures import FailureQueue, describe_error, retry_failed
 from .logger import log, print_lock
+from .render import (
+    Table,
+    dump_json,
+    escape_cell,
+    folder_link,
+    json_path,
+    open_json,
+    write_lines,
+)
+from . import events, stats, storage
 
 MAX_WORKERS_TEAMS = 20
 
+SOLVES_TABLE = Table("| 題目 | 分類 | 分數 | 時間 |", "|------|------|-----:|------|")
+INDEX_TABLE = Table("| 使用者名稱 | ID | 隊伍 | 分數 |", "|------------|---:|------|-----:|")
+
 processed_count = {"users": 0}
-failed_count = {"users": 0}
+skipped_count = {"users": 0}
 
 
 def process_user(client, user_data, idx, total, backup_dir):
-    """處理單個使用者的備份"""
+    """處理單個使用者的備份
+
+    Returns:
+        dict: 使用者資料；無權限、不存在或無解題紀錄時回傳 None (略過)
+
+    Raises:
+        APIError, requests.RequestException: 請求失敗，由 backup_users 稍後重試
+    """
     user_id = user_data.get("id")
     user_name = user_data.get("name", f"User_{user_id}").replace("/", "_").strip()
 
-    user_detail = client.fetch_api(f"/api/v1/users/{user_id}")
+    user_detail = client.fetch_data(f"/api/v1/users/{user_id}", allow_missing=True)
     if not user_detail:
         with print_lock:
-            failed_count["users"] += 1
+            skipped_count["users"] += 1
         return None
 
-    solves_data = client.fetch_api(f"/api/v1/users/{user_id}/solves")
+    solves_data = client.fetch_data(f"/api/v1/users/{user_id}/solves", allow_missing=True)
     if not solves_data:
         log("user", "!", f"{user_name} (ID:{user_id}) 無解題紀錄，跳過")
         with print_lock:
-            failed_count["users"] += 1
+            skipped_count["users"] += 1
         return None
 
     solves_list = []
@@ -42,7 +64,7 @@ def process_user(client, user_data, idx, total, backup_dir):
             }
         )
 
-    awards_data = client.fetch_api(f"/api/v1/users/{user_id}/awards")
+    awards_data = client.fetch_data(f"/api/v1/users/{user_id}/awards", allow_missing=True)
     awards_list = []
     if awards_data:
         for award in awards_data:
@@ -60,7 +82,8 @@ def process_user(client, user_data, idx, total, backup_dir):
         current_count = processed_count["users"]
 
     if current_count % 10 == 0:
-        log("user", "*", f"進度: {current_count}/{total} 位使用者")
+        progress = f"{current_count}/{total}" if total else f"{current_count}"
+        log("user", "*", f"進度: {progress} 位使用者")
 
     return {
         "id": user_id,
@@ -79,45 +102,169 @@ def process_user(client, user_data, idx, total, backup_dir):
     }
 
 
-def backup_users(client, backup_dir):
-    """備份所有使用者資訊"""
+def backup_users(client, backup_dir, journal=None, analytics=None, filters=None, failures=None):
+    """備份所有使用者資訊
+
+    Args:
+        client: CTFdClient
+        backup_dir: 備份目錄
+        journal: Journal，提供時會跳過已完成的使用者並記錄新完成的使用者
+        analytics: SolveTable，提供時加入每位使用者的解題紀錄；續傳跳過的
+            使用者從先前寫出的 user_info.json 讀回
+        filters: Filters，不符合的使用者在送出任何詳細資料請求前就略過
+        failures: FailureQueue，請求失敗的使用者在階段結束時重試，仍失敗者留在佇列中
+    """
     log("user", "*", "開始備份使用者資訊")
 
-    log("user", "*", "正在獲取使用者列表...")
-    users_data = client.fetch_all_pages("/api/v1/users")
-    if not users_data:
-        log("user", "-", "無法取得使用者列表")
+    users_dir = f"{backup_dir}/Users"
+    storage.makedirs(users_dir)
+
+    if journal and journal.phase_done("users"):
+        all_users_summary = journal.summaries("user")
+        log("user", "+", f"journal 顯示使用者已全部完成 ({len(all_users_summary)} 位)，僅重建索引")
+        generate_users_readme(all_users_summary, users_dir)
+        if analytics is not None:
+            load_previous_solves(analytics, all_users_summary, users_dir)
         return
 
-    log("user", "+", f"找到 {len(users_data)} 位使用者")
+    log("user", "*", "正在串流獲取使用者列表...")
     log("user", "*", f"使用 {MAX_WORKERS_TEAMS} 個並行線程處理")
 
-    users_dir = f"{backup_dir}/Users"
-    os.makedirs(users_dir, exist_ok=True)
-
-    all_users_summary = []
+    all_users_summary = journal.summaries("user") if journal else []
+    resumed = list(all_users_summary)
+    if all_users_summary:
+        log("user", "*", f"續傳: 跳過 {len(all_users_summary)} 位已完成使用者")
     processed_count["users"] = 0
-    failed_count["users"] = 0
-
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS_TEAMS) as executor:
-        futures = {
-            executor.submit(process_user, client, user, idx, len(users_data), backup_dir): user
-            for idx, user in enumerate(users_data, 1)
+    skipped_count["users"] = 0
+    if failures is None:
+        failures = FailureQueue()
+
+    listing = {"count": 0, "filtered": 0, "queued": 0, "done": False}
+
+    def pending_users():
+        for user in client.iter_pages("/api/v1/users"):
+            if filters and not filters.keep_user(client, user):
+                listing["filtered"] += 1
+                continue
+            listing["count"] += 1
+            stats.listed("users")
+            if journal and journal.is_done("user", user.get("id")):
+                stats.entity_done("users")
+                continue
+            listing["queued"] += 1
+            yield listing["count"], user
+        listing["done"] = True
+        stats.listing_done("users")
+
+    def process(item):
+        idx, user = item
+        # 列表仍在串流時總數未定，讀完後進度才顯示為 N/本次需處理的總數 (不含續傳略過者)
+        total = listing["queued"] if listing["done"] else None
+        return process_user(client, user, idx, total, backup_dir)
+
+    def handle(item, future):
+        _, user = item
+        try:
+            user_info = future.result()
+        except Exception as e:
+            log(
+                "user",
+                "-",
+                f"{user.get('name')} (ID:{user.get('id')}) 處理失敗: {describe_error(e)}",
+            )
+            failures.add("user", item, user.get("id"), user.get("name"), e)
+            return
+
+        stats.entity_done("users")
+        if not user_info:
+            # 略過的使用者也記入 journal，續傳時不再請求
+            if journal:
+                journal.record_entity("user", user.get("id"), None)
+            return
+
+        user_name = user_info["name"].replace("/", "_").strip()
+        user_id = user_info["id"]
+        user_folder = f"{users_dir}/{user_name}_{user_id}"
+        storage.makedirs(user_folder)
+
+        with open_json(f"{user_folder}/user_info.json") as f:
+            dump_json(user_info, f)
+
+        # 建立 Markdown
+        write_user_readme(user_info, f"{user_folder}/README.md")
+
+        # 索引只需要摘要欄位，不保留完整的解題資料
+        summary = {
+            "id": user_info["id"],
+            "name": user_info["name"],
+            "score": user_info["score"],
+            "team_name": user_info["team_name"],
         }
+        all_users_summary.append(summary)
+        if journal:
+            written = [
+                os.path.relpath(json_path(f"{user_folder}/user_info.json"), backup_dir),
+                os.path.relpath(f"{user_folder}/README.md", backup_dir),
+            ]
+            journal.record_entity("user", user_id, summary, written)
+        events.emit(events.UserRecord(user_info))
+        if analytics is not None:
+            analytics.add_user(user_info)
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS_TEAMS, thread_name_prefix="user") as executor:
+        window = MAX_WORKERS_TEAMS * WINDOW_FACTOR
+
+        for item, future in submit_bounded(executor, process, pending_users(), window):
+            handle(item, future)
+
+    for item, future in retry_failed(failures, "user", process, MAX_WORKERS_TEAMS, "user"):
+        handle(item, future)
+    unresolved = failures.remaining("user")
+    for _ in unresolved:
+        stats.entity_done("users", ok=False)
+    if unresolved:
+        log("user", "-", f"{len(unresolved)} 位使用者重試後仍失敗")
+
+    if listing["filtered"]:
+        log("user", "*", f"篩選略過 {listing['filtered']} 位使用者")
+    if not listing["count"] and not listing["filtered"]:
+        log("user", "-", "無法取得使用者列表")
+        return
 
-        for future in as_completed(futures):
-            user_info = future.result()
-            if user_info:
-                user_name = user_info["name"].replace("/", "_").strip()
-                user_id = user_info["id"]
-                user_folder = f"{users_dir}/{user_name}_{user_id}"
-                os.makedirs(user_folder, exist_ok=True)
+    if analytics is not None and resumed:
+        load_previous_solves(analytics, resumed, users_dir)
+
+    log("user", "+", f"使用者備份完成: {len(all_users_summary)}/{listing['count']} 位使用者")
+    if (
+        journal
+        and journal.done_count("user") == listing["count"]
+        and not (filters and filters.user_filtered())
+    ):
+        journal.record_phase("users")
+
+    generate_users_readme(all_users_summary, users_dir)
+
+    if skipped_count["users"] > 0:
+        log("user", "!", f"跳過 {skipped_count['users']} 位使用者（無解題紀錄或無權限）")
 
-                with open(f"{user_folder}/user_info.json", "w", encoding="utf-8") as f:
-                    json.dump(user_info, f, indent=2, ensure_ascii=False)
 
-                # 建立 Markdown
-                md_content = f"""# {user_info['name']}
+def load_previous_solves(analytics, summaries, users_dir):
+    """將先前執行已備份的使用者解題紀錄加入 analytics"""
+    missing = 0
+    for summary in summaries:
+        user_info = load_user_info(users_dir, summary)
+        if user_info is None:
+            missing += 1
+        else:
+            analytics.add_user(user_info)
+    if missing:
+        log("user", "!", f"{missing} 位已完成使用者的 user_info.json 不存在，未納入分析")
+
+
+def write_user_readme(user_info, readme_path):
+    """寫出單一使用者的 README.md"""
+    with storage.open(readme_path, "w") as f:
+        f.write(f"""# {user_info['name']}
 
 ## 基本資訊
 
@@ -128,61 +275,49 @@ def backup_users(client, backup_dir):
 - **國家:** {user_info['country']}
 - **所屬單位:** {user_info['affiliation']}
 
-"""
-
-                if user_info.get("fields"):
-                    md_content += "## 個人資料\n\n"
-                    for field in user_info["fields"]:
-                        md_content += (
-                            f"- **{field.get('name', 'Unknown')}:** {field.get('value', 'N/A')}\n"
-                        )
-                    md_content += "\n"
-
-                md_content += f"## 解題紀錄 ({len(user_info['solves'])} 題)\n\n"
-                if user_info["solves"]:
-                    md_content += "| 題目 | 分類 | 分數 | 時間 |\n"
-                    md_content += "|------|------|-----:|------|\n"
-                    for solve in user_info["solves"]:
-                        md_content += f"| {solve['challenge']} | {solve['category']} | {solve['value']} | {solve['date']} |\n"
+""")
 
-                with open(f"{user_folder}/README.md", "w", encoding="utf-8") as f:
-                    f.write(md_content)
-
-                all_users_summary.append(user_info)
+        if user_info.get("fields"):
+            f.write("## 個人資料\n\n")
+            write_lines(
+                f,
+                (
+                    f"- **{field.get('name', 'Unknown')}:** {field.get('value', 'N/A')}\n"
+                    for field in user_info["fields"]
+                ),
+            )
+            f.write("\n")
+
+        f.write(f"## 解題紀錄 ({len(user_info['solves'])} 題)\n\n")
+        if user_info["solves"]:
+            SOLVES_TABLE.write(
+                f,
+                (
+                    f"| {sv['challenge']} | {sv['category']} | {sv['value']} | {sv['date']} |\n"
+                    for sv in user_info["solves"]
+                ),
+            )
 
-    log("user", "+", f"使用者備份完成: {len(all_users_summary)} 位使用者")
 
-    # Generate Users Index README.md
+def generate_users_readme(users_summary, users_dir):
+    """生成 Users/README.md 索引"""
     try:
         log("user", "*", "正在生成 Users/README.md 索引...")
-        sorted_users = sorted(all_users_summary, key=lambda x: x["name"].lower())
-
-        readme_content = "# Users Index\n\n"
-        readme_content += f"總計 {len(sorted_users)} 位使用者\n\n"
-        readme_content += "| 使用者名稱 | ID | 隊伍 | 分數 |\n"
-        readme_content += "|------------|---:|------|-----:|\n"
-
-        for user in sorted_users:
-            safe_name = user["name"].replace("/", "_").strip()
-            display_name = user["name"].replace("|", "\\|")
-            folder_name = f"{safe_name}_{user['id']}"
-
-            from urllib.parse import quote
-
-            link = quote(folder_name)
-
-            team_display = user.get("team_name", "N/A")
-            if team_display:
-                team_display = team_display.replace("|", "\\|")
-
-            readme_content += f"| [{display_name}](./{link}/) | {user['id']} | {team_display} | {user['score']} |\n"
-
-        with open(f"{users_dir}/README.md", "w", encoding="utf-8") as f:
-            f.write(readme_content)
+        sorted_users = sorted(users_summary, key=lambda x: x["name"].lower())
+
+        with storage.open(f"{users_dir}/README.md", "w") as f:
+            f.write("# Users Index\n\n")
+            f.write(f"總計 {len(sorted_users)} 位使用者\n\n")
+            INDEX_TABLE.write(
+                f,
+                (
+                    f"| [{escape_cell(user['name'])}](./{folder_link(user)}/)"
+                    f" | {user['id']} | {escape_cell(user.get('team_name', 'N/A'))}"
+                    f" | {user['score']} |\n"
+                    for user in sorted_users
+                ),
+            )
         log("user", "+", "Users/README.md 生成完成")
 
     except Exception as e:
         log("user", "!", f"生成 Users/README.md 失敗: {str(e)}")
-
-    if failed_count["users"] > 0:
-        log("user", "!", f"跳過 {failed_count['users']} 位使用者（無解題紀錄或無權限）")
@@ -0,0 +1,130 @@
+"""Tests for the columnar solve analytics."""
+
+import json
+
+from ctfd_scraper import storage
+from ctfd_scraper.analytics import SolveTable, load_user_info, write_analytics
+from ctfd_scraper.render import dump_json
+
+
+def solve(chal_id, category, value, date):
+    return {
+        "challenge": f"chal{chal_id}",
+        "challenge_id": chal_id,
+        "category": category,
+        "value": value,
+        "date": date,
+    }
+
+
+def user(user_id, team_id, solves):
+    return {
+        "id": user_id,
+        "name": f"user{user_id}",
+        "team_id": team_id,
+        "team_name": f"team{team_id}",
+        "solves": solves,
+    }
+
+
+USERS = [
+    user(
+        1,
+        10,
+        [
+            solve(1, "Web", 100, "2026-01-01T00:05:00+00:00"),
+            solve(2, "Pwn", 200, "2026-01-01T01:00:00.500000+00:00"),
+        ],
+    ),
+    user(2, 10, [solve(3, "Web", 50, "2026-01-01T02:00:00Z")]),
+    user(
+        3,
+        20,
+        [
+            solve(1, "Web", 100, "2026-01-01T00:01:00+00:00"),
+            solve(2, "Pwn", 200, "2026-01-01T00:30:00+00:00"),
+            solve(3, "Web", 50, "2026-01-01T02:00:00+00:00"),
+            solve(4, "Misc", 10, "N/A"),
+        ],
+    ),
+]
+
+
+def test_aggregates():
+    """Test first bloods, tie-breaking, category breakdown and curves."""
+    table = SolveTable()
+    for info in reversed(USERS):
+        table.add_user(info)
+    result = table.compute()
+
+    assert result["mode"] == "teams"
+    assert result["solves"] == 6
+    assert result["skipped_solves"] == 1
+
+    bloods = {c["id"]: c["first_blood"] for c in result["challenges"]}
+    assert bloods[1]["account"] == "team20"
+    assert bloods[2]["user"] == "user3"
+    # 同一秒解出時以使用者 ID 較小者為 first blood
+    assert bloods[3]["user_id"] == 2
+
+    # 同分時最後解題較早者排名較前
+    assert [(a["name"], a["score"]) for a in result["accounts"]] == [
+        ("team10", 350),
+        ("team20", 350),
+    ]
+    assert result["accounts"][1]["first_bloods"] == 2
+    assert result["accounts"][0]["categories"] == {
+        "Pwn": {"solves": 1, "points": 200},
+        "Web": {"solves": 2, "points": 150},
+    }
+    assert result["categories"][1] == {
+        "category": "Web",
+        "challenges": 2,
+        "solves": 4,
+        "points": 300,
+    }
+
+    curve = result["score_curves"][1]
+    assert curve["name"] == "team20"
+    assert [score for _, score in curve["points"]] == [100, 300, 350]
+    assert curve["points"][0][0] == "2026-01-01T00:01:00+00:00"
+
+
+def test_teamless_user_does_not_score_for_same_id_team():
+    """Test that in team mode a teamless user whose ID equals a team ID is left out."""
+    table = SolveTable()
+    teamless = user(10, None, [solve(5, "Misc", 500, "2026-01-01T00:00:00Z")])
+    for info in [teamless, *USERS]:
+        table.add_user(info)
+    result = table.compute()
+
+    assert table.teamless == 1
+    assert result["solves"] == 6
+    assert [(a["id"], a["score"]) for a in result["accounts"]] == [(10, 350), (20, 350)]
+    assert 5 not in {c["id"] for c in result["challenges"]}
+
+    # 使用者模式不受影響
+    table = SolveTable()
+    table.add_user(teamless)
+    assert table.compute()["accounts"][0]["score"] == 500
+
+
+def test_write_and_reload():
+    """Test analytics output files and loading previously written user_info.json."""
+    backend = storage.MemoryStorage()
+    storage.set_backend(backend)
+    try:
+        with storage.open("b/Users/user1_1/user_info.json", "w") as f:
+            dump_json(USERS[0], f)
+        table = SolveTable()
+        table.add_user(load_user_info("b/Users", {"id": 1, "name": "user1"}))
+        assert load_user_info("b/Users", {"id": 9, "name": "user9"}) is None
+
+        write_analytics(table, "b")
+        result = json.loads(backend.files["b/Scoreboard/analytics.json"])
+        assert result["accounts"][0]["score"] == 300
+        assert "| chal2 | Pwn | 200 | 1 | team10 |" in (
+            backend.files["b/Scoreboard/ANALYTICS.md"].decode("utf-8")
+        )
+    finally:
+        storage.set_backend(storage.LocalStorage())
@@ -3,7 +3,17 @@
 from unittest.mock import Mock, patch
 
 import pytest
-from src.ctfd_scraper.api_client import CTFdClient
+from ctfd_scraper import stats
+from ctfd_scraper.api_client import APIError, CTFdClient
+
+
+def html_response(chunks, status_code=200, content_type="text/html; charset=utf-8"):
+    """Build a mock streamed response yielding the given byte chunks."""
+    response = Mock()
+    response.status_code = status_code
+    response.headers = {"Content-Type": content_type}
+    response.iter_content = Mock(return_value=iter(chunks))
+    return response
 
 
 def test_ctfd_client_initialization():
@@ -14,30 +24,91 @@ def test_ctfd_client_initialization():
     assert client.ctf_name is None
 
 
-@patch("src.ctfd_scraper.api_client.requests.Session")
+@patch("ctfd_scraper.api_client.requests.Session")
 def test_get_ctf_name_from_title(mock_session):
     """Test CTF name extraction from HTML title."""
     client = CTFdClient()
 
     # Mock response with title
-    mock_response = Mock()
-    mock_response.status_code = 200
-    mock_response.text = "<html><head><title>BITSCTF 2026 - CTFd</title></head></html>"
+    mock_response = html_response([b"<html><head><title>BITSCTF 2026 - CTFd</title></head></html>"])
     client.session.get = Mock(return_value=mock_response)
 
     name = client.get_ctf_name()
     assert name == "BITSCTF 2026"
+    assert client.session.get.call_args.kwargs["stream"] is True
+    mock_response.close.assert_called_once()
 
 
-@patch("src.ctfd_scraper.api_client.requests.Session")
+@patch("ctfd_scraper.api_client.requests.Session")
 def test_get_ctf_name_fallback(mock_session):
     """Test CTF name fallback to default."""
     client = CTFdClient()
 
     # Mock failed response
-    mock_response = Mock()
-    mock_response.status_code = 404
+    mock_response = html_response([], status_code=404)
     client.session.get = Mock(return_value=mock_response)
 
     name = client.get_ctf_name()
     assert name == "ctf"
+
+
+def test_probe_title_stops_after_closing_tag():
+    """Test that the body after </title> is never read."""
+    client = CTFdClient()
+
+    def chunks():
+        yield b"<html><head><TITLE data-x='1'>Example &amp; "
+        yield b"Friends CTF</title>"
+        pytest.fail("read past </title>")
+
+    client.session.get = Mock(return_value=html_response(chunks()))
+
+    assert client.probe_title(client.base_url) == "Example & Friends CTF"
+
+
+def test_probe_title_meta_charset():
+    """Test that <meta charset> overrides the header encoding."""
+    client = CTFdClient()
+    page = '<meta charset="big5"><title>臺灣 CTF</title>'.encode("big5")
+    client.session.get = Mock(return_value=html_response([page], content_type="text/html"))
+
+    assert client.probe_title(client.base_url) == "臺灣 CTF"
+
+
+def test_probe_title_missing():
+    """Test pages without a title."""
+    client = CTFdClient()
+    client.session.get = Mock(return_value=html_response([b"<html><body>hi</body></html>"]))
+
+    assert client.probe_title(client.base_url) is None
+
+
+def test_iter_body_records_wire_bytes():
+    """Test that streamed bodies report compressed and decoded sizes."""
+    stats.reset()
+    client = CTFdClient()
+    response = html_response([b"a" * 300, b"b" * 200])
+    response.headers = {"content-encoding": "gzip"}
+    del response.wire_bytes  # requests path: size comes from urllib3's tell()
+    response.raw.tell = Mock(return_value=120)
+
+    assert b"".join(client.iter_body(response, 64)) == b"a" * 300 + b"b" * 200
+
+    transfers = stats.snapshot()["transfers"]
+    assert transfers == {"gzip": {"responses": 1, "wire": 120, "decoded": 500}}
+
+
+def test_fetch_data_distinguishes_missing_from_errors():
+    """Test that 403/404 can be tolerated while other failures raise."""
+    client = CTFdClient()
+    client.get = Mock(
+        side_effect=lambda url: html_response([], status_code=int(url.rsplit("/", 1)[1]))
+    )
+
+    assert client.fetch_data("/api/v1/users/404", allow_missing=True) is None
+    with pytest.raises(APIError) as excinfo:
+        client.fetch_data("/api/v1/users/404")
+    assert excinfo.value.status == 404
+    with pytest.raises(APIError):
+        client.fetch_data("/api/v1/users/500", allow_missing=True)
+    assert client.fetch_api("/api/v1/users/500") is None
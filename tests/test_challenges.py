@@ -0,0 +1,160 @@
+"""Tests for challenge backup module."""
+
+from unittest.mock import Mock
+
+import pytest
+from ctfd_scraper import storage
+from ctfd_scraper.challenges import (
+    MAX_CHUNK_SIZE,
+    MIN_CHUNK_SIZE,
+    THROTTLED_CHUNK_SIZE,
+    download_file,
+    pick_chunk_size,
+    process_challenge,
+)
+from ctfd_scraper.ratelimit import TokenBucket
+
+
+def make_client(body, headers, chunk_sizes):
+    """Build a client whose GET streams ``body`` and records requested chunk sizes."""
+
+    def iter_content(chunk_size):
+        chunk_sizes.append(chunk_size)
+        for i in range(0, len(body), chunk_size):
+            yield body[i : i + chunk_size]
+
+    response = Mock()
+    response.headers = headers
+    response.iter_content = iter_content
+    response.content = Mock(side_effect=AssertionError("body must be streamed"))
+
+    client = Mock()
+    client.file_timeout = 60
+    client.bandwidth_limiter = None
+    client.get = Mock(return_value=response)
+    return client
+
+
+def test_pick_chunk_size_bounds():
+    """Chunk size grows with the file but stays within the configured bounds."""
+    assert pick_chunk_size(1024) == MIN_CHUNK_SIZE
+    assert pick_chunk_size(64 * 1024 * 1024) == 4 * 1024 * 1024
+    assert pick_chunk_size(10 * 1024**3) == MAX_CHUNK_SIZE
+
+
+def test_download_known_length(tmp_path):
+    """Known-length downloads are written completely and throttled per chunk."""
+    body = bytes(range(256)) * 4096
+    sizes = []
+    client = make_client(body, {"content-length": str(len(body))}, sizes)
+
+    assert download_file(client, "http://x/f", "f.bin", str(tmp_path))
+
+    assert (tmp_path / "f.bin").read_bytes() == body
+    assert sum(c.args[0] for c in client.throttle_bytes.call_args_list) == len(body)
+
+
+def test_download_chunks_capped_by_bandwidth_limit(tmp_path):
+    """Test that with a bandwidth limiter chunks stay within the burst and the fixed cap."""
+    body = b"b" * (16 * 1024 * 1024)
+    for burst, cap in ((100 * 1024, 100 * 1024), (8 * 1024 * 1024, THROTTLED_CHUNK_SIZE)):
+        sizes = []
+        client = make_client(body, {"content-length": str(len(body))}, sizes)
+        client.bandwidth_limiter = TokenBucket(burst, burst)
+
+        assert download_file(client, "http://x/f", "f.bin", str(tmp_path))
+
+        assert sizes == [cap]
+        assert max(c.args[0] for c in client.throttle_bytes.call_args_list) <= cap
+
+
+def test_download_unknown_length_streams(tmp_path):
+    """Responses without content-length stream instead of loading the whole body."""
+    body = b"x" * (3 * 1024 * 1024 + 7)
+    sizes = []
+    client = make_client(body, {}, sizes)
+
+    assert download_file(client, "http://x/f", "f.bin", str(tmp_path))
+
+    assert (tmp_path / "f.bin").read_bytes() == body
+    assert sizes == [1024 * 1024]
+
+
+def test_download_truncates_preallocation(tmp_path):
+    """A decoded body shorter than content-length does not leave preallocated padding."""
+    body = b"y" * 1000
+    client = make_client(body, {"content-length": "4096", "content-encoding": "gzip"}, [])
+
+    assert download_file(client, "http://x/f", "f.bin", str(tmp_path))
+
+    assert (tmp_path / "f.bin").stat().st_size == 1000
+
+
+def test_download_short_body_fails(tmp_path):
+    """An unencoded body shorter than content-length is treated as a failed download."""
+    client = make_client(b"z" * 1000, {"content-length": "4096"}, [])
+
+    assert not download_file(client, "http://x/f", "f.bin", str(tmp_path))
+
+    assert not (tmp_path / "f.bin").exists()
+
+
+def test_download_completes_short_writes(tmp_path, monkeypatch):
+    """Test that a partial write from the unbuffered file is completed before the next chunk."""
+    body = bytes(range(256)) * 4096
+
+    class ShortWriter:
+        """Unbuffered file stand-in that accepts at most 1000 bytes per call."""
+
+        def __init__(self, path):
+            self._f = open(path, "wb", buffering=0)
+
+        def write(self, b):
+            return self._f.write(memoryview(b)[:1000])
+
+        def fileno(self):
+            return self._f.fileno()
+
+        def truncate(self, size=None):
+            return self._f.truncate(size)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self._f.close()
+
+    monkeypatch.setattr(storage, "open", lambda path, mode, source=None: ShortWriter(path))
+    client = make_client(body, {"content-length": str(len(body))}, [])
+
+    assert download_file(client, "http://x/f", "f.bin", str(tmp_path))
+
+    assert (tmp_path / "f.bin").read_bytes() == body
+
+
+def test_missing_attachment_is_recorded_not_retried(tmp_path):
+    """Test that 403/404 attachments land in missing_files while other errors still raise."""
+    statuses = {"/files/gone.bin": 404, "/files/secret.bin": 403, "/files/ok.bin": 200}
+
+    def get(url, **kwargs):
+        response = make_client(b"data", {"content-length": "4"}, []).get()
+        response.status_code = statuses[url[len("http://x") :]]
+        response.raise_for_status = Mock()
+        if response.status_code != 200:
+            response.raise_for_status.side_effect = OSError(f"HTTP {response.status_code}")
+        return response
+
+    detail = {"name": "c1", "category": "Web", "files": [f"{f}?token=t" for f in statuses]}
+    client = Mock(base_url="http://x", file_timeout=60, get=get, bandwidth_limiter=None)
+    client.fetch_data = lambda endpoint, allow_missing=False: (
+        None if endpoint.endswith("/solves") else detail
+    )
+
+    result = process_challenge(client, {"id": 1}, 1, None, str(tmp_path))
+
+    assert result["missing_files"] == ["gone.bin", "secret.bin"]
+    assert result["written"] == ["Challenges/Web/c1/description.md", "Challenges/Web/c1/ok.bin"]
+
+    statuses["/files/ok.bin"] = 500
+    with pytest.raises(IOError):
+        process_challenge(client, {"id": 1}, 1, None, str(tmp_path))
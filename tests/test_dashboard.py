@@ -0,0 +1,73 @@
+"""Tests for progress counters and the live dashboard."""
+
+import io
+
+from ctfd_scraper import logger, stats
+from ctfd_scraper.dashboard import Dashboard
+
+
+def test_counters_snapshot():
+    """Workers' counter updates are visible in a snapshot."""
+    stats.reset()
+    with stats.phase("teams"):
+        stats.listed("teams", 3)
+        stats.entity_done("teams")
+        stats.entity_done("teams", ok=False)
+        handle = stats.download_start("a.bin", 100)
+        stats.download_bytes(handle, 40)
+        stats.request()
+        snap = stats.snapshot()
+        stats.download_end(handle, ok=False)
+
+    assert snap["requests"] == 1
+    assert snap["bytes"] == 40
+    assert snap["phases"]["teams"]["listed"] == 3
+    assert snap["phases"]["teams"]["failed"] == 1
+    assert snap["downloads"][0]["received"] == 40
+
+    final = stats.snapshot()
+    assert final["downloads"] == []
+    assert final["download_errors"] == 1
+    assert final["phases"]["teams"]["finished"] is not None
+
+
+def test_render_rates_and_eta():
+    """Rates come from counter deltas; ETA is a lower bound while listing streams."""
+    dashboard = Dashboard(stream=io.StringIO())
+    phase = {"done": 0, "failed": 0, "listed": 100, "listing_done": False}
+    phase.update(started=0.0, finished=None)
+    snap = {
+        "now": 0.0,
+        "started": 0.0,
+        "requests": 0,
+        "bytes": 0,
+        "download_errors": 0,
+        "phases": {"users": dict(phase)},
+        "downloads": [],
+    }
+    dashboard.render(snap)
+
+    snap.update(now=2.0, requests=40, bytes=4 * 1024 * 1024)
+    snap["phases"] = {"users": dict(phase, done=20)}
+    snap["downloads"] = [{"name": "big.zip", "total": 8 << 20, "received": 2 << 20, "started": 1.0}]
+    text = "\n".join(dashboard.render(snap))
+
+    assert "requests 40 (20.0/s)" in text
+    assert "(2.0 MB/s)" in text
+    assert "100+" in text and ">00:08" in text
+    assert "big.zip" in text and "2.0 MB/s" in text
+
+
+def test_sink_keeps_only_issues(capsys):
+    """While the dashboard runs, info logs and separators are dropped and warnings are kept."""
+    dashboard = Dashboard(stream=io.StringIO())
+    logger.set_sink(dashboard._sink)
+    try:
+        logger.log("team", "*", "進度: 10/100 隊伍")
+        logger.log("file", "-", "a.bin: timeout")
+        logger.rule()
+    finally:
+        logger.set_sink(None)
+
+    assert list(dashboard.issues) == ["[-] [file] a.bin: timeout"]
+    assert capsys.readouterr().out == ""
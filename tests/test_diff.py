@@ -0,0 +1,139 @@
+"""Tests for the snapshot diff between two backups."""
+
+import hashlib
+import json
+
+import pytest
+from ctfd_scraper.diff import DIFF_JSON, DIFF_MD, diff_backups, diff_main
+
+
+def write_backup(root, challenges, users, ranking):
+    """Write a minimal backup: journal, manifest.json, user_info.json and team_ranking.json."""
+    files = {}
+    journal = []
+
+    def add_file(relpath, content):
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        files[relpath] = {"size": len(content), "sha256": hashlib.sha256(content).hexdigest()}
+
+    for chal, attachment in challenges:
+        folder = f"Challenges/{chal['category']}/{chal['name']}"
+        add_file(f"{folder}/description.md", chal["name"].encode())
+        add_file(f"{folder}/{attachment[0]}", attachment[1])
+        written = [f"{folder}/description.md"]
+        summary = dict(chal, folder_name=chal["name"], written=written)
+        journal.append(
+            {
+                "type": "entity",
+                "kind": "challenge",
+                "id": chal["id"],
+                "summary": summary,
+                "written": written,
+            }
+        )
+
+    for info in users:
+        relpath = f"Users/{info['name']}_{info['id']}/user_info.json"
+        add_file(relpath, json.dumps(info).encode())
+        summary = {"id": info["id"], "name": info["name"], "score": info["score"]}
+        journal.append(
+            {
+                "type": "entity",
+                "kind": "user",
+                "id": info["id"],
+                "summary": summary,
+                "written": [relpath],
+            }
+        )
+    # 略過的使用者 (無解題) 不算在備份中
+    journal.append({"type": "entity", "kind": "user", "id": 99, "summary": None, "written": []})
+
+    add_file("Scoreboard/team_ranking.json", json.dumps(ranking).encode())
+    (root / ".journal.jsonl").write_text("".join(json.dumps(r) + "\n" for r in journal))
+    (root / "manifest.json").write_text(json.dumps({"algorithm": "sha256", "files": files}))
+
+
+def chal(chal_id, name, value):
+    return {"id": chal_id, "name": name, "category": "Web", "value": value, "solves": 1}
+
+
+def user(user_id, score, solves):
+    return {
+        "id": user_id,
+        "name": f"user{user_id}",
+        "score": score,
+        "solves": [
+            {"challenge": f"c{cid}", "challenge_id": cid, "date": f"2026-01-01T0{cid}:00:00Z"}
+            for cid in solves
+        ],
+    }
+
+
+@pytest.fixture
+def backups(tmp_path):
+    old, new = tmp_path / "old", tmp_path / "new"
+    write_backup(
+        old,
+        [(chal(1, "c1", 100), ("a.bin", b"v1")), (chal(2, "c2", 200), ("b.bin", b"x"))],
+        [user(1, 100, [1]), user(2, 0, []), user(3, 100, [1])],
+        [
+            {"pos": 1, "account_id": 1, "name": "user1", "score": 100},
+            {"pos": 2, "account_id": 3, "name": "user3", "score": 100},
+        ],
+    )
+    write_backup(
+        new,
+        [(chal(1, "c1", 90), ("a.bin", b"v2")), (chal(3, "c3", 300), ("c.bin", b"y"))],
+        [user(1, 100, [1]), user(3, 390, [1, 3]), user(4, 90, [1])],
+        [
+            {"pos": 1, "account_id": 3, "name": "user3", "score": 390},
+            {"pos": 2, "account_id": 1, "name": "user1", "score": 100},
+            {"pos": 3, "account_id": 4, "name": "user4", "score": 90},
+        ],
+    )
+    return str(old), str(new)
+
+
+def test_entities_solves_and_ranking(backups):
+    """Test entity, attachment, solve and ranking changes from records and hashes."""
+    result = diff_backups(*backups)
+
+    challenges = result["challenges"]
+    assert [c["id"] for c in challenges["added"]] == [3]
+    assert [c["id"] for c in challenges["removed"]] == [2]
+    (changed,) = challenges["changed"]
+    assert changed["fields"] == {"value": [100, 90]}
+    assert changed["files"]["changed"] == ["a.bin"]
+
+    users = result["users"]
+    assert [u["id"] for u in users["added"]] == [4]
+    assert [u["id"] for u in users["removed"]] == [2]
+    assert [u["id"] for u in users["changed"]] == [3]
+
+    new_solves = [(s["name"], s["challenge_id"]) for s in result["solves"]["new"]]
+    assert new_solves == [("user4", 1), ("user3", 3)]
+    assert result["solves"]["removed"] == []
+
+    ranking = result["ranking"]
+    assert [(m["id"], m["pos"], m["score"]) for m in ranking["moves"]] == [
+        (3, [2, 1], [100, 390]),
+        (1, [1, 2], [100, 100]),
+    ]
+    assert [r["id"] for r in ranking["entered"]] == [4]
+    assert result["summary"]["files"] == {"added": 3, "removed": 3, "changed": 3}
+
+
+def test_diff_command_writes_changelog(backups, tmp_path):
+    """Test diff.json and DIFF.md output, and the error for a non-backup directory."""
+    out = tmp_path / "out"
+    diff_main([*backups, "-o", str(out)])
+
+    assert json.loads((out / DIFF_JSON).read_text())["summary"]["new_solves"] == 2
+    markdown = (out / DIFF_MD).read_text(encoding="utf-8")
+    assert "- 變更: c1 (ID 1): value 100 → 90；更新檔案 a.bin" in markdown
+    assert "| user3 | 2 → 1 | 100 → 390 |" in markdown
+
+    with pytest.raises(SystemExit):
+        diff_main([backups[0], str(tmp_path / "missing")])
@@ -0,0 +1,56 @@
+"""Tests for the streaming event API."""
+
+import asyncio
+
+import pytest
+
+from ctfd_scraper import cli, events
+from ctfd_scraper.logger import log
+
+
+def fake_backup(count):
+    def run_backup(config):
+        for i in range(count):
+            events.emit(events.TeamRecord({"id": i}))
+        log("team", "!", "Team 2 無權限或不存在，跳過")
+        log("team", "-", "Team 3: 請求失敗")
+
+    return run_backup
+
+
+def test_iter_backup_yields_in_order(monkeypatch):
+    """Events arrive in order through a small queue; only errors, not warnings, emit BackupError."""
+    monkeypatch.setattr(cli, "run_backup", fake_backup(50))
+    received = list(events.iter_backup({}, maxsize=2))
+
+    assert [e.team["id"] for e in received[:-1]] == list(range(50))
+    assert received[-1] == events.BackupError("team", "-", "Team 3: 請求失敗")
+    assert not events.enabled()
+
+
+def test_iter_backup_reraises_and_early_close(monkeypatch):
+    def failing(config):
+        events.emit(events.UserRecord({"id": 1}))
+        raise ValueError("boom")
+
+    monkeypatch.setattr(cli, "run_backup", failing)
+    with pytest.raises(ValueError, match="boom"):
+        list(events.iter_backup({}))
+
+    # 提前結束時仍等待備份完成，worker 不會卡在已滿的佇列上
+    monkeypatch.setattr(cli, "run_backup", fake_backup(100))
+    stream = events.iter_backup({}, maxsize=1)
+    assert next(stream).team["id"] == 0
+    stream.close()
+    assert not events.enabled()
+
+
+def test_aiter_backup(monkeypatch):
+    monkeypatch.setattr(cli, "run_backup", fake_backup(20))
+
+    async def collect():
+        return [event async for event in events.aiter_backup({}, maxsize=3)]
+
+    received = asyncio.run(collect())
+    assert len(received) == 21
+    assert isinstance(received[0], events.TeamRecord)
@@ -0,0 +1,42 @@
+"""Tests for bounded executor helpers."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ctfd_scraper.executor import submit_bounded
+
+
+def test_submit_bounded_yields_all_results():
+    """Every item is processed exactly once."""
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = sorted(
+            f.result() for _, f in submit_bounded(executor, lambda x: x * 2, range(50), 8)
+        )
+
+    assert results == [x * 2 for x in range(50)]
+
+
+def test_submit_bounded_limits_in_flight():
+    """No more than ``window`` items are pulled from the source ahead of completion."""
+    lock = threading.Lock()
+    state = {"pulled": 0, "done": 0, "max_ahead": 0}
+
+    def source():
+        for i in range(40):
+            with lock:
+                state["pulled"] += 1
+                state["max_ahead"] = max(state["max_ahead"], state["pulled"] - state["done"])
+            yield i
+
+    def work(x):
+        time.sleep(0.001)
+        with lock:
+            state["done"] += 1
+        return x
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        items = [item for item, _ in submit_bounded(executor, work, source(), 5)]
+
+    assert sorted(items) == list(range(40))
+    assert state["max_ahead"] <= 5
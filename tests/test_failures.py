@@ -0,0 +1,73 @@
+"""Tests for the deferred failure queue and retry pass."""
+
+import json
+
+import pytest
+from ctfd_scraper import failures, storage
+from ctfd_scraper.failures import FAILURES_FILE, FailureQueue, retry_failed
+
+
+@pytest.fixture
+def memory():
+    backend = storage.MemoryStorage()
+    storage.set_backend(backend)
+    yield backend
+    storage.set_backend(storage.LocalStorage())
+
+
+def test_retry_pass_requeues_persistent_failures(monkeypatch):
+    """Test that only entities failing again stay queued, with attempts counted."""
+    monkeypatch.setattr(failures, "RETRY_DELAY", 0)
+    queue = FailureQueue()
+    for entity_id in (1, 2, 3):
+        queue.add("team", (entity_id, {"id": entity_id}), entity_id, f"t{entity_id}", OSError())
+    assert queue.remaining("user") == []
+
+    def process(item):
+        if item[0] == 2:
+            raise RuntimeError("HTTP 500")
+        return item[0]
+
+    done = []
+    for item, future in retry_failed(queue, "team", process, 8, "team"):
+        try:
+            done.append(future.result())
+        except Exception as e:
+            queue.add("team", item, item[0], f"t{item[0]}", e)
+
+    assert sorted(done) == [1, 3]
+    assert queue.remaining() == [
+        {"kind": "team", "id": 2, "name": "t2", "error": "HTTP 500", "attempts": 2}
+    ]
+    # 佇列已取出時不再重試
+    assert list(retry_failed(FailureQueue(), "team", process, 8, "team")) == []
+
+
+def test_write_failures_file(memory):
+    """Test failures.json output and removal of a stale file."""
+    queue = FailureQueue()
+    queue.add("user", None, 13, "user13", OSError())
+    assert queue.write("b") == 1
+    records = json.loads(memory.files[f"b/{FAILURES_FILE}"])
+    assert records == [
+        {"kind": "user", "id": 13, "name": "user13", "error": "OSError", "attempts": 1}
+    ]
+
+    queue.take("user")
+    assert queue.write("b") == 0
+    assert f"b/{FAILURES_FILE}" not in memory.files
+
+
+def test_remaining_sorted_by_numeric_id():
+    """Test that failures are ordered by numeric ID, not lexicographically."""
+    queue = FailureQueue()
+    for entity_id in (100, 9, 10):
+        queue.add("user", None, entity_id, f"user{entity_id}", OSError())
+    queue.add("team", None, 20, "team20", OSError())
+
+    assert [(r["kind"], r["id"]) for r in queue.remaining()] == [
+        ("team", 20),
+        ("user", 9),
+        ("user", 10),
+        ("user", 100),
+    ]
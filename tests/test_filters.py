@@ -0,0 +1,72 @@
+"""Tests for selective sync filters."""
+
+from unittest.mock import Mock
+
+import pytest
+from ctfd_scraper.filters import Filters, parse_ids
+
+SCOREBOARD = [
+    {"pos": 1, "account_id": 7, "account_type": "team", "score": 500, "members": [{"id": 70}]},
+    {"pos": 2, "account_id": 3, "account_type": "team", "score": 200, "members": [{"id": 30}]},
+    {"pos": 3, "account_id": 9, "account_type": "team", "score": 0, "members": [{"id": 90}]},
+]
+
+
+def scoreboard_client():
+    client = Mock()
+    client.fetch_api = Mock(
+        side_effect=lambda endpoint: {
+            "/api/v1/scoreboard": SCOREBOARD,
+            "/api/v1/brackets": [{"id": 1, "name": "Students"}, {"id": 2, "name": "Open"}],
+        }[endpoint]
+    )
+    return client
+
+
+def test_parse_ids():
+    assert parse_ids("1-50, 72,100-") == [(1, 50), (72, 72), (100, None)]
+    with pytest.raises(ValueError):
+        parse_ids("9-3")
+    with pytest.raises(ValueError):
+        parse_ids("abc")
+
+
+def test_challenge_filters():
+    """Test category, ID range and has-solves checks on listing entries."""
+    filters = Filters(categories=["web"], challenge_ids=parse_ids("1-10"), has_solves=True)
+    assert filters.keep_challenge({"id": 2, "category": "Web", "solves": 3})
+    assert not filters.keep_challenge({"id": 2, "category": "Pwn", "solves": 3})
+    assert not filters.keep_challenge({"id": 11, "category": "Web", "solves": 3})
+    assert not filters.keep_challenge({"id": 2, "category": "Web", "solves": 0})
+    # 清單沒有 solves 欄位時不排除
+    assert filters.keep_challenge({"id": 2, "category": "WEB"})
+    assert Filters.from_config({}) is None
+
+
+def test_top_and_has_solves_use_one_scoreboard_request():
+    """Test that --top keeps ranked teams and their members."""
+    client = scoreboard_client()
+    filters = Filters(top=2)
+    assert filters.keep_team(client, {"id": 7})
+    assert not filters.keep_team(client, {"id": 9})
+    assert filters.keep_user(client, {"id": 30, "team_id": 3})
+    assert not filters.keep_user(client, {"id": 90, "team_id": 9})
+    assert client.fetch_api.call_count == 1
+
+    filters = Filters(has_solves=True)
+    assert filters.keep_team(client, {"id": 3})
+    assert not filters.keep_team(client, {"id": 9})
+
+
+def test_bracket_names_and_ids():
+    """Test brackets given by name are resolved to IDs once."""
+    client = scoreboard_client()
+    filters = Filters(brackets=["Students"])
+    assert filters.keep_user(client, {"id": 1, "bracket_id": 1})
+    assert not filters.keep_user(client, {"id": 2, "bracket_id": 2})
+    assert filters.keep_user(client, {"id": 3, "bracket": "Students"})
+    assert client.fetch_api.call_count == 1
+
+    client = scoreboard_client()
+    assert Filters(brackets=["2"]).keep_team(client, {"id": 1, "bracket_id": 2})
+    client.fetch_api.assert_not_called()
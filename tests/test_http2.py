@@ -0,0 +1,102 @@
+"""Tests for the optional HTTP/2 transport (runs over HTTP/1.1 locally)."""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from ctfd_scraper.api_client import CTFdClient  # noqa: E402
+from ctfd_scraper.http2 import Http2Session  # noqa: E402
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(0.02)
+        with cls.lock:
+            cls.active -= 1
+        body = json.dumps({"data": {"cookie": self.headers.get("Cookie")}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    Handler.peak = 0
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+
+def test_client_over_http2_session(server):
+    """CTFdClient keeps its cookie, JSON and streaming behaviour on the httpx session."""
+    client = CTFdClient(server, "secret", http2=True, max_streams=3)
+    elapsed = []
+    client.session.hooks["response"].append(lambda r: elapsed.append(r.elapsed))
+
+    assert client.fetch_api("/api/v1/users/1") == {"cookie": "session=secret"}
+    streamed = client.get(f"{server}/x", stream=True)
+    assert b"".join(streamed.iter_content(chunk_size=4)).startswith(b'{"data"')
+    assert len(elapsed) == 2
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(lambda i: client.fetch_api(f"/api/v1/users/{i}"), range(20)))
+    assert Handler.peak <= 3
+
+
+def test_retries_get_after_goaway():
+    """A GET whose connection is closed by the server is resent on a new one."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            raise httpx.RemoteProtocolError("<ConnectionTerminated error_code:0>")
+        return httpx.Response(200, json={"data": [1]})
+
+    session = Http2Session(max_streams=1)
+    session._client = httpx.Client(transport=httpx.MockTransport(handler))
+    assert session.get("http://ctf.test/api/v1/teams").json() == {"data": [1]}
+    assert calls == ["/api/v1/teams", "/api/v1/teams"]
+    # stream 配額已歸還
+    assert session._streams.acquire(blocking=False)
+
+
+def test_failed_download_releases_stream(tmp_path):
+    """Test that a 404 attachment does not leak a stream slot for the next request."""
+    from ctfd_scraper.challenges import download_file
+
+    def handler(request):
+        if request.url.path.startswith("/files/"):
+            return httpx.Response(404)
+        return httpx.Response(200, json={"data": [1]})
+
+    client = CTFdClient("http://ctf.test", "secret", http2=True, max_streams=1)
+    client.session._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    for _ in range(2):
+        assert not download_file(client, "http://ctf.test/files/a.bin", "a.bin", str(tmp_path))
+    assert client.session._streams.acquire(timeout=1)
+    client.session._streams.release()
+    assert client.fetch_api("/api/v1/teams") == [1]
@@ -0,0 +1,66 @@
+"""Tests for checkpoint journal module."""
+
+from ctfd_scraper.journal import JOURNAL_FILE, Journal
+
+
+def test_resume_restores_entities_and_phases(tmp_path):
+    """Entities and phases recorded in one run are visible after resuming."""
+    journal = Journal(str(tmp_path))
+    journal.record_entity("team", 1, {"id": 1, "name": "a"}, ["Teams/a_1/team_info.json"])
+    journal.record_entity("team", 2, None)
+    journal.record_phase("scoreboard")
+    journal.close()
+
+    resumed = Journal(str(tmp_path), resume=True)
+    assert resumed.is_done("team", 1)
+    assert resumed.is_done("team", 2)
+    assert not resumed.is_done("user", 1)
+    assert resumed.phase_done("scoreboard")
+    assert resumed.summaries("team") == [{"id": 1, "name": "a"}]
+    resumed.close()
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    """A partially written final record from a crash does not break loading."""
+    journal = Journal(str(tmp_path))
+    journal.record_entity("challenge", 7, {"id": 7})
+    journal.close()
+    with open(tmp_path / JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write('{"type": "entity", "kind": "chal')
+
+    resumed = Journal(str(tmp_path), resume=True)
+    assert resumed.is_done("challenge", 7)
+    resumed.close()
+
+
+def test_resume_twice_from_torn_journal(tmp_path):
+    """Test that the first record after a torn line survives a second resume."""
+    journal = Journal(str(tmp_path))
+    journal.record_entity("challenge", 7, {"id": 7})
+    journal.close()
+    with open(tmp_path / JOURNAL_FILE, "a", encoding="utf-8") as f:
+        f.write('{"type": "entity", "kind": "chal')
+
+    resumed = Journal(str(tmp_path), resume=True)
+    resumed.record_entity("challenge", 8, {"id": 8})
+    resumed.record_phase("challenges")
+    resumed.close()
+
+    again = Journal(str(tmp_path), resume=True)
+    assert again.is_done("challenge", 7)
+    assert again.is_done("challenge", 8)
+    assert again.phase_done("challenges")
+    again.close()
+
+
+def test_fresh_run_truncates(tmp_path):
+    """Without resume, a previous journal is discarded."""
+    journal = Journal(str(tmp_path))
+    journal.record_phase("users")
+    journal.close()
+
+    fresh = Journal(str(tmp_path))
+    fresh.close()
+    resumed = Journal(str(tmp_path), resume=True)
+    assert not resumed.phase_done("users")
+    resumed.close()
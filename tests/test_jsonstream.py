@@ -0,0 +1,79 @@
+"""Tests for incremental JSON module."""
+
+import io
+import json
+
+import pytest
+from ctfd_scraper import jsonstream
+from ctfd_scraper.jsonstream import JsonArrayWriter, iter_json_array
+
+PAYLOAD = {
+    "success": True,
+    "meta": {"pagination": {"data": [1, 2], "next": None}},
+    "data": [
+        {"id": 1, "name": '隊伍 "A"', "members": [{"id": 3, "score": 100}]},
+        {"id": 2, "name": "B", "score": 12345},
+        17,
+        "plain",
+        [1.5, None, False],
+    ],
+    "trailing": "ignored",
+}
+
+
+def chunked(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 4096])
+def test_iter_json_array_across_chunk_boundaries(size):
+    """Elements are reassembled correctly regardless of where chunks split, including UTF-8."""
+    body = json.dumps(PAYLOAD, ensure_ascii=False).encode("utf-8")
+
+    assert list(iter_json_array(chunked(body, size))) == PAYLOAD["data"]
+
+
+def test_iter_json_array_missing_or_null_key():
+    """A missing or null ``data`` field yields nothing."""
+    assert list(iter_json_array([b'{"success": false}'])) == []
+    assert list(iter_json_array([b'{"data": null}'])) == []
+    assert list(iter_json_array([b'{"data": []}'])) == []
+    assert list(iter_json_array([b"{}"])) == []
+
+
+def test_iter_json_array_rejects_malformed():
+    """Malformed payloads raise instead of silently truncating."""
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"data": [1, 2']))
+
+
+def test_large_element_is_not_reparsed_per_chunk(monkeypatch):
+    """Test that an element spanning many chunks is decoded a logarithmic number of times."""
+    calls = []
+    decoder = json.JSONDecoder()
+
+    class CountingDecoder:
+        def raw_decode(self, s, idx=0):
+            calls.append(len(s) - idx)
+            return decoder.raw_decode(s, idx)
+
+    monkeypatch.setattr(jsonstream, "_decoder", CountingDecoder())
+    item = {"description": "x" * 200_000}
+    body = json.dumps({"data": [item, 1]}).encode()
+
+    assert list(iter_json_array(chunked(body, 100))) == [item, 1]
+    assert sum(calls) < 5 * len(body)
+
+
+@pytest.mark.parametrize("items", [[], [{"a": [1, {"b": "x\ny"}]}, 2, "三"]])
+def test_json_array_writer_matches_json_dump(items):
+    """Progressive output is byte-identical to json.dump with indent=2."""
+    expected = io.StringIO()
+    json.dump(items, expected, indent=2, ensure_ascii=False)
+
+    out = io.StringIO()
+    with JsonArrayWriter(out) as writer:
+        for item in items:
+            writer.write(item)
+
+    assert out.getvalue() == expected.getvalue()
@@ -0,0 +1,67 @@
+"""Tests for integrity manifest module."""
+
+import hashlib
+import json
+
+from ctfd_scraper import storage
+from ctfd_scraper.journal import Journal
+from ctfd_scraper.manifest import MANIFEST_FILE, MANIFEST_JSON, Manifest, verify_backup
+
+
+def write_backup(backup_dir, journal=None):
+    """Write a small backup through storage with a manifest observer."""
+    manifest = Manifest(str(backup_dir), journal)
+    storage.set_observer(manifest.record)
+    try:
+        storage.makedirs(backup_dir / "Challenges" / "Web")
+        with storage.open(
+            backup_dir / "Challenges" / "Web" / "a.bin", "wb", source="http://x/a"
+        ) as f:
+            f.write(b"A" * 5000)
+        with storage.open(backup_dir / "README.md", "w") as f:
+            f.write("# Backup\n")
+        manifest.write()
+    finally:
+        storage.set_observer(None)
+    return manifest
+
+
+def test_manifest_files(tmp_path):
+    """MANIFEST.sha256 uses sha256sum format and manifest.json keeps sizes and URLs."""
+    write_backup(tmp_path)
+
+    lines = (tmp_path / MANIFEST_FILE).read_text(encoding="utf-8").splitlines()
+    attachment = hashlib.sha256(b"A" * 5000).hexdigest()
+    readme = hashlib.sha256(b"# Backup\n").hexdigest()
+    assert lines == [f"{attachment}  Challenges/Web/a.bin", f"{readme}  README.md"]
+    files = json.loads((tmp_path / MANIFEST_JSON).read_text(encoding="utf-8"))["files"]
+    assert files["Challenges/Web/a.bin"]["size"] == 5000
+    assert files["Challenges/Web/a.bin"]["url"] == "http://x/a"
+    assert files["README.md"]["url"] is None
+
+
+def test_manifest_resumes_from_journal(tmp_path):
+    """Hashes recorded before an interruption are carried into the resumed manifest."""
+    journal = Journal(str(tmp_path))
+    write_backup(tmp_path, journal)
+    journal.close()
+
+    resumed = Journal(str(tmp_path), resume=True)
+    manifest = Manifest(str(tmp_path), resumed)
+    resumed.close()
+    assert sorted(manifest.entries) == ["Challenges/Web/a.bin", "README.md"]
+
+
+def test_verify_detects_corruption(tmp_path):
+    """verify reports changed, truncated, missing and untracked files."""
+    write_backup(tmp_path)
+    assert verify_backup(str(tmp_path), workers=2)["checked"] == 2
+
+    (tmp_path / "Challenges" / "Web" / "a.bin").write_bytes(b"B" * 5000)
+    (tmp_path / "README.md").unlink()
+    (tmp_path / "notes.txt").write_text("x")
+
+    report = verify_backup(str(tmp_path), workers=2, strict=True)
+    assert report["hash_mismatch"] == ["Challenges/Web/a.bin"]
+    assert report["missing"] == ["README.md"]
+    assert report["untracked"] == ["notes.txt"]
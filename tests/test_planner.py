@@ -0,0 +1,51 @@
+"""Tests for dry-run planner module."""
+
+import pytest
+from ctfd_scraper.planner import estimate_phases, list_pages
+
+CONFIG = {
+    "max_workers_challenges": 2,
+    "max_workers_files": 2,
+    "max_workers_teams": 4,
+}
+
+
+def test_list_pages_counts_trailing_empty_page():
+    """iter_pages fetches one extra page when the last page is exactly full."""
+    assert list_pages(0) == 1
+    assert list_pages(49) == 1
+    assert list_pages(50) == 2
+    assert list_pages(120) == 3
+
+
+def test_estimate_requests_and_bytes():
+    """Request counts follow the per-entity calls made by each backup phase."""
+    counts = {
+        "challenges": 3,
+        "files": [[1000, None], [3000], []],
+        "teams": 10,
+        "members": 25,
+        "users": 25,
+    }
+    phases = estimate_phases(counts, rtt=0.1, throughput=1000.0, config=CONFIG, response_bytes=0)
+
+    assert phases["scoreboard"]["requests"] == 1
+    assert phases["challenges"]["requests"] == 1 + 2 * 3 + 3
+    assert phases["challenges"]["bytes"] == 1000 + 3000 + 2000
+    assert phases["challenges"]["unknown_sizes"] == 1
+    assert phases["teams"]["requests"] == 1 + 3 * 10 + 25
+    assert phases["users"]["requests"] == 1 + 3 * 25
+    # 25 位使用者 × 3 個請求 × 0.1s ÷ 4 workers
+    assert phases["users"]["seconds"] == pytest.approx(1.875)
+    assert phases["users"]["bound"] == "workers"
+
+
+def test_estimate_respects_limits():
+    """Configured rate and bandwidth caps bound the estimate."""
+    counts = {"challenges": 1, "files": [[10_000_000]]}
+    config = dict(CONFIG, backup_scoreboard=False, max_rps=1, max_bandwidth=1_000_000)
+    phases = estimate_phases(counts, rtt=0.01, throughput=100_000_000.0, config=config)
+
+    assert set(phases) == {"challenges"}
+    assert phases["challenges"]["bound"] == "bandwidth"
+    assert phases["challenges"]["seconds"] == pytest.approx(10.0)
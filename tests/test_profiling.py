@@ -0,0 +1,58 @@
+"""Tests for per-stage timing and the stack sampler."""
+
+import threading
+import time
+
+from ctfd_scraper import profiling, stats
+
+
+def test_nested_stages_are_exclusive():
+    """Time in an inner stage is not counted again in the outer one."""
+    stats.reset()
+    profiling.enable()
+    try:
+        with stats.phase("challenges"):
+            with profiling.stage("fetch"):
+                time.sleep(0.02)
+                with profiling.stage("write"):
+                    time.sleep(0.05)
+        with profiling.stage("render"):
+            pass
+    finally:
+        profiling.disable()
+
+    report = profiling.report()
+    stages = report["challenges"]["stages"]
+    assert stages["fetch"]["calls"] == 1
+    assert 0.015 < stages["fetch"]["wall"] < 0.045
+    assert stages["write"]["wall"] >= 0.045
+    assert report["challenges"]["wall"] >= 0.07
+    assert report["other"]["stages"]["render"]["calls"] == 1
+
+
+def test_disabled_records_nothing():
+    """Test that stages entered after disable() are not recorded."""
+    profiling.enable()
+    profiling.disable()
+    with profiling.stage("fetch"):
+        pass
+    assert all(not phase["stages"] for phase in profiling.report().values())
+
+
+def test_sampler_writes_folded_stacks(tmp_path):
+    """Worker threads appear as roots named after their pool, without the index."""
+    stop = threading.Event()
+    worker = threading.Thread(target=stop.wait, name="team_3")
+    worker.start()
+    sampler = profiling.Sampler(str(tmp_path / "out.folded"), interval=0.001)
+    sampler.start()
+    time.sleep(0.05)
+    samples = sampler.stop()
+    stop.set()
+    worker.join()
+
+    lines = (tmp_path / "out.folded").read_text().splitlines()
+    assert samples > 0
+    team = [line for line in lines if line.startswith("team;")]
+    assert team and "wait (" in team[0]
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
@@ -0,0 +1,62 @@
+"""Tests for rate limiting module."""
+
+import pytest
+from ctfd_scraper.ratelimit import TokenBucket, parse_rate
+
+
+class FakeClock:
+    """Deterministic clock whose sleep advances time."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_burst_is_free():
+    """Requests within the burst capacity do not wait."""
+    clock = FakeClock()
+    bucket = TokenBucket(2, burst=4, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        bucket.acquire()
+
+    assert clock.slept == []
+
+
+def test_sustained_rate():
+    """Once the burst is spent, acquisitions are spaced at the configured rate."""
+    clock = FakeClock()
+    bucket = TokenBucket(10, burst=1, clock=clock, sleep=clock.sleep)
+
+    for _ in range(11):
+        bucket.acquire()
+
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_acquire_larger_than_burst():
+    """Amounts above the burst size are split instead of blocking forever."""
+    clock = FakeClock()
+    bucket = TokenBucket(100, burst=100, clock=clock, sleep=clock.sleep)
+
+    bucket.acquire(350)
+
+    assert clock.now == pytest.approx(2.5)
+
+
+def test_parse_rate_units():
+    """Rate strings accept K/M/G suffixes."""
+    assert parse_rate("500") == 500
+    assert parse_rate("2K") == 2048
+    assert parse_rate("1.5M") == 1.5 * 1024 * 1024
+    assert parse_rate("1GB/s") == 1024**3
+
+    with pytest.raises(ValueError):
+        parse_rate("0")
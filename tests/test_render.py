@@ -0,0 +1,112 @@
+"""Tests for Markdown and JSON rendering helpers."""
+
+import gzip
+import io
+import json
+from unittest.mock import Mock
+
+import pytest
+from ctfd_scraper import render, storage
+from ctfd_scraper.jsonstream import JsonArrayWriter
+
+
+@pytest.fixture
+def memory():
+    backend = storage.MemoryStorage()
+    storage.set_backend(backend)
+    yield backend
+    render.set_json_compression(None)
+    storage.set_backend(storage.LocalStorage())
+
+
+SAMPLE = {"id": 1, "name": "隊伍 | A", "members": [{"id": 3, "score": 1.5}], "bracket": None}
+
+
+def test_table_writes_header_and_rows():
+    """Test that Table writes the header, separator and rows in order."""
+    out = io.StringIO()
+    table = render.Table("| 名稱 | 分數 |", "|------|-----:|")
+    rows = [("a|b", 100), ("c", 50)]
+    table.write(out, (f"| {render.escape_cell(name)} | {score} |\n" for name, score in rows))
+
+    assert out.getvalue() == "| 名稱 | 分數 |\n|------|-----:|\n| a\\|b | 100 |\n| c | 50 |\n"
+
+
+def test_write_lines_batches_writes(monkeypatch):
+    """Test that write_lines joins ROW_BATCH lines per write and keeps every line."""
+    monkeypatch.setattr(render, "ROW_BATCH", 3)
+    writes = []
+    out = Mock(write=writes.append)
+    render.write_lines(out, (f"{i}\n" for i in range(7)))
+
+    assert writes == ["0\n1\n2\n", "3\n4\n5\n", "6\n"]
+
+
+def test_cell_and_link_helpers():
+    """Test escaping of table cells and URL encoding of folder links."""
+    assert render.escape_cell("a|b") == "a\\|b"
+    assert render.folder_link({"name": "A/B team", "id": 7}) == "A_B%20team_7"
+    assert render.link("Challenges", "Web", "SQL injection") == "Challenges/Web/SQL%20injection"
+
+
+def test_dumps_json_fallback_matches_stdlib(monkeypatch):
+    """Test that without orjson dumps_json is json.dumps with indent=2 and raw UTF-8."""
+    monkeypatch.setattr(render, "orjson", None)
+
+    assert render.dumps_json(SAMPLE) == json.dumps(SAMPLE, indent=2, ensure_ascii=False)
+
+
+def test_dumps_json_orjson_matches_stdlib():
+    """Test that the orjson encoder produces the same text as the stdlib fallback."""
+    pytest.importorskip("orjson")
+
+    assert render.dumps_json(SAMPLE) == json.dumps(SAMPLE, indent=2, ensure_ascii=False)
+
+
+def test_plain_json_unchanged(memory):
+    """Test that without compression open_json writes the plain path."""
+    render.set_json_compression(None)
+    with render.open_json("out/team_info.json") as f:
+        render.dump_json({"id": 1}, f)
+
+    assert render.json_path("out/team_info.json") == "out/team_info.json"
+    assert json.loads(memory.files["out/team_info.json"]) == {"id": 1}
+
+
+def test_gzip_json_roundtrip(memory):
+    """Test streamed gzip output, reproducible bytes and load_json."""
+    render.set_json_compression("gzip")
+    rows = [{"name": f"team{i}", "score": i} for i in range(500)]
+
+    for _ in range(2):
+        with render.open_json("out/team_ranking.json") as f, JsonArrayWriter(f) as writer:
+            for row in rows:
+                writer.write(row)
+        data = memory.files["out/team_ranking.json.gz"]
+        assert data == memory.files.setdefault("first", data)
+
+    assert "out/team_ranking.json" not in memory.files
+    assert json.loads(gzip.decompress(data)) == rows
+    assert render.load_json("out/team_ranking.json.gz") == rows
+
+
+def test_compressed_write_error_is_not_reported(memory):
+    """Test that an exception while writing compressed JSON leaves no file and no manifest entry."""
+    render.set_json_compression("gzip")
+    seen = []
+    storage.set_observer(lambda *args: seen.append(args))
+    try:
+        with pytest.raises(RuntimeError):
+            with render.open_json("out/team_ranking.json") as f:
+                f.write("[")
+                raise RuntimeError("scoreboard parse failed")
+    finally:
+        storage.set_observer(None)
+
+    assert seen == []
+    assert "out/team_ranking.json.gz" not in memory.files
+
+
+def test_unknown_compression():
+    with pytest.raises(ValueError):
+        render.set_json_compression("lzma")
@@ -0,0 +1,26 @@
+"""Tests for scoreboard backup module."""
+
+from unittest.mock import Mock
+
+import pytest
+from ctfd_scraper.scoreboard import backup_scoreboard
+
+
+def make_client(status, body):
+    response = Mock(status_code=status)
+    client = Mock(base_url="http://x")
+    client.get = Mock(return_value=response)
+    client.iter_body = lambda r, size: iter([body])
+    return client, response
+
+
+def test_failed_scoreboard_closes_response(tmp_path):
+    """Test that the streamed response is closed on a non-200 status and on a parse error."""
+    client, response = make_client(500, b"")
+    backup_scoreboard(client, str(tmp_path))
+    response.close.assert_called_once()
+
+    client, response = make_client(200, b'{"data": [{"pos": 1')
+    with pytest.raises(ValueError):
+        backup_scoreboard(client, str(tmp_path))
+    response.close.assert_called_once()
@@ -0,0 +1,90 @@
+"""Tests for challenge search index module."""
+
+from ctfd_scraper.search import SearchIndex, find_databases, search
+
+
+def chal(chal_id, name, category="Pwn", value=100):
+    return {
+        "id": chal_id,
+        "name": name,
+        "folder_name": name,
+        "category": category,
+        "author": "alice",
+        "value": value,
+    }
+
+
+def build(backup_dir, name, challenges):
+    backup_dir.mkdir()
+    index = SearchIndex(str(backup_dir), name)
+    for summary, description, files in challenges:
+        index.add(summary, description, files)
+    index.close()
+
+
+def test_search_across_backups(tmp_path):
+    """Queries match descriptions and attachment names in every backup found."""
+    build(
+        tmp_path / "a_backup",
+        "CTF A",
+        [
+            (
+                chal(1, "baby heap"),
+                "Classic tcache poisoning on glibc 2.31",
+                ["chall", "libc.so.6"],
+            ),
+            (chal(2, "rsa"), "Small exponent", ["out.txt"]),
+        ],
+    )
+    build(tmp_path / "b_backup", "CTF B", [(chal(7, "notes"), "A tcache dup", ["notes.zip"])])
+
+    databases = find_databases([str(tmp_path)])
+    assert len(databases) == 2
+
+    results = search(databases, "tcache")
+    assert {(r["ctf"], r["name"]) for r in results} == {("CTF A", "baby heap"), ("CTF B", "notes")}
+    assert results[0]["path"].startswith("Challenges/Pwn/")
+
+    assert [r["name"] for r in search(databases, "libc")] == ["baby heap"]
+
+
+def test_readd_replaces_and_bad_syntax_is_quoted(tmp_path):
+    """Re-processing a challenge replaces its row; FTS5 syntax errors fall back to literals."""
+    backup_dir = tmp_path / "x_backup"
+    backup_dir.mkdir()
+    index = SearchIndex(str(backup_dir))
+    index.add(chal(3, "web-1", "Web"), "old text", [])
+    index.add(chal(3, "web-1", "Web"), "new text", [])
+    index.close()
+
+    databases = find_databases([str(backup_dir)])
+    assert search(databases, "old") == []
+    assert [r["id"] for r in search(databases, "new")] == [3]
+    assert [r["id"] for r in search(databases, "web-1")] == [3]
+
+
+def test_backed_up_challenges_are_indexed_on_resume(tmp_path):
+    """Test that journaled challenges missing from the index are rebuilt from description.md."""
+    backup_dir = tmp_path / "r_backup"
+    folder = backup_dir / "Challenges" / "Pwn" / "heap"
+    folder.mkdir(parents=True)
+    (folder / "description.md").write_text(
+        "# heap\n\n## Description\n\nHouse of tcache\n\n## Solves\n\nNo solves yet.\n",
+        encoding="utf-8",
+    )
+    summary = dict(
+        chal(5, "heap"),
+        written=["Challenges/Pwn/heap/description.md", "Challenges/Pwn/heap/libc.so.6"],
+        missing_files=["core"],
+    )
+
+    index = SearchIndex(str(backup_dir))
+    index.add(chal(6, "rsa", "Crypto"), "already indexed", [])
+    assert index.add_backed_up([summary, chal(6, "rsa", "Crypto")], str(backup_dir)) == 1
+    index.close()
+
+    databases = find_databases([str(backup_dir)])
+    assert [r["id"] for r in search(databases, "tcache")] == [5]
+    assert [r["id"] for r in search(databases, "libc")] == [5]
+    assert [r["id"] for r in search(databases, "core")] == [5]
+    assert [r["id"] for r in search(databases, "indexed")] == [6]
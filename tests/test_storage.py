@@ -0,0 +1,175 @@
+"""Tests for storage backends."""
+
+import threading
+
+import pytest
+from ctfd_scraper.storage import LocalStorage, MemoryStorage, S3Storage, from_url
+
+
+class FakeS3:
+    """Minimal in-process stand-in for an S3-compatible endpoint."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        with self._lock:
+            self.objects[(Bucket, Key)] = Body
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"up{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        self.objects[(Bucket, Key)] = b"".join(parts[n] for n in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(Key)
+
+
+def test_memory_storage_roundtrip():
+    """Text is stored as UTF-8 and binary as-is under normalized paths."""
+    store = MemoryStorage()
+    with store.open("./ctf_backup/Teams/README.md", "w") as f:
+        f.write("# 隊伍\n")
+    with store.open("ctf_backup/file.bin", "wb") as f:
+        f.write(b"\x00\x01")
+
+    assert store.files["ctf_backup/Teams/README.md"] == "# 隊伍\n".encode("utf-8")
+    assert store.exists("ctf_backup/file.bin")
+    with store.open("ctf_backup/Teams/README.md", "r") as f:
+        assert f.read() == "# 隊伍\n"
+
+
+def test_local_storage_binary_is_unbuffered(tmp_path):
+    """Binary writes on local storage go straight to the file descriptor."""
+    store = LocalStorage()
+    store.makedirs(tmp_path / "a" / "b")
+    with store.open(tmp_path / "a" / "b" / "x.bin", "wb") as f:
+        f.write(b"data")
+        assert f.fileno() >= 0
+
+    assert (tmp_path / "a" / "b" / "x.bin").read_bytes() == b"data"
+
+
+def test_s3_small_objects_upload_in_background():
+    """Small files are uploaded in the background and visible after flush()."""
+    s3 = FakeS3()
+    store = S3Storage("bucket", "archive", client=s3)
+    for i in range(20):
+        with store.open(f"./ctf_backup/Users/u{i}/user_info.json", "w") as f:
+            f.write(f'{{"id": {i}}}')
+    store.flush()
+
+    assert len(s3.objects) == 20
+    assert s3.objects[("bucket", "archive/ctf_backup/Users/u3/user_info.json")] == b'{"id": 3}'
+
+
+def test_s3_large_file_uses_multipart():
+    """Writes beyond part_size stream as multipart parts in order."""
+    s3 = FakeS3()
+    store = S3Storage("bucket", client=s3, part_size=10)
+    with store.open("big.bin", "wb") as f:
+        for _ in range(5):
+            f.write(b"0123456")
+
+    assert s3.objects[("bucket", "big.bin")] == b"0123456" * 5
+    assert not s3.uploads
+
+
+def test_s3_failed_write_aborts_multipart():
+    """An exception while writing aborts the multipart upload."""
+    s3 = FakeS3()
+    store = S3Storage("bucket", client=s3, part_size=4)
+    with pytest.raises(RuntimeError):
+        with store.open("partial.bin", "wb") as f:
+            f.write(b"0123456789")
+            raise RuntimeError("connection reset")
+
+    assert ("bucket", "partial.bin") not in s3.objects
+    assert s3.aborted == ["partial.bin"]
+
+
+def test_s3_failed_text_write_aborts_multipart():
+    """Test that an exception in a text-mode with block aborts the multipart upload."""
+    s3 = FakeS3()
+    store = S3Storage("bucket", client=s3, part_size=4)
+    with pytest.raises(RuntimeError):
+        with store.open("README.md", "w") as f:
+            f.write("# 題目\n" * 2000)
+            raise RuntimeError("render failed")
+    store.flush()
+
+    assert ("bucket", "README.md") not in s3.objects
+    assert s3.aborted == ["README.md"]
+    assert not s3.uploads
+
+
+def test_text_write_error_is_not_reported(tmp_path):
+    """Test that an exception in a text-mode with block aborts instead of reporting the file."""
+    from ctfd_scraper import storage
+
+    seen = []
+    storage.set_observer(lambda *args: seen.append(args))
+    try:
+        with pytest.raises(RuntimeError):
+            with storage.open(tmp_path / "half.md", "w") as f:
+                f.write("# 題目\n")
+                raise RuntimeError("render failed")
+    finally:
+        storage.set_observer(None)
+
+    assert seen == []
+    memory = MemoryStorage()
+    with pytest.raises(RuntimeError):
+        with memory.open("half.md", "w") as f:
+            f.write("partial")
+            raise RuntimeError("render failed")
+    assert not memory.exists("half.md")
+
+
+def test_from_url():
+    """Storage URLs select the backend."""
+    assert isinstance(from_url("local"), LocalStorage)
+    assert isinstance(from_url("memory"), MemoryStorage)
+    with pytest.raises(ValueError):
+        from_url("ftp://x")
+
+
+def test_observer_receives_streamed_hash(tmp_path):
+    """With an observer set, closed files report their size, SHA-256 and source."""
+    import hashlib
+
+    from ctfd_scraper import storage
+
+    seen = []
+    storage.set_observer(lambda *args: seen.append(args))
+    try:
+        with storage.open(tmp_path / "a.md", "w") as f:
+            f.write("# 題目\n")
+        with storage.open(tmp_path / "b.bin", "wb", source="http://x/b.bin") as f:
+            f.write(b"\x00" * 10)
+        with pytest.raises(RuntimeError):
+            with storage.open(tmp_path / "c.bin", "wb") as f:
+                f.write(b"partial")
+                raise RuntimeError("connection reset")
+    finally:
+        storage.set_observer(None)
+
+    text = "# 題目\n".encode("utf-8")
+    assert seen == [
+        (tmp_path / "a.md", len(text), hashlib.sha256(text).hexdigest(), None),
+        (tmp_path / "b.bin", 10, hashlib.sha256(b"\x00" * 10).hexdigest(), "http://x/b.bin"),
+    ]
+    assert (tmp_path / "a.md").read_bytes() == text